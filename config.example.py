@@ -20,6 +20,21 @@ OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"  # 1536 dimensions, cost-effec
 BATCH_SIZE = 10  # Number of files to process per batch
 RATE_LIMIT_DELAY = 0.5  # Seconds between API calls
 BATCH_DELAY = 2.0  # Seconds between batches
+MAX_WORKERS = 8  # Files processed concurrently per batch (1 = serial)
+PROVIDER_LIMITS = {  # Max in-flight requests per provider when MAX_WORKERS > 1
+    "gemini": 4,
+    "openai": 8,
+    "database": 4,
+}
+RATE_LIMITS = {  # Provider quotas shared by all pipeline stages (requests/tokens per minute)
+    "gemini": {"rpm": 150, "tpm": 2000000},
+    "openai": {"rpm": 3000, "tpm": 1000000},
+}
+STREAMING = False  # Overlap parse/analyze/embed/write across files instead of batch-at-a-time
+
+# Search CLI backend: "postgres", or "snapshot" for exact local search over an exported snapshot
+SEARCH_BACKEND = "postgres"
+SEARCH_SNAPSHOT_DIR = None  # None = ~/.cache/flopy_expert/search_snapshot
 
 # Repository path
 REPO_PATH = "/home/danilopezmella/flopy_expert"
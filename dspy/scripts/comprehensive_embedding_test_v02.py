@@ -20,10 +20,14 @@ import time
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 import config
+from src.embedding_cache import get_embedding_cache
 
 # Initialize OpenAI
 openai.api_key = config.OPENAI_API_KEY
 
+# Stored vectors are reused for byte-identical text
+embedding_cache = get_embedding_cache()
+
 class EmbeddingTestSuiteV02:
     """Test suite for v02 embeddings with comparison to v00 baseline"""
     
@@ -132,11 +136,11 @@ class EmbeddingTestSuiteV02:
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = openai.embeddings.create(
-                    model="text-embedding-3-small",
-                    input=text
+                vector = embedding_cache.get_or_compute(
+                    "text-embedding-3-small", text,
+                    lambda: openai.embeddings.create(model="text-embedding-3-small", input=text).data[0].embedding
                 )
-                return np.array(response.data[0].embedding)
+                return np.array(vector)
             except Exception as e:
                 if attempt == max_retries - 1:
                     print(f"    ⚠ Error embedding: {e}")
@@ -10,11 +10,15 @@ import psycopg2
 import numpy as np
 import openai
 import config
+from src.embedding_cache import get_embedding_cache
 import time
 
 # Initialize OpenAI
 openai.api_key = config.OPENAI_API_KEY
 
+# Stored vectors are reused for byte-identical text
+embedding_cache = get_embedding_cache()
+
 def calculate_similarity(emb1, emb2):
     emb1_norm = emb1 / np.linalg.norm(emb1)
     emb2_norm = emb2 / np.linalg.norm(emb2)
@@ -22,11 +26,11 @@ def calculate_similarity(emb1, emb2):
 
 def generate_embedding(text):
     try:
-        response = openai.embeddings.create(
-            model='text-embedding-3-small',
-            input=text
+        vector = embedding_cache.get_or_compute(
+            'text-embedding-3-small', text,
+            lambda: openai.embeddings.create(model='text-embedding-3-small', input=text).data[0].embedding
         )
-        return np.array(response.data[0].embedding)
+        return np.array(vector)
     except Exception as e:
         print(f"  ⚠ Embedding error: {e}")
         return None
@@ -18,10 +18,14 @@ import os
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 import config
+from src.embedding_cache import get_embedding_cache
 
 # Initialize OpenAI
 openai.api_key = config.OPENAI_API_KEY
 
+# Stored vectors are reused for byte-identical text
+embedding_cache = get_embedding_cache()
+
 def get_workflows_with_embeddings(limit: int = 10) -> List[Dict]:
     """Fetch workflows that have both analysis and embeddings"""
     conn = psycopg2.connect(config.NEON_CONNECTION_STRING)
@@ -61,11 +65,11 @@ def get_workflows_with_embeddings(limit: int = 10) -> List[Dict]:
 def generate_question_embedding(question: str) -> np.ndarray:
     """Generate embedding for a single question"""
     try:
-        response = openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=question
+        vector = embedding_cache.get_or_compute(
+            "text-embedding-3-small", question,
+            lambda: openai.embeddings.create(model="text-embedding-3-small", input=question).data[0].embedding
         )
-        return np.array(response.data[0].embedding)
+        return np.array(vector)
     except Exception as e:
         print(f"Error embedding question: {e}")
         return None
@@ -11,6 +11,7 @@ import psycopg2
 import numpy as np
 import openai
 import config
+from src.embedding_cache import get_embedding_cache
 import csv
 from datetime import datetime
 import json
@@ -20,6 +21,9 @@ from pathlib import Path
 # Initialize OpenAI
 openai.api_key = config.OPENAI_API_KEY
 
+# Stored vectors are reused for byte-identical text
+embedding_cache = get_embedding_cache()
+
 def calculate_similarity(emb1, emb2):
     """Calculate cosine similarity between two embeddings"""
     emb1_norm = emb1 / np.linalg.norm(emb1)
@@ -29,11 +33,11 @@ def calculate_similarity(emb1, emb2):
 def generate_embedding(text):
     """Generate embedding for a text using OpenAI"""
     try:
-        response = openai.embeddings.create(
-            model='text-embedding-3-small',
-            input=text
+        vector = embedding_cache.get_or_compute(
+            'text-embedding-3-small', text,
+            lambda: openai.embeddings.create(model='text-embedding-3-small', input=text).data[0].embedding
         )
-        return np.array(response.data[0].embedding)
+        return np.array(vector)
     except Exception as e:
         print(f"Error generating embedding: {e}")
         return None
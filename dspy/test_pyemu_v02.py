@@ -12,17 +12,21 @@ import openai
 import json
 from typing import List, Dict
 import config
+from src.embedding_cache import get_embedding_cache
 
 # Initialize OpenAI
 openai.api_key = config.OPENAI_API_KEY
 
+# Stored vectors are reused for byte-identical text
+embedding_cache = get_embedding_cache()
+
 def get_embedding(text: str) -> np.ndarray:
     """Generate embedding for text"""
-    response = openai.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
+    vector = embedding_cache.get_or_compute(
+        "text-embedding-3-small", text,
+        lambda: openai.embeddings.create(model="text-embedding-3-small", input=text).data[0].embedding
     )
-    return np.array(response.data[0].embedding)
+    return np.array(vector)
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     """Calculate cosine similarity"""
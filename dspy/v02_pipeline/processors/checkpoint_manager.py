@@ -5,11 +5,14 @@ Handles saving and resuming pipeline state for long-running processes
 
 import json
 import logging
+import shutil
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import hashlib
 
+from src.checkpoint_journal import CheckpointJournal
+
 logger = logging.getLogger(__name__)
 
 class CheckpointManager:
@@ -28,35 +31,21 @@ class CheckpointManager:
         self.checkpoint_dir.mkdir(exist_ok=True, parents=True)
         self.pipeline_name = pipeline_name
         self.stage = stage
-        self.checkpoint_file = self.checkpoint_dir / f"{pipeline_name}_{stage}_checkpoint.json"
-        self.backup_file = self.checkpoint_dir / f"{pipeline_name}_{stage}_checkpoint.backup.json"
-        self.state = self._load_checkpoint()
+        # Items are appended to a JSONL journal as they finish; the old JSON
+        # file is only read once to migrate existing progress
+        self.checkpoint_file = self.checkpoint_dir / f"{pipeline_name}_{stage}_checkpoint.jsonl"
+        self.legacy_file = self.checkpoint_dir / f"{pipeline_name}_{stage}_checkpoint.json"
+        self.journal = self._load_checkpoint()
+        self.state = self._load_state()
     
-    def _load_checkpoint(self) -> Dict[str, Any]:
-        """Load existing checkpoint or create new one"""
-        if self.checkpoint_file.exists():
-            try:
-                with open(self.checkpoint_file, 'r') as f:
-                    state = json.load(f)
-                    logger.info(f"Loaded checkpoint: {len(state.get('completed_items', []))} items completed")
-                    return state
-            except json.JSONDecodeError as e:
-                logger.warning(f"Corrupted checkpoint file, trying backup: {e}")
-                if self.backup_file.exists():
-                    with open(self.backup_file, 'r') as f:
-                        state = json.load(f)
-                        logger.info(f"Loaded backup checkpoint: {len(state.get('completed_items', []))} items completed")
-                        return state
-        
-        # Create new checkpoint
+    def _load_state(self) -> Dict[str, Any]:
+        """Summary state (statistics, timestamps) kept as journal metadata"""
         return {
             "pipeline_name": self.pipeline_name,
             "stage": self.stage,
-            "started_at": datetime.now().isoformat(),
-            "completed_items": [],
-            "failed_items": [],
-            "metadata": {},
-            "statistics": {
+            "started_at": self.journal.get_meta("started_at"),
+            "last_updated": self.journal.get_meta("last_updated"),
+            "statistics": self.journal.get_meta("statistics") or {
                 "total_processed": 0,
                 "successful": 0,
                 "failed": 0,
@@ -64,62 +53,57 @@ class CheckpointManager:
             }
         }
     
+    def _load_checkpoint(self) -> CheckpointJournal:
+        """Open the journal, creating it (and migrating a legacy checkpoint) if needed"""
+        is_new = not self.checkpoint_file.exists()
+        journal = CheckpointJournal(self.checkpoint_file)
+        
+        if is_new:
+            journal.set_meta("started_at", datetime.now().isoformat())
+            if self.legacy_file.exists():
+                try:
+                    with open(self.legacy_file, 'r') as f:
+                        legacy = json.load(f)
+                    journal.mark_completed_many(legacy.get('completed_items', []))
+                    for failure in legacy.get('failed_items', []):
+                        journal.mark_failed(failure['id'], failure.get('error', ''),
+                                            can_retry=failure.get('can_retry', True))
+                    journal.set_meta("statistics", legacy.get('statistics'))
+                    logger.info(f"Migrated legacy checkpoint {self.legacy_file.name}")
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.warning(f"Could not migrate legacy checkpoint: {e}")
+        
+        logger.info(f"Loaded checkpoint: {len(journal.completed)} items completed")
+        return journal
+    
     def save_checkpoint(self):
-        """Save current state to checkpoint file"""
-        # Backup existing checkpoint
-        if self.checkpoint_file.exists():
-            import shutil
-            shutil.copy2(self.checkpoint_file, self.backup_file)
-        
-        # Save new checkpoint
+        """Record current statistics (items are already durable as they finish)"""
         self.state["last_updated"] = datetime.now().isoformat()
-        with open(self.checkpoint_file, 'w') as f:
-            json.dump(self.state, f, indent=2, default=str)
+        self.journal.set_meta("last_updated", self.state["last_updated"])
+        self.journal.set_meta("statistics", self.state["statistics"])
         
         logger.debug(f"Checkpoint saved: {self.state['statistics']}")
     
     def is_completed(self, item_id: str) -> bool:
         """Check if an item has already been processed"""
-        return item_id in self.state["completed_items"]
+        return self.journal.is_completed(item_id)
     
     def is_failed(self, item_id: str) -> bool:
         """Check if an item previously failed"""
-        return any(f['id'] == item_id for f in self.state.get("failed_items", []))
+        return self.journal.is_failed(item_id)
     
     def mark_completed(self, item_id: str, metadata: Optional[Dict] = None):
         """Mark an item as successfully completed"""
-        if item_id not in self.state["completed_items"]:
-            self.state["completed_items"].append(item_id)
+        if not self.journal.is_completed(item_id):
+            self.journal.mark_completed(item_id, metadata=metadata)
             self.state["statistics"]["successful"] += 1
             self.state["statistics"]["total_processed"] += 1
-            
-            if metadata:
-                self.state["metadata"][item_id] = metadata
-            
-            # Auto-save every N items (configurable)
-            if len(self.state["completed_items"]) % 5 == 0:
-                self.save_checkpoint()
     
     def mark_failed(self, item_id: str, error: str, can_retry: bool = True):
         """Mark an item as failed"""
-        failure_record = {
-            "id": item_id,
-            "error": str(error),
-            "timestamp": datetime.now().isoformat(),
-            "can_retry": can_retry
-        }
-        
-        # Remove from failed list if already there (for retry tracking)
-        self.state["failed_items"] = [
-            f for f in self.state.get("failed_items", []) 
-            if f["id"] != item_id
-        ]
-        
-        self.state["failed_items"].append(failure_record)
+        self.journal.mark_failed(item_id, error, can_retry=can_retry)
         self.state["statistics"]["failed"] += 1
         self.state["statistics"]["total_processed"] += 1
-        
-        self.save_checkpoint()
     
     def mark_skipped(self, item_id: str, reason: str = "Already processed"):
         """Mark an item as skipped"""
@@ -136,16 +120,15 @@ class CheckpointManager:
         Returns:
             List of items that still need processing
         """
-        completed_ids = set(self.state["completed_items"])
         pending = []
         
         for item in all_items:
             # Assume items have an 'id' field
             item_id = item.get('id') or item.get('file') or self._generate_item_id(item)
-            if item_id not in completed_ids:
+            if not self.journal.is_completed(item_id):
                 pending.append(item)
         
-        logger.info(f"Items: {len(all_items)} total, {len(completed_ids)} completed, {len(pending)} pending")
+        logger.info(f"Items: {len(all_items)} total, {len(self.journal.completed)} completed, {len(pending)} pending")
         return pending
     
     def _generate_item_id(self, item: Dict) -> str:
@@ -160,15 +143,17 @@ class CheckpointManager:
     
     def reset(self):
         """Reset checkpoint (use with caution!)"""
-        if self.checkpoint_file.exists():
-            # Backup before reset
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            archive_file = self.checkpoint_dir / f"{self.pipeline_name}_{self.stage}_checkpoint_{timestamp}.json"
-            import shutil
-            shutil.move(self.checkpoint_file, archive_file)
-            logger.info(f"Checkpoint reset. Previous checkpoint archived to: {archive_file}")
-        
-        self.state = self._load_checkpoint()  # Creates new empty state
+        self.journal.close()
+        for path in (self.checkpoint_file, self.legacy_file):
+            if path.exists():
+                # Backup before reset
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                archive_file = path.with_name(f"{path.stem}_{timestamp}{path.suffix}")
+                shutil.move(path, archive_file)
+                logger.info(f"Checkpoint reset. Previous checkpoint archived to: {archive_file}")
+        
+        self.journal = self._load_checkpoint()  # Creates new empty journal
+        self.state = self._load_state()
     
     def should_process(self, item_id: str, retry_failed: bool = False) -> bool:
         """
@@ -192,7 +177,7 @@ class CheckpointManager:
     def get_summary(self) -> str:
         """Get a human-readable summary of the checkpoint state"""
         stats = self.state["statistics"]
-        failed_count = len(self.state.get("failed_items", []))
+        failed_count = len(self.journal.failed)
         
         summary = [
             f"Pipeline: {self.pipeline_name}",
@@ -210,7 +195,7 @@ class CheckpointManager:
         if failed_count > 0:
             summary.append("")
             summary.append("Recent Failures:")
-            for failure in self.state["failed_items"][-5:]:  # Show last 5 failures
+            for failure in list(self.journal.failed.values())[-5:]:  # Show last 5 failures
                 summary.append(f"  - {failure['id']}: {failure['error'][:50]}...")
         
         return "\n".join(summary)
\ No newline at end of file
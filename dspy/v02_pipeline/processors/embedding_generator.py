@@ -9,6 +9,9 @@ from typing import Dict, Any, List, Optional
 import openai
 import numpy as np
 
+from src.embedding_cache import get_embedding_cache
+from src.rate_limiter import get_rate_limiter, estimate_tokens
+
 logger = logging.getLogger(__name__)
 
 class EmbeddingGenerator:
@@ -26,7 +29,8 @@ class EmbeddingGenerator:
         self.model = model
         self.dimensions = 1536  # For text-embedding-3-small
         self.max_retries = 3
-        self.retry_delay = 2
+        self.embedding_cache = get_embedding_cache()
+        self.rate_limiter = get_rate_limiter('openai')
     
     def create_embedding_text(self, 
                              workflow: Dict[str, Any], 
@@ -153,20 +157,30 @@ class EmbeddingGenerator:
         Returns:
             Embedding vector or None if failed
         """
+        cached = self.embedding_cache.get(self.model, text, self.dimensions)
+        if cached is not None:
+            logger.debug("Using stored embedding")
+            return cached
+        
         for attempt in range(self.max_retries):
             try:
+                self.rate_limiter.acquire_sync(estimate_tokens(text))
                 response = openai.embeddings.create(
                     model=self.model,
                     input=text
                 )
+                self.rate_limiter.report_success()
                 embedding = response.data[0].embedding
                 logger.debug(f"Generated embedding with {len(embedding)} dimensions")
+                self.embedding_cache.put(self.model, text, embedding)
                 return embedding
                 
             except Exception as e:
                 logger.warning(f"Embedding generation attempt {attempt + 1} failed: {e}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay ** attempt)
+                # 429s slow the shared limiter down; other failures back off here
+                delay = self.rate_limiter.retry_delay(e, attempt)
+                if delay and attempt < self.max_retries - 1:
+                    time.sleep(delay)
         
         logger.error(f"Failed to generate embedding after {self.max_retries} attempts")
         return None
@@ -223,9 +237,6 @@ class EmbeddingGenerator:
                 if checkpoint_manager:
                     checkpoint_manager.mark_failed(workflow_id, "Failed to generate embedding")
                 logger.error(f"  ❌ Failed to generate embedding")
-            
-            # Rate limiting
-            time.sleep(0.5)
         
         return results
     
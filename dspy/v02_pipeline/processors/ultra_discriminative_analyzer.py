@@ -11,6 +11,9 @@ import asyncio
 from typing import Dict, Any, Optional, List
 import google.genai as genai
 
+from src.llm_cache import get_llm_cache
+from src.rate_limiter import get_rate_limiter, estimate_tokens
+
 logger = logging.getLogger(__name__)
 
 class UltraDiscriminativeAnalyzer:
@@ -27,7 +30,12 @@ class UltraDiscriminativeAnalyzer:
         self.gemini_client = genai.Client(api_key=api_key)
         self.model_name = model_name
         self.max_retries = 3
-        self.retry_delay = 2
+        
+        # Analysis responses are cached on disk, keyed by model + prompt
+        self.llm_cache = get_llm_cache()
+        
+        # Shared Gemini quota; replaces fixed sleeps between calls
+        self.rate_limiter = get_rate_limiter('gemini')
     
     async def _generate_async(self, prompt: str) -> Any:
         """Async wrapper for Gemini generation"""
@@ -56,12 +64,26 @@ class UltraDiscriminativeAnalyzer:
         # Format the prompt with workflow data
         prompt = prompt_template.format(**workflow)
         
+        # Replay a cached response if it still parses and validates
+        cache_key = self.llm_cache.make_key(self.model_name, prompt)
+        cached_text = self.llm_cache.get(cache_key)
+        if cached_text is not None:
+            try:
+                analysis = self._extract_json(cached_text)
+                if analysis and self._validate_analysis(analysis, required_fields):
+                    logger.debug("Using cached analysis")
+                    return analysis
+            except json.JSONDecodeError:
+                pass
+        
         for attempt in range(self.max_retries):
             try:
                 logger.debug(f"Generating analysis (attempt {attempt + 1})")
                 
                 # Generate response using Gemini
+                self.rate_limiter.acquire_sync(estimate_tokens(prompt))
                 response = asyncio.run(self._generate_async(prompt))
+                self.rate_limiter.report_success()
                 
                 # Parse JSON from response
                 analysis = self._extract_json(response.text)
@@ -69,6 +91,7 @@ class UltraDiscriminativeAnalyzer:
                 # Validate required fields
                 if analysis and self._validate_analysis(analysis, required_fields):
                     logger.debug(f"Successfully generated analysis with {len(analysis.get('discriminative_questions', []))} questions")
+                    self.llm_cache.put(cache_key, self.model_name, response.text)
                     return analysis
                 else:
                     logger.warning(f"Analysis missing required fields, retrying...")
@@ -76,10 +99,13 @@ class UltraDiscriminativeAnalyzer:
             except json.JSONDecodeError as e:
                 logger.warning(f"JSON parse error: {e}")
             except Exception as e:
-                logger.error(f"Generation error: {e}")
-            
-            if attempt < self.max_retries - 1:
-                time.sleep(self.retry_delay ** attempt)
+                # 429s slow the shared limiter down (the next acquire waits);
+                # other failures such as 5xx or timeouts back off here
+                delay = self.rate_limiter.retry_delay(e, attempt)
+                if delay:
+                    logger.error(f"Generation error: {e}")
+                    if attempt < self.max_retries - 1:
+                        time.sleep(delay)
         
         logger.error(f"Failed to generate analysis after {self.max_retries} attempts")
         return None
@@ -172,9 +198,6 @@ class UltraDiscriminativeAnalyzer:
                 if checkpoint_manager:
                     checkpoint_manager.mark_failed(workflow_id, "Failed to generate analysis")
                 logger.error(f"  ❌ Failed to generate analysis")
-            
-            # Rate limiting
-            time.sleep(1)
         
         return results
     
@@ -20,10 +20,14 @@ import logging
 
 import config as main_config
 from v02_pipeline.config import pipeline_config
+from src.embedding_cache import get_embedding_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Stored vectors are reused for byte-identical text
+embedding_cache = get_embedding_cache()
+
 class V02EmbeddingTester:
     """Test framework for v02 embeddings"""
     
@@ -126,11 +130,11 @@ class V02EmbeddingTester:
     def generate_query_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for a query"""
         try:
-            response = openai.embeddings.create(
-                model=self.embedding_model,
-                input=text
+            vector = embedding_cache.get_or_compute(
+                self.embedding_model, text,
+                lambda: openai.embeddings.create(model=self.embedding_model, input=text).data[0].embedding
             )
-            return np.array(response.data[0].embedding)
+            return np.array(vector)
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             return None
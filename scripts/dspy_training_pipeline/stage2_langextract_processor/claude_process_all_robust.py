@@ -5,10 +5,18 @@ Process all issues using Claude CLI with checkpoint saving
 
 import json
 import subprocess
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from src.rate_limiter import get_rate_limiter
+from src.checkpoint_journal import CheckpointJournal
+
+# Shared request budget for the Claude CLI (replaces the fixed 1s sleep)
+rate_limiter = get_rate_limiter('claude')
+
 
 def extract_with_claude(issue_data):
     """Use Claude CLI to intelligently extract information"""
@@ -38,6 +46,7 @@ Rules:
 
 Output JSON: {{"modules": [], "problem": "", "resolution": ""}}"""
     
+    rate_limiter.acquire_sync()
     result = subprocess.run(
         ['claude', '-p', prompt, '--output-format', 'json'],
         capture_output=True,
@@ -45,6 +54,7 @@ Output JSON: {{"modules": [], "problem": "", "resolution": ""}}"""
     )
     
     if result.returncode == 0:
+        rate_limiter.report_success()
         try:
             response = json.loads(result.stdout)
             result_text = response.get('result', '')
@@ -58,25 +68,35 @@ Output JSON: {{"modules": [], "problem": "", "resolution": ""}}"""
         except Exception as e:
             print(f"  Error parsing response: {e}")
     else:
+        # Rate-limit errors slow the limiter down for the following requests
+        rate_limiter.handle_error(RuntimeError(result.stderr))
         print(f"  Claude CLI error: {result.stderr}")
     
     return None
 
 
 def load_checkpoint():
-    """Load checkpoint to resume processing"""
-    checkpoint_file = Path("../data/extracted/claude_intelligent/checkpoint.json")
-    if checkpoint_file.exists():
-        with open(checkpoint_file, 'r') as f:
-            return json.load(f)
-    return {'processed': [], 'last_index': -1}
+    """Open the checkpoint journal (one appended line per processed issue)"""
+    journal_file = Path("../data/extracted/claude_intelligent/checkpoint.jsonl")
+    legacy_file = Path("../data/extracted/claude_intelligent/checkpoint.json")
+    is_new = not journal_file.exists()
+    checkpoint = CheckpointJournal(journal_file)
+
+    # Carry over progress recorded by the old whole-file JSON checkpoint
+    if is_new and legacy_file.exists():
+        try:
+            with open(legacy_file, 'r') as f:
+                legacy = json.load(f)
+            checkpoint.mark_completed_many(str(issue) for issue in legacy.get('processed', []))
+            print(f"Migrated {len(checkpoint.completed)} issues from {legacy_file}")
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Could not migrate legacy checkpoint {legacy_file}: {e}")
+    return checkpoint
 
 
-def save_checkpoint(checkpoint):
-    """Save checkpoint"""
-    checkpoint_file = Path("../data/extracted/claude_intelligent/checkpoint.json")
-    with open(checkpoint_file, 'w') as f:
-        json.dump(checkpoint, f)
+def save_checkpoint(checkpoint, issue_num):
+    """Record a processed issue"""
+    checkpoint.mark_completed(str(issue_num))
 
 
 def main():
@@ -96,17 +116,19 @@ def main():
     
     # Load checkpoint
     checkpoint = load_checkpoint()
-    start_index = checkpoint['last_index'] + 1
+    pending = [
+        (i, issue) for i, issue in enumerate(issues)
+        if not checkpoint.is_completed(str(issue.get('issue_number')))
+    ]
     
     print(f"Processing {total_issues} issues with Claude CLI...")
-    if start_index > 0:
-        print(f"Resuming from issue {start_index + 1}")
+    if len(pending) < total_issues:
+        print(f"Resuming: {total_issues - len(pending)} issues already done, {len(pending)} pending")
     
     start_time = time.time()
     
-    # Process all issues
-    for i in range(start_index, total_issues):
-        issue = issues[i]
+    # Process all pending issues
+    for done, (i, issue) in enumerate(pending, 1):
         issue_num = issue.get('issue_number')
         print(f"\n[{i+1}/{total_issues}] Processing issue #{issue_num}")
         
@@ -132,24 +154,18 @@ def main():
                 print(f"    - {mod}")
             
             # Update checkpoint
-            checkpoint['processed'].append(issue_num)
-            checkpoint['last_index'] = i
-            save_checkpoint(checkpoint)
+            save_checkpoint(checkpoint, issue_num)
         else:
             print(f"  ✗ Extraction failed")
         
         # Progress update every 10 issues
         if (i + 1) % 10 == 0:
             elapsed = time.time() - start_time
-            avg_time = elapsed / (i + 1 - start_index)
-            remaining = (total_issues - i - 1) * avg_time
+            avg_time = elapsed / done
+            remaining = (len(pending) - done) * avg_time
             print(f"\n⏱️  Progress: {i+1}/{total_issues} ({(i+1)/total_issues*100:.1f}%)")
             print(f"   Average: {avg_time:.1f}s per issue")
             print(f"   Estimated remaining: {remaining/60:.1f} minutes")
-        
-        # Rate limiting - adjust as needed
-        if i < total_issues - 1:
-            time.sleep(1)  # 1 second between requests
     
     # Combine all results
     print("\n" + "="*60)
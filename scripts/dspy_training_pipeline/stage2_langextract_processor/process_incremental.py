@@ -19,6 +19,13 @@ load_dotenv(env_path)
 import langextract as lx
 from langextract import data
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from src.rate_limiter import get_rate_limiter
+from src.checkpoint_journal import CheckpointJournal
+
+# Shared Gemini budget (replaces the fixed 2s wait between issues)
+rate_limiter = get_rate_limiter('gemini')
+
 
 def create_comprehensive_examples():
     """Create comprehensive extraction examples"""
@@ -98,6 +105,7 @@ def extract_from_issue(issue_data, examples):
     prompt = """Extract: 1) Problem with error, 2) ALL modules mentioned, 3) Resolution if any. NO DUPLICATES."""
     
     try:
+        rate_limiter.acquire_sync(len(text) // 4)
         result = lx.extract(
             text_or_documents=text,
             prompt_description=prompt,
@@ -107,6 +115,7 @@ def extract_from_issue(issue_data, examples):
             max_char_buffer=2000,  # Reduced buffer
             temperature=0.3
         )
+        rate_limiter.report_success()
         
         extractions_by_class = {}
         for ext in result.extractions:
@@ -129,6 +138,8 @@ def extract_from_issue(issue_data, examples):
         }
         
     except Exception as e:
+        # 429s slow the limiter down for the following issues
+        rate_limiter.handle_error(e)
         return {
             'issue_number': issue_number,
             'title': issue_data.get('title', '')[:100],
@@ -138,20 +149,27 @@ def extract_from_issue(issue_data, examples):
 
 
 def load_checkpoint():
-    """Load checkpoint to resume processing"""
-    checkpoint_file = Path("../data/extracted/checkpoint.json")
-    if checkpoint_file.exists():
-        with open(checkpoint_file, 'r') as f:
-            return json.load(f)
-    return {'processed_issues': [], 'last_index': -1}
+    """Open the checkpoint journal (one appended line per processed issue)"""
+    journal_file = Path("../data/extracted/checkpoint.jsonl")
+    legacy_file = Path("../data/extracted/checkpoint.json")
+    is_new = not journal_file.exists()
+    checkpoint = CheckpointJournal(journal_file)
+
+    # Carry over progress recorded by the old whole-file JSON checkpoint
+    if is_new and legacy_file.exists():
+        try:
+            with open(legacy_file, 'r') as f:
+                legacy = json.load(f)
+            checkpoint.mark_completed_many(str(issue) for issue in legacy.get('processed_issues', []))
+            print(f"Migrated {len(checkpoint.completed)} issues from {legacy_file}")
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Could not migrate legacy checkpoint {legacy_file}: {e}")
+    return checkpoint
 
 
-def save_checkpoint(checkpoint):
-    """Save checkpoint"""
-    checkpoint_file = Path("../data/extracted/checkpoint.json")
-    checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(checkpoint_file, 'w') as f:
-        json.dump(checkpoint, f)
+def save_checkpoint(checkpoint, issue_number, status):
+    """Record a processed issue"""
+    checkpoint.mark_completed(str(issue_number), status=status)
 
 
 def save_result(result, output_dir):
@@ -180,10 +198,16 @@ def main():
     print(f"Found {total_issues} enriched issues")
     
     # Load checkpoint if resuming
-    checkpoint = load_checkpoint() if args.resume else {'processed_issues': [], 'last_index': -1}
-    start_index = checkpoint['last_index'] + 1
+    checkpoint = load_checkpoint()
+    if not args.resume:
+        checkpoint.reset()
     
-    if start_index >= total_issues:
+    pending = [
+        (i, issue) for i, issue in enumerate(issues)
+        if not checkpoint.is_completed(str(issue.get('issue_number', 'unknown')))
+    ]
+    
+    if not pending:
         print("All issues already processed!")
         return
     
@@ -198,8 +222,7 @@ def main():
     processed_count = 0
     start_time = time.time()
     
-    for i in range(start_index, min(start_index + args.limit, total_issues)):
-        issue = issues[i]
+    for i, issue in pending[:args.limit]:
         issue_number = issue.get('issue_number', 'unknown')
         
         print(f"\nProcessing issue {i+1}/{total_issues}: #{issue_number}")
@@ -210,9 +233,7 @@ def main():
         save_result(result, output_dir)
         
         # Update checkpoint
-        checkpoint['processed_issues'].append(issue_number)
-        checkpoint['last_index'] = i
-        save_checkpoint(checkpoint)
+        save_checkpoint(checkpoint, issue_number, result['status'])
         
         # Print summary
         if result['status'] == 'success':
@@ -225,11 +246,6 @@ def main():
             print(f"  ✗ Error: {result.get('error', 'Unknown error')}")
         
         processed_count += 1
-        
-        # Rate limiting
-        if i < start_index + args.limit - 1:
-            print("  Waiting 2 seconds...")
-            time.sleep(2)
     
     # Summary
     elapsed = time.time() - start_time
@@ -239,10 +255,10 @@ def main():
     print(f"Processed: {processed_count} issues in {elapsed:.1f} seconds")
     print(f"Average: {elapsed/processed_count:.1f} seconds per issue")
     print(f"Results saved to: {output_dir}")
-    print(f"Total processed so far: {len(checkpoint['processed_issues'])}/{total_issues}")
+    print(f"Total processed so far: {len(checkpoint.completed)}/{total_issues}")
     
-    if len(checkpoint['processed_issues']) < total_issues:
-        remaining = total_issues - len(checkpoint['processed_issues'])
+    if len(checkpoint.completed) < total_issues:
+        remaining = total_issues - len(checkpoint.completed)
         print(f"\nTo continue processing the remaining {remaining} issues, run:")
         print(f"  python3 process_incremental.py --resume --limit {remaining}")
 
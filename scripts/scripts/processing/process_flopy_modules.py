@@ -28,7 +28,11 @@ async def main():
         gemini_api_key=config.GEMINI_API_KEY,
         openai_api_key=config.OPENAI_API_KEY,
         batch_size=config.BATCH_SIZE,
-        gemini_model=config.GEMINI_MODEL
+        gemini_model=config.GEMINI_MODEL,
+        max_workers=getattr(config, 'MAX_WORKERS', 1),
+        provider_limits=getattr(config, 'PROVIDER_LIMITS', None),
+        rate_limits=getattr(config, 'RATE_LIMITS', None),
+        streaming=getattr(config, 'STREAMING', False)
     )
     
     await processor.process_all()
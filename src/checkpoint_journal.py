@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Append-Only Checkpoint Journal
+
+Replaces per-batch checkpoint JSON files and rewrite-the-whole-state
+checkpoints with one JSONL journal per pipeline:
+- Each completed/failed item appends one line; nothing is ever rewritten
+- Lines are flushed and fsync'd before the call returns, so a crash loses
+  at most the line being written (a torn last line is ignored on replay)
+- The journal is replayed into dicts on open, so "already done?" is an
+  exact O(1) lookup across every batch ever recorded
+- Entries can carry a version (e.g. file hash) so a changed input is not
+  mistaken for a completed one
+- Small key/value metadata (batch counters, totals) is journaled the same way
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class CheckpointJournal:
+    """Crash-safe JSONL journal of per-item outcomes with O(1) lookups"""
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        self.failed: Dict[str, Dict[str, Any]] = {}
+        self.meta: Dict[str, Any] = {}
+
+        self._lock = threading.Lock()
+        self._replay()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        """Rebuild state from the journal; the last record for an item wins"""
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'r+b') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                # Drop a torn last line so the next append starts on a fresh line
+                data = data[:data.rfind(b'\n') + 1]
+                f.truncate(len(data))
+
+        for line in data.decode('utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Corrupted line from an earlier crash
+            self._apply(entry)
+
+    def _apply(self, entry: Dict[str, Any]):
+        status = entry.get('status')
+        if status == 'meta':
+            self.meta[entry['key']] = entry.get('value')
+        elif status == 'completed':
+            self.failed.pop(entry['id'], None)
+            self.completed[entry['id']] = entry
+        elif status == 'failed':
+            self.completed.pop(entry['id'], None)
+            self.failed[entry['id']] = entry
+
+    def _append(self, entries: List[Dict[str, Any]]):
+        """Write entries as one chunk and make them durable before returning"""
+        if not entries:
+            return
+
+        with self._lock:
+            self._file.write(''.join(json.dumps(e, default=str) + '\n' for e in entries))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            for entry in entries:
+                self._apply(entry)
+
+    @staticmethod
+    def _entry(status: str, item_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {'status': status, 'id': str(item_id), 'at': datetime.now().isoformat(), **data}
+
+    def mark_completed(self, item_id: str, version: Optional[str] = None, **data):
+        """Record a successfully processed item"""
+        if version is not None:
+            data['version'] = version
+        self._append([self._entry('completed', item_id, data)])
+
+    def mark_completed_many(self, item_ids: Iterable[str], versions: Optional[Dict[str, str]] = None, **data):
+        """Record several items with a single write + fsync"""
+        entries = []
+        for item_id in item_ids:
+            entry_data = dict(data)
+            if versions and item_id in versions:
+                entry_data['version'] = versions[item_id]
+            entries.append(self._entry('completed', item_id, entry_data))
+        self._append(entries)
+
+    def mark_failed(self, item_id: str, error: str = "", **data):
+        """Record a failed item (a later mark_completed clears it)"""
+        self._append([self._entry('failed', item_id, {'error': str(error), **data})])
+
+    def mark_failed_many(self, item_ids: Iterable[str], error: str = "", **data):
+        self._append([self._entry('failed', i, {'error': str(error), **data}) for i in item_ids])
+
+    def is_completed(self, item_id: str, version: Optional[str] = None) -> bool:
+        """True if the item completed (and, when given, with the same version)"""
+        entry = self.completed.get(str(item_id))
+        if entry is None:
+            return False
+        return version is None or entry.get('version') == version
+
+    def is_failed(self, item_id: str) -> bool:
+        return str(item_id) in self.failed
+
+    def completed_items(self, **filters) -> List[str]:
+        """Completed item ids, optionally filtered on recorded fields"""
+        return [
+            item_id for item_id, entry in self.completed.items()
+            if all(entry.get(k) == v for k, v in filters.items())
+        ]
+
+    def set_meta(self, key: str, value: Any):
+        self._append([{'status': 'meta', 'key': key, 'value': value, 'at': datetime.now().isoformat()}])
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        return self.meta.get(key, default)
+
+    def compact(self):
+        """Rewrite the journal with only the current state (atomic replace)"""
+        with self._lock:
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for key, value in self.meta.items():
+                    f.write(json.dumps({'status': 'meta', 'key': key, 'value': value}, default=str) + '\n')
+                for entry in list(self.completed.values()) + list(self.failed.values()):
+                    f.write(json.dumps(entry, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def reset(self):
+        """Forget all recorded state"""
+        with self._lock:
+            self._file.close()
+            self.path.unlink(missing_ok=True)
+            self.completed.clear()
+            self.failed.clear()
+            self.meta.clear()
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Pooled Database Writer for the Processing Pipelines
+
+Replaces the per-row `psycopg2.connect` pattern (TLS handshake + auth for
+every module) with:
+- One connection pool per connection string, shared by all processors;
+  borrowers wait for a free connection, and connections that sat idle are
+  checked before being lent (Neon drops idle connections server-side)
+- Row buffers that are flushed with `execute_values` as a single
+  INSERT ... ON CONFLICT DO UPDATE, in one transaction per batch; a
+  dropped connection is retried once, and a batch that still fails is
+  bisected so only the offending rows are rejected
+- A search data version that writers bump in the same transaction, so
+  search result caches invalidate exactly when searchable rows change
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2 import InterfaceError, OperationalError
+from psycopg2.extras import execute_values
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+
+# Errors that mean the connection, not the statement, failed
+CONNECTION_ERRORS = (OperationalError, InterfaceError)
+
+# Connections idle for longer than this are pinged before being lent out
+IDLE_CHECK_SECONDS = 30.0
+
+
+def _is_alive(conn) -> bool:
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except CONNECTION_ERRORS:
+        return False
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool that waits for a free connection
+
+    The plain pool raises PoolError as soon as maxconn connections are
+    lent out; the pipelines' stages, the workflow processors and the
+    search tools all share one pool, so borrowers queue instead. A
+    connection that was idle for IDLE_CHECK_SECONDS is pinged first and
+    replaced if the server has dropped it.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, wait_timeout: float = 120.0, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle_since: Dict[int, float] = {}
+        self.wait_timeout = wait_timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PoolError(f"no connection became free within {self.wait_timeout:.0f}s")
+        try:
+            for _ in range(self.maxconn + 1):
+                conn = super().getconn(key)
+                idle_since = self._idle_since.pop(id(conn), None)
+                stale = idle_since is not None and time.monotonic() - idle_since > IDLE_CHECK_SECONDS
+                if not conn.closed and not (stale and not _is_alive(conn)):
+                    return conn
+                super().putconn(conn, key, close=True)
+            raise PoolError("could not get a live connection")
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            if close or conn.closed:
+                self._idle_since.pop(id(conn), None)
+            else:
+                self._idle_since[id(conn)] = time.monotonic()
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
+_pools: Dict[str, ThreadedConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+# Single-row counter read by the search result caches
+DATA_VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS search_data_version (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL,
+        source TEXT,
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+BUMP_DATA_VERSION_SQL = """
+    INSERT INTO search_data_version (id, version, source, updated_at)
+    VALUES (TRUE, 1, %s, NOW())
+    ON CONFLICT (id) DO UPDATE SET
+        version = search_data_version.version + 1,
+        source = EXCLUDED.source,
+        updated_at = NOW()
+"""
+
+
+def get_pool(conn_string: str, maxconn: int = 4) -> ThreadedConnectionPool:
+    """Get (or create) the shared connection pool for a connection string"""
+    with _pools_lock:
+        pool = _pools.get(conn_string)
+        if pool is None or pool.closed:
+            pool = BlockingConnectionPool(1, maxconn, conn_string)
+            _pools[conn_string] = pool
+        return pool
+
+
+@contextmanager
+def pooled_connection(conn_string: str):
+    """
+    Borrow a pooled connection for one transaction
+
+    Commits on success and rolls back on error. Connections that were
+    dropped by the server are discarded instead of being returned.
+    """
+    pool = get_pool(conn_string)
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def ensure_data_version_table(cur):
+    """Create the search data version table (called from the pipelines' schema setup)"""
+    cur.execute(DATA_VERSION_TABLE_SQL)
+
+
+def bump_data_version(cur, source: str):
+    """
+    Mark searchable data as changed
+
+    Run it on the cursor of the transaction that writes the rows: the new
+    version becomes visible exactly when those rows do.
+    """
+    cur.execute(BUMP_DATA_VERSION_SQL, (source,))
+
+
+class BulkUpserter:
+    """
+    Buffers rows for one table and writes them in a single statement
+
+    Rows sharing a conflict key are collapsed (last one wins) because
+    Postgres rejects an ON CONFLICT DO UPDATE that touches the same row
+    twice in one command. With `version_source` set, each write also bumps
+    the search data version in its transaction.
+    """
+
+    def __init__(self,
+                 conn_string: str,
+                 table: str,
+                 columns: Sequence[str],
+                 conflict_columns: Sequence[str],
+                 touch_columns: Optional[Sequence[str]] = ('processed_at',),
+                 page_size: int = 100,
+                 version_source: Optional[str] = None):
+        self.conn_string = conn_string
+        self.table = table
+        self.version_source = version_source
+        self.columns = list(columns)
+        self.conflict_columns = list(conflict_columns)
+        self.page_size = page_size
+
+        update_sets = [
+            f"{col} = EXCLUDED.{col}" for col in self.columns
+            if col not in self.conflict_columns
+        ]
+        update_sets += [f"{col} = NOW()" for col in (touch_columns or [])]
+
+        self.sql = f"""
+            INSERT INTO {table} ({', '.join(self.columns)})
+            VALUES %s
+            ON CONFLICT ({', '.join(self.conflict_columns)}) DO UPDATE SET
+                {', '.join(update_sets)}
+        """
+
+        self._rows: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: Dict[str, Any]):
+        """Queue a row (dict keyed by column name)"""
+        values = tuple(row[col] for col in self.columns)
+        key = tuple(row[col] for col in self.conflict_columns)
+        with self._lock:
+            self._rows.pop(key, None)  # Keep insertion order of the latest version
+            self._rows[key] = values
+
+    def _write(self, rows: List[tuple]):
+        """One transaction; a dropped connection is retried once on another"""
+        for attempt in range(2):
+            try:
+                with pooled_connection(self.conn_string) as conn:
+                    with conn.cursor() as cur:
+                        execute_values(cur, self.sql, rows, page_size=self.page_size)
+                        if self.version_source:
+                            bump_data_version(cur, self.version_source)
+                return
+            except CONNECTION_ERRORS:
+                if attempt:
+                    raise
+
+    def _write_isolating(self, items: List[Tuple[tuple, tuple]], rejected: Dict[tuple, Exception]) -> int:
+        """Write (key, row) items, bisecting on failure so only bad rows are rejected"""
+        try:
+            self._write([row for _, row in items])
+            return len(items)
+        except CONNECTION_ERRORS as e:
+            # The database is unreachable, not the rows bad: splitting won't help
+            rejected.update((key, e) for key, _ in items)
+            return 0
+        except Exception as e:
+            if len(items) == 1:
+                rejected[items[0][0]] = e
+                return 0
+            middle = len(items) // 2
+            return (self._write_isolating(items[:middle], rejected) +
+                    self._write_isolating(items[middle:], rejected))
+
+    def flush(self) -> Tuple[int, Dict[tuple, Exception]]:
+        """
+        Write all queued rows, in one transaction when they are all valid
+
+        Returns:
+            (rows written, {conflict key: error} for rows that could not be
+            written). A row is rejected when it fails on its own, or when
+            the database stays unreachable after a retry. The queue is empty
+            afterwards.
+        """
+        with self._lock:
+            items = list(self._rows.items())
+            self._rows.clear()
+            if not items:
+                return 0, {}
+
+            rejected: Dict[tuple, Exception] = {}
+            written = self._write_isolating(items, rejected)
+            return written, rejected
+
+    def discard(self):
+        """Drop any queued rows"""
+        with self._lock:
+            self._rows.clear()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Embedding Batcher for the Processing Pipelines
+
+Collects embedding requests from many modules into multi-input OpenAI
+requests instead of sending one request per module:
+- Texts queued within a short window are sent together
+- Each request stays within a token budget and input count
+- Vectors are mapped back to the caller that queued the text
+- A request rejected for its input (too large, invalid text) is split in
+  half and retried, so only the failing sub-batch is resent
+- Rate-limited and transient failures resend the batch unchanged after a
+  wait; they are never split, which would only multiply requests
+- Items that still fail raise instead of returning zero vectors
+- Texts already in the local embedding store are never sent
+- Requests draw from the shared OpenAI rate limiter, which also handles 429s
+"""
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from .rate_limiter import is_rate_limit_error
+
+# Statuses meaning the batch itself was rejected (size/validation), not the service
+INPUT_ERROR_STATUSES = (400, 413, 422)
+
+
+def is_input_error(error: Exception) -> bool:
+    return getattr(error, 'status_code', None) in INPUT_ERROR_STATUSES
+
+
+class EmbeddingBatcher:
+    """Micro-batches embedding requests into token-budgeted multi-input calls"""
+
+    def __init__(self,
+                 openai_client: AsyncOpenAI,
+                 model: str = "text-embedding-3-small",
+                 max_batch_tokens: int = 100000,
+                 max_batch_inputs: int = 256,
+                 max_wait: float = 0.05,
+                 max_retries: int = 2,
+                 semaphore: Optional[asyncio.Semaphore] = None,
+                 cache: Optional[Any] = None,
+                 dimensions: int = 1536,
+                 rate_limiter: Optional[Any] = None):
+        self.openai_client = openai_client
+        self.model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.semaphore = semaphore or asyncio.Semaphore(8)
+        self.cache = cache  # EmbeddingCache, consulted before any request
+        self.dimensions = dimensions
+        self.rate_limiter = rate_limiter  # ProviderRateLimiter for the embeddings endpoint
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        # Stats
+        self.requests_sent = 0
+        self.texts_embedded = 0
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token estimate (~4 characters per token)"""
+        return max(1, len(text) // 4)
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text and wait for its vector"""
+        if self.cache is not None:
+            cached = self.cache.get(self.model, text, self.dimensions)
+            if cached is not None:
+                return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tokens = self.estimate_tokens(text)
+
+        # Start a new batch if this text would push the current one over budget
+        if self._pending and self._pending_tokens + tokens > self.max_batch_tokens:
+            self._flush()
+
+        self._pending.append((text, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_batch_inputs:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts, returning vectors in input order"""
+        return await asyncio.gather(*(self.embed(text) for text in texts))
+
+    def _flush(self):
+        """Send everything queued so far as one batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._pending:
+            return
+
+        batch = self._pending
+        self._pending = []
+        self._pending_tokens = 0
+
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]], attempt: int = 0):
+        """Send one batch, bisecting on input errors and retrying otherwise"""
+        texts = [text for text, _ in batch]
+
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(sum(self.estimate_tokens(t) for t in texts))
+            async with self.semaphore:
+                response = await self.openai_client.embeddings.create(
+                    input=texts,
+                    model=self.model
+                )
+            self.requests_sent += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.report_success()
+
+            # Results carry their input index; don't rely on response order
+            vectors = [None] * len(texts)
+            for item in response.data:
+                vectors[item.index] = item.embedding
+
+            for (text, future), vector in zip(batch, vectors):
+                if future.done():
+                    continue
+                if vector is None:
+                    future.set_exception(RuntimeError("No embedding returned for input"))
+                else:
+                    future.set_result(vector)
+                    self.texts_embedded += 1
+                    if self.cache is not None:
+                        self.cache.put(self.model, text, vector)
+
+        except Exception as e:
+            if is_rate_limit_error(e):
+                # A 429 is not the batch's fault: wait and resend as-is
+                if self.rate_limiter is not None:
+                    self.rate_limiter.handle_error(e)
+                if attempt < self.max_retries:
+                    if self.rate_limiter is None:
+                        await asyncio.sleep(2 ** attempt)  # Otherwise the next acquire() waits
+                    await self._send(batch, attempt + 1)
+                else:
+                    self._fail(batch, e)
+            elif is_input_error(e):
+                if len(batch) > 1:
+                    # Retry each half separately so one bad input doesn't sink the rest
+                    middle = len(batch) // 2
+                    print(f"Embedding batch of {len(batch)} rejected ({e}), retrying in halves")
+                    await asyncio.gather(
+                        self._send(batch[:middle], attempt),
+                        self._send(batch[middle:], attempt)
+                    )
+                else:
+                    self._fail(batch, e)
+            elif attempt < self.max_retries:
+                # Server errors and timeouts: back off, the limiter only paces 429s
+                await asyncio.sleep(2 ** attempt)
+                await self._send(batch, attempt + 1)
+            else:
+                self._fail(batch, e)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[str, asyncio.Future]], error: Exception):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
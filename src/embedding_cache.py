@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Local Embedding Store
+
+Embedding vectors are a pure function of (model, dimensions, text), so a
+byte-identical `embedding_text` never needs to go back to OpenAI:
+- Vectors are stored as float32 rows in a memory-mapped file per dimension
+- A SQLite index maps (model, dimensions, sha256(text)) to the row
+- Re-embedding the corpus after a partial change only pays for the rows
+  whose text changed
+- Writers reserve rows inside a SQLite write transaction, so processes
+  sharing the directory never claim the same row
+
+Set EMBEDDING_CACHE_BYPASS=1 to force fresh embeddings.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "flopy_expert" / "embeddings"
+
+
+class EmbeddingCache:
+    """float32 memmap vector store indexed by (model, dimensions, text hash)"""
+
+    def __init__(self,
+                 cache_dir: Optional[Path] = None,
+                 initial_capacity: int = 4096,
+                 bypass: bool = False):
+        self.cache_dir = Path(cache_dir or os.environ.get('EMBEDDING_CACHE_DIR', DEFAULT_CACHE_DIR))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.initial_capacity = initial_capacity
+        self.bypass = bypass or os.environ.get('EMBEDDING_CACHE_BYPASS') == '1'
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._maps: Dict[int, np.memmap] = {}
+
+        self._conn = sqlite3.connect(str(self.cache_dir / "index.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (model, dimensions, text_hash)
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _vector_file(self, dimensions: int) -> Path:
+        return self.cache_dir / f"vectors_{dimensions}.f32"
+
+    def _row_count(self, dimensions: int) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM vectors WHERE dimensions = ?", (dimensions,)
+        ).fetchone()[0]
+
+    def _vectors(self, dimensions: int, min_rows: int = 0) -> np.memmap:
+        """Memory-map the vector file for a dimension, growing it if needed"""
+        vectors = self._maps.get(dimensions)
+        if vectors is not None and vectors.shape[0] >= min_rows:
+            return vectors
+
+        path = self._vector_file(dimensions)
+        row_bytes = dimensions * 4
+        current_rows = path.stat().st_size // row_bytes if path.exists() else 0
+
+        if current_rows < max(min_rows, 1):
+            # Grow geometrically so appends stay cheap
+            new_rows = max(self.initial_capacity, current_rows * 2, min_rows)
+            if vectors is not None:
+                vectors.flush()
+                del self._maps[dimensions]
+            with open(path, 'ab') as f:
+                f.truncate(new_rows * row_bytes)
+            current_rows = new_rows
+
+        vectors = np.memmap(path, dtype=np.float32, mode='r+', shape=(current_rows, dimensions))
+        self._maps[dimensions] = vectors
+        return vectors
+
+    def get(self, model: str, text: str, dimensions: int = 1536) -> Optional[List[float]]:
+        """Return the stored vector for this text, or None"""
+        if self.bypass:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT row FROM vectors WHERE model = ? AND dimensions = ? AND text_hash = ?",
+                (model, dimensions, self.text_hash(text))
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            # Another process may have appended past our mapping
+            return self._vectors(dimensions, min_rows=row[0] + 1)[row[0]].tolist()
+
+    def get_many(self, model: str, texts: Sequence[str], dimensions: int = 1536) -> List[Optional[List[float]]]:
+        """Look up several texts; misses come back as None"""
+        return [self.get(model, text, dimensions) for text in texts]
+
+    def put(self, model: str, text: str, vector: Sequence[float]):
+        """Store a vector (dimensions are taken from the vector itself)"""
+        if self.bypass:
+            return
+
+        dimensions = len(vector)
+        key = (model, dimensions, self.text_hash(text))
+
+        with self._lock:
+            # The write lock is held from choosing the row until the index entry
+            # commits, so other processes wait instead of claiming the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._conn.execute(
+                    "SELECT row FROM vectors WHERE model = ? AND dimensions = ? AND text_hash = ?", key
+                ).fetchone()
+                row = existing[0] if existing else self._row_count(dimensions)
+
+                vectors = self._vectors(dimensions, min_rows=row + 1)
+                vectors[row] = np.asarray(vector, dtype=np.float32)
+                vectors.flush()
+
+                if not existing:
+                    self._conn.execute(
+                        "INSERT INTO vectors (model, dimensions, text_hash, row) VALUES (?, ?, ?, ?)",
+                        (*key, row)
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def get_or_compute(self,
+                       model: str,
+                       text: str,
+                       compute: Callable[[], Sequence[float]],
+                       dimensions: int = 1536) -> List[float]:
+        """Return the stored vector or compute, store and return it"""
+        vector = self.get(model, text, dimensions)
+        if vector is None:
+            vector = list(compute())
+            self.put(model, text, vector)
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+
+_shared_caches: Dict[str, EmbeddingCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_embedding_cache(cache_dir: Optional[Path] = None) -> EmbeddingCache:
+    """Get the process-wide embedding store for a directory"""
+    path = str(Path(cache_dir or os.environ.get('EMBEDDING_CACHE_DIR', DEFAULT_CACHE_DIR)))
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = EmbeddingCache(path)
+        return _shared_caches[path]
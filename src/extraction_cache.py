@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Workflow Extraction Cache
+
+Tutorial/notebook extraction is pure CPU work on the file content, yet
+every run re-parsed every file serially. Extracted workflow objects are
+now cached in SQLite, keyed by (extractor, file path) and validated
+against the extractor version and the file's sha256:
+- Unchanged files are loaded from the cache (one pickle load each)
+- Changed or new files are extracted, in a process pool when several
+  need it (cold runs), then stored
+- Failed extractions are not cached, so they are retried next run
+- Bumping an extractor's version invalidates all of its entries
+
+Bypass with EXTRACTION_CACHE_BYPASS=1.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "flopy_expert" / "extractions.sqlite"
+
+
+def file_sha256(path: Path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite cache of pickled extraction results, one entry per (extractor, path)"""
+
+    def __init__(self, db_path: Optional[Path] = None, bypass: bool = False):
+        self.db_path = Path(db_path or os.environ.get('EXTRACTION_CACHE_PATH', DEFAULT_CACHE_PATH))
+        self.bypass = bypass or os.environ.get('EXTRACTION_CACHE_BYPASS') == '1'
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                extractor TEXT NOT NULL,
+                path TEXT NOT NULL,
+                version TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (extractor, path)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, extractor: str, version: str, path: Path, sha256: str) -> Optional[Any]:
+        """Cached result for this exact file content and extractor version"""
+        if self.bypass:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM extractions WHERE extractor = ? AND path = ? AND version = ? AND sha256 = ?",
+                (extractor, str(path), version, sha256)
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        try:
+            result = pickle.loads(row[0])
+        except Exception:
+            self.misses += 1  # Written by an incompatible class definition
+            return None
+
+        self.hits += 1
+        return result
+
+    def put(self, extractor: str, version: str, path: Path, sha256: str, result: Any):
+        """Store a result, replacing the entry for an older version of the file"""
+        if self.bypass:
+            return
+
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO extractions (extractor, path, version, sha256, payload, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (extractor, str(path), version, sha256, payload, time.time()))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+_shared_caches: Dict[str, ExtractionCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_extraction_cache(db_path: Optional[Path] = None) -> ExtractionCache:
+    """Get the process-wide extraction cache for a database path"""
+    path = str(Path(db_path or os.environ.get('EXTRACTION_CACHE_PATH', DEFAULT_CACHE_PATH)))
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = ExtractionCache(Path(path))
+        return _shared_caches[path]
+
+
+def extract_all_cached(paths: Sequence[Path],
+                       extract: Callable[[Path], Optional[Any]],
+                       extractor: str,
+                       version: str,
+                       workers: Optional[int] = None,
+                       cache: Optional[ExtractionCache] = None) -> List[Optional[Any]]:
+    """
+    Extract every path, reusing cached results for unchanged files
+
+    Args:
+        extract: Picklable callable (e.g. a bound extractor method) run on
+            each changed file, returning None on failure
+        extractor / version: Cache namespace and invalidation version
+        workers: Process count for changed files (default: CPU count;
+            1 extracts in this process)
+
+    Returns:
+        Results in the order of `paths`
+    """
+    cache = cache or get_extraction_cache()
+    paths = [Path(p) for p in paths]
+    results: List[Optional[Any]] = [None] * len(paths)
+
+    hashes = {}
+    pending = []
+    for i, path in enumerate(paths):
+        hashes[i] = file_sha256(path)
+        cached = cache.get(extractor, version, path.resolve(), hashes[i])
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    workers = workers or os.cpu_count() or 1
+    if len(pending) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            extracted = list(pool.map(extract, [paths[i] for i in pending]))
+    else:
+        extracted = [extract(paths[i]) for i in pending]
+
+    for i, result in zip(pending, extracted):
+        results[i] = result
+        if result is not None:
+            cache.put(extractor, version, paths[i].resolve(), hashes[i], result)
+
+    return results
@@ -25,6 +25,10 @@ from psycopg2.extras import RealDictCursor
 import google.genai as genai
 from openai import AsyncOpenAI
 
+from .llm_cache import get_llm_cache
+from .embedding_cache import get_embedding_cache
+from .rate_limiter import get_rate_limiter, estimate_tokens
+
 
 @dataclass
 class EmbeddingCheckpoint:
@@ -81,6 +85,14 @@ class FloPyEmbeddingPipelineV02:
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
         self.openai_model = openai_model
         
+        # Analysis responses are cached on disk, keyed by model + prompt
+        self.llm_cache = get_llm_cache()
+        self.embedding_cache = get_embedding_cache()
+        
+        # Shared per-provider rate limits (429s slow these down for every stage)
+        self.gemini_limiter = get_rate_limiter('gemini')
+        self.openai_limiter = get_rate_limiter('openai')
+        
         # Setup logging
         self.logger = self._setup_logging()
         
@@ -282,18 +294,25 @@ Make questions so specific that ONLY someone who has studied THIS EXACT workflow
             formatted_data = self.format_workflow_for_prompt(workflow)
             prompt = prompt_template.format(**formatted_data)
             
-            # Generate with Gemini
-            response = self.gemini_client.models.generate_content(
-                model=self.gemini_model,
-                contents=[prompt]
-            )
+            # Generate with Gemini (unless this exact prompt was answered before)
+            cache_key = self.llm_cache.make_key(self.gemini_model, prompt)
+            raw_text = self.llm_cache.get(cache_key)
+            if raw_text is None:
+                await self.gemini_limiter.acquire(estimate_tokens(prompt))
+                response = self.gemini_client.models.generate_content(
+                    model=self.gemini_model,
+                    contents=[prompt]
+                )
+                self.gemini_limiter.report_success()
+                raw_text = response.text
             
             # Parse JSON response
-            response_text = response.text.strip()
+            response_text = raw_text.strip()
             if response_text.startswith('```json'):
                 response_text = response_text.replace('```json', '').replace('```', '').strip()
             
             analysis_data = json.loads(response_text)
+            self.llm_cache.put(cache_key, self.gemini_model, raw_text)
             
             # Create WorkflowAnalysis object
             analysis = WorkflowAnalysis(
@@ -312,6 +331,7 @@ Make questions so specific that ONLY someone who has studied THIS EXACT workflow
             self.logger.error(f"JSON parsing error for {workflow['tutorial_file']}: {e}")
             return None
         except Exception as e:
+            self.gemini_limiter.handle_error(e)
             self.logger.error(f"Error generating analysis for {workflow['tutorial_file']}: {e}")
             return None
     
@@ -349,14 +369,23 @@ Make questions so specific that ONLY someone who has studied THIS EXACT workflow
         return "\n".join(parts)
     
     async def generate_embedding(self, embedding_text: str) -> Optional[List[float]]:
-        """Generate embedding using OpenAI"""
+        """Generate embedding using OpenAI (reusing stored vectors for identical text)"""
+        cached = self.embedding_cache.get(self.openai_model, embedding_text)
+        if cached is not None:
+            return cached
+        
         try:
+            await self.openai_limiter.acquire(estimate_tokens(embedding_text))
             response = await self.openai_client.embeddings.create(
                 model=self.openai_model,
                 input=embedding_text
             )
-            return response.data[0].embedding
+            self.openai_limiter.report_success()
+            embedding = response.data[0].embedding
+            self.embedding_cache.put(self.openai_model, embedding_text, embedding)
+            return embedding
         except Exception as e:
+            self.openai_limiter.handle_error(e)
             self.logger.error(f"Error generating embedding: {e}")
             return None
     
@@ -12,7 +12,6 @@ Implements Step 2 of our roadmap: Batch Processing with Checkpoints
 """
 import asyncio
 import hashlib
-import json
 import traceback
 from datetime import datetime
 from pathlib import Path
@@ -20,14 +19,20 @@ from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, asdict
 import ast
 import re
-import subprocess
 
-import psycopg2
 from psycopg2.extras import RealDictCursor
 import google.genai as genai
 from openai import AsyncOpenAI
 
 from .flopy_docs_parser import FloPyDocsParser, ModulePattern
+from .git_metadata import GitMetadataProvider
+from .embedding_batcher import EmbeddingBatcher
+from .db_writer import BulkUpserter, pooled_connection, ensure_data_version_table
+from .llm_cache import get_llm_cache
+from .embedding_cache import get_embedding_cache
+from .rate_limiter import configure_rate_limits, get_rate_limiter, estimate_tokens
+from .stage_pipeline import Stage, StagePipeline
+from .checkpoint_journal import CheckpointJournal
 
 
 @dataclass
@@ -81,7 +86,12 @@ class FloPyProcessor:
                  openai_api_key: str,
                  batch_size: int = 10,
                  gemini_model: str = "gemini-2.5-flash",
-                 openai_model: str = "text-embedding-3-small"):
+                 openai_model: str = "text-embedding-3-small",
+                 max_workers: int = 1,
+                 provider_limits: Optional[Dict[str, int]] = None,
+                 rate_limits: Optional[Dict[str, Dict[str, int]]] = None,
+                 streaming: bool = False,
+                 stage_workers: Optional[Dict[str, int]] = None):
         self.repo_path = Path(repo_path)
         self.neon_conn = neon_conn_string
         self.batch_size = batch_size
@@ -92,13 +102,73 @@ class FloPyProcessor:
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
         self.openai_model = openai_model
         
+        # Concurrency settings - max_workers=1 keeps the original serial behaviour,
+        # larger values overlap Gemini, OpenAI and DB work across the files of a batch
+        self.max_workers = max(1, max_workers)
+        self.provider_limits = {'gemini': 4, 'openai': 8, 'database': 4}
+        if provider_limits:
+            self.provider_limits.update(provider_limits)
+        self._provider_semaphores = {
+            provider: asyncio.Semaphore(limit)
+            for provider, limit in self.provider_limits.items()
+        }
+        
+        # Streaming mode runs parse -> analyze -> embed -> write as concurrent stages
+        # with bounded queues instead of finishing each batch before the next
+        self.streaming = streaming
+        self.stage_workers = {
+            'parse': 2,
+            'analyze': self.provider_limits['gemini'],
+            'embed': self.provider_limits['openai'],
+        }
+        if stage_workers:
+            self.stage_workers.update(stage_workers)
+        
+        # Requests/tokens per minute per provider, shared by every stage in the process
+        configure_rate_limits(rate_limits)
+        
+        # Embedding requests from all modules are coalesced into multi-input calls
+        self.embedding_batcher = EmbeddingBatcher(
+            self.openai_client,
+            model=self.openai_model,
+            semaphore=self._provider_semaphores['openai'],
+            cache=get_embedding_cache(),
+            rate_limiter=get_rate_limiter('openai')
+        )
+        
+        # Analysis responses are cached on disk, keyed by model + prompt
+        self.llm_cache = get_llm_cache()
+        
+        # Shared per-provider rate limits pace the API calls instead of fixed sleeps
+        self.gemini_limiter = get_rate_limiter('gemini')
+        
         # Initialize docs parser
         self.docs_parser = FloPyDocsParser(repo_path)
         
+        # Git metadata is resolved once per run, not per module
+        self.git_metadata = GitMetadataProvider(repo_path)
+        
         # Create checkpoints directory
         self.checkpoints_dir = self.repo_path / "processing_checkpoints"
         self.checkpoints_dir.mkdir(exist_ok=True)
         
+        # Append-only journal of completed/failed files across all batches and runs
+        self.journal = CheckpointJournal(self.checkpoints_dir / "journal.jsonl")
+        
+        # Module rows are buffered and upserted once per batch over a pooled connection
+        self.module_writer = BulkUpserter(
+            neon_conn_string,
+            table='flopy_modules',
+            columns=[
+                'file_path', 'relative_path', 'model_family', 'package_code',
+                'module_docstring', 'source_code', 'semantic_purpose', 'user_scenarios',
+                'related_concepts', 'typical_errors', 'embedding_text', 'embedding',
+                'file_hash', 'last_modified'
+            ],
+            conflict_columns=['file_path'],
+            version_source='flopy_modules'
+        )
+        
         # Ensure database tables exist
         self._ensure_tables_exist()
     
@@ -185,7 +255,7 @@ class FloPyProcessor:
         ]
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
+            with pooled_connection(self.neon_conn) as conn:
                 with conn.cursor() as cur:
                     # Create tables
                     for schema in table_schemas:
@@ -195,7 +265,9 @@ class FloPyProcessor:
                     for index in index_schemas:
                         cur.execute(index)
                     
-                    conn.commit()
+                    # Search caches key on this; writes below bump it
+                    ensure_data_version_table(cur)
+                    
                     print("✅ Database tables and indexes ready")
                     
         except Exception as e:
@@ -206,43 +278,42 @@ class FloPyProcessor:
         """Calculate SHA256 hash of file content"""
         return hashlib.sha256(file_path.read_bytes()).hexdigest()
     
-    def get_git_info(self) -> Dict[str, Any]:
-        """Get current git information from repository"""
+    def load_hash_manifest(self, file_paths: Optional[List[str]] = None) -> Dict[str, str]:
+        """Fetch the stored file hash of every module (or just `file_paths`) in a single query"""
         try:
-            # Get current commit hash
-            commit_hash = subprocess.check_output(
-                ['git', 'rev-parse', 'HEAD'], 
-                cwd=self.repo_path
-            ).decode().strip()
-            
-            # Get current branch
-            branch = subprocess.check_output(
-                ['git', 'branch', '--show-current'], 
-                cwd=self.repo_path
-            ).decode().strip()
-            
-            # Get commit date
-            commit_date_str = subprocess.check_output(
-                ['git', 'show', '-s', '--format=%ci', 'HEAD'], 
-                cwd=self.repo_path
-            ).decode().strip()
-            
-            # Parse the date string
-            commit_date = datetime.strptime(commit_date_str.split()[0] + ' ' + commit_date_str.split()[1], 
-                                          '%Y-%m-%d %H:%M:%S')
-            
-            return {
-                'commit_hash': commit_hash,
-                'branch': branch or 'detached',
-                'commit_date': commit_date
-            }
+            with pooled_connection(self.neon_conn) as conn:
+                with conn.cursor() as cur:
+                    if file_paths is None:
+                        cur.execute("SELECT file_path, file_hash FROM flopy_modules")
+                    else:
+                        cur.execute(
+                            "SELECT file_path, file_hash FROM flopy_modules WHERE file_path = ANY(%s)",
+                            (list(file_paths),)
+                        )
+                    return dict(cur.fetchall())
         except Exception as e:
-            print(f"Warning: Could not get git info: {e}")
-            return {
-                'commit_hash': None,
-                'branch': None,
-                'commit_date': None
-            }
+            print(f"Warning: Could not load stored file hashes: {e}")
+            return {}
+    
+    def filter_changed_files(self, 
+                             files: List[Tuple[Path, ModulePattern]], 
+                             manifest: Dict[str, str]) -> List[Tuple[Path, ModulePattern]]:
+        """Keep only files that are new or whose SHA256 differs from the stored row"""
+        return [
+            (file_path, item) for file_path, item in files
+            if manifest.get(str(file_path)) != self.get_file_hash(file_path)
+        ]
+    
+    def split_unchanged(self, 
+                        batch: List[Tuple[Path, ModulePattern]]) -> Tuple[List[Tuple[Path, ModulePattern]], List[str]]:
+        """Split a batch into the files to process and the paths whose stored hash still matches"""
+        changed = self.filter_changed_files(batch, self.load_hash_manifest([str(f) for f, _ in batch]))
+        changed_paths = {str(f) for f, _ in changed}
+        return changed, [str(f) for f, _ in batch if str(f) not in changed_paths]
+    
+    def get_git_info(self) -> Dict[str, Any]:
+        """Get current git information from repository"""
+        return self.git_metadata.head_info()
     
     def extract_module_info(self, file_path: Path, pattern: ModulePattern) -> ModuleInfo:
         """Extract basic information from a Python module"""
@@ -252,8 +323,8 @@ class FloPyProcessor:
         # Extract package code from filename
         package_code = self._extract_package_code(file_path)
         
-        # Get git information
-        git_info = self.get_git_info()
+        # Get git information (last commit touching this file)
+        git_info = self.git_metadata.file_info(file_path)
         
         # Parse AST to extract docstring, imports, classes, functions
         try:
@@ -401,18 +472,28 @@ Focus on practical modeling applications and real-world usage patterns.
 """
         
         max_retries = 3
-        retry_delay = 2  # seconds
+        
+        cache_key = self.llm_cache.make_key(self.gemini_model, prompt)
+        cached_text = self.llm_cache.get(cache_key)
         
         for attempt in range(max_retries):
             try:
-                response = await asyncio.to_thread(
-                    self.gemini_client.models.generate_content,
-                    model=self.gemini_model,
-                    contents=prompt
-                )
-                
-                # Parse markdown response
-                text = response.text
+                if cached_text is not None:
+                    # Replay a cached response; a live call follows if it no longer parses
+                    text, cached_text = cached_text, None
+                else:
+                    await self.gemini_limiter.acquire(estimate_tokens(prompt))
+                    async with self._provider_semaphores['gemini']:
+                        response = await asyncio.to_thread(
+                            self.gemini_client.models.generate_content,
+                            model=self.gemini_model,
+                            contents=prompt
+                        )
+                    
+                    self.gemini_limiter.report_success()
+                    
+                    # Parse response
+                    text = response.text
                 
                 # Extract sections using regex
                 purpose_match = re.search(r'## Purpose\s*\n(.+?)(?=\n## |$)', text, re.DOTALL)
@@ -451,6 +532,8 @@ Focus on practical modeling applications and real-world usage patterns.
                     print(f"  Warning: No user scenarios extracted, using defaults")
                     scenarios = ["General module usage", "Integration with other packages"]
                 
+                self.llm_cache.put(cache_key, self.gemini_model, text)
+                
                 return SemanticAnalysis(
                     semantic_purpose=purpose,
                     user_scenarios=scenarios,
@@ -460,10 +543,12 @@ Focus on practical modeling applications and real-world usage patterns.
                 
             except Exception as e:
                 print(f"Gemini attempt {attempt + 1}/{max_retries} failed for {module_info.relative_path}: {e}")
+                # 429s slow the shared limiter down (the next acquire() waits);
+                # other failures such as 5xx or timeouts back off here
+                delay = self.gemini_limiter.retry_delay(e, attempt, base_delay=2)
                 if attempt < max_retries - 1:
-                    print(f"  Retrying in {retry_delay} seconds...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
+                    print(f"  Retrying in {delay:.0f} seconds..." if delay else "  Retrying...")
+                    await asyncio.sleep(delay)
                 else:
                     print(f"  All retries exhausted. Using fallback analysis.")
                     return self._create_fallback_analysis(module_info)
@@ -549,159 +634,210 @@ Focus on practical modeling applications and real-world usage patterns.
         combined_text = " ".join(filter(None, text_parts))
         
         try:
-            response = await self.openai_client.embeddings.create(
-                input=combined_text,
-                model=self.openai_model
-            )
-            return response.data[0].embedding, combined_text
+            embedding = await self.embedding_batcher.embed(combined_text)
+            return embedding, combined_text
             
         except Exception as e:
+            # No zero-vector fallback - the module is marked failed and retried next run
             print(f"Embedding creation failed for {module_info.relative_path}: {e}")
-            # Return zero vector as fallback
-            return [0.0] * 1536, combined_text
+            raise
     
     def save_to_database(self, 
                         module_info: ModuleInfo, 
                         semantic_analysis: SemanticAnalysis, 
                         embedding: List[float],
                         embedding_text: str) -> bool:
-        """Save processed module to database"""
+        """
+        Queue a processed module for the next bulk write
+        
+        Unchanged files are filtered out by the hash manifest before analysis,
+        so anything reaching here is written. Rows are committed by
+        flush_database_writes() at the end of each batch.
+        """
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
-                with conn.cursor() as cur:
-                    # Check if module already exists
-                    cur.execute(
-                        "SELECT id, file_hash FROM flopy_modules WHERE file_path = %s",
-                        (module_info.file_path,)
-                    )
-                    existing = cur.fetchone()
-                    
-                    if existing and existing[1] == module_info.file_hash:
-                        print(f"Skipping {module_info.relative_path} - unchanged")
-                        return True
-                    
-                    # Insert or update module
-                    sql = """
-                        INSERT INTO flopy_modules (
-                            file_path, relative_path, model_family, package_code,
-                            module_docstring, source_code, semantic_purpose,
-                            user_scenarios, related_concepts, typical_errors,
-                            embedding_text, embedding, file_hash, last_modified
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        ) ON CONFLICT (file_path) DO UPDATE SET
-                            relative_path = EXCLUDED.relative_path,
-                            model_family = EXCLUDED.model_family,
-                            package_code = EXCLUDED.package_code,
-                            module_docstring = EXCLUDED.module_docstring,
-                            source_code = EXCLUDED.source_code,
-                            semantic_purpose = EXCLUDED.semantic_purpose,
-                            user_scenarios = EXCLUDED.user_scenarios,
-                            related_concepts = EXCLUDED.related_concepts,
-                            typical_errors = EXCLUDED.typical_errors,
-                            embedding_text = EXCLUDED.embedding_text,
-                            embedding = EXCLUDED.embedding,
-                            file_hash = EXCLUDED.file_hash,
-                            last_modified = EXCLUDED.last_modified,
-                            processed_at = NOW()
-                    """
-                    
-                    # Read source code
-                    source_code = Path(module_info.file_path).read_text(encoding='utf-8')
-                    
-                    cur.execute(sql, (
-                        module_info.file_path,
-                        module_info.relative_path,
-                        module_info.model_family,
-                        module_info.package_code,
-                        module_info.module_docstring,
-                        source_code,
-                        semantic_analysis.semantic_purpose,
-                        semantic_analysis.user_scenarios,
-                        semantic_analysis.related_concepts,
-                        semantic_analysis.typical_errors,
-                        embedding_text,
-                        embedding,
-                        module_info.file_hash,
-                        module_info.last_modified
-                    ))
-                    
-                    conn.commit()
-                    return True
-                    
+            # Read source code
+            source_code = Path(module_info.file_path).read_text(encoding='utf-8')
+            
+            self.module_writer.add({
+                'file_path': module_info.file_path,
+                'relative_path': module_info.relative_path,
+                'model_family': module_info.model_family,
+                'package_code': module_info.package_code,
+                'module_docstring': module_info.module_docstring,
+                'source_code': source_code,
+                'semantic_purpose': semantic_analysis.semantic_purpose,
+                'user_scenarios': semantic_analysis.user_scenarios,
+                'related_concepts': semantic_analysis.related_concepts,
+                'typical_errors': semantic_analysis.typical_errors,
+                'embedding_text': embedding_text,
+                'embedding': embedding,
+                'file_hash': module_info.file_hash,
+                'last_modified': module_info.last_modified,
+            })
+            return True
+            
         except Exception as e:
             print(f"Database save failed for {module_info.relative_path}: {e}")
             return False
     
-    def save_checkpoint(self, checkpoint: ProcessingCheckpoint):
-        """Save processing checkpoint to disk"""
-        checkpoint_file = self.checkpoints_dir / f"checkpoint_{checkpoint.model_family}_{checkpoint.batch_id}.json"
+    def flush_database_writes(self) -> List[str]:
+        """
+        Write all queued modules over a pooled connection
         
-        # Convert dataclass to dict and handle datetime serialization
-        checkpoint_data = asdict(checkpoint)
-        checkpoint_data['timestamp'] = checkpoint.timestamp.isoformat()
+        Returns the file paths whose rows could not be written; a bad row
+        or an unreachable database fails only those modules.
+        """
+        written, rejected = self.module_writer.flush()
+        if written:
+            print(f"  💾 Wrote {written} modules to flopy_modules")
+        for (file_path,), error in rejected.items():
+            print(f"Database write failed for {file_path}: {error}")
+        return [file_path for (file_path,) in rejected]
+    
+    def save_checkpoint(self, checkpoint: ProcessingCheckpoint):
+        """Append a batch's outcomes to the checkpoint journal"""
+        # File hashes let resume tell a completed file from one edited since
+        versions = {}
+        for file_path in checkpoint.completed_files:
+            try:
+                versions[file_path] = self.get_file_hash(Path(file_path))
+            except OSError:
+                pass
         
-        checkpoint_file.write_text(json.dumps(checkpoint_data, indent=2))
-        print(f"Checkpoint saved: {checkpoint_file}")
+        self.journal.mark_completed_many(
+            checkpoint.completed_files, versions=versions,
+            model_family=checkpoint.model_family, batch_id=checkpoint.batch_id
+        )
+        self.journal.mark_failed_many(
+            checkpoint.failed_files, model_family=checkpoint.model_family, batch_id=checkpoint.batch_id
+        )
+        self.journal.set_meta(checkpoint.model_family, {
+            'batch_id': checkpoint.batch_id,
+            'total_processed': checkpoint.total_processed,
+            'timestamp': checkpoint.timestamp.isoformat()
+        })
+        print(f"Checkpoint saved: batch {checkpoint.batch_id} -> {self.journal.path.name}")
     
     def load_checkpoint(self, model_family: str) -> Optional[ProcessingCheckpoint]:
-        """Load the latest checkpoint for a model family"""
-        checkpoints = list(self.checkpoints_dir.glob(f"checkpoint_{model_family}_*.json"))
-        
-        if not checkpoints:
+        """Rebuild the resume point for a model family from the journal"""
+        progress = self.journal.get_meta(model_family)
+        if not progress:
             return None
         
-        # Find latest checkpoint
-        latest = max(checkpoints, key=lambda p: p.stat().st_mtime)
-        
+        return ProcessingCheckpoint(
+            batch_id=progress['batch_id'],
+            completed_files=self.journal.completed_items(model_family=model_family),
+            failed_files=[f for f, entry in self.journal.failed.items() if entry.get('model_family') == model_family],
+            timestamp=datetime.fromisoformat(progress['timestamp']),
+            total_processed=progress['total_processed'],
+            model_family=model_family
+        )
+    
+    def is_file_completed(self, file_path: Path) -> bool:
+        """O(1) journal lookup; a file edited since it completed counts as pending"""
+        if not self.journal.is_completed(str(file_path)):
+            return False
+        return self.journal.is_completed(str(file_path), version=self.get_file_hash(file_path))
+    
+    async def analyze_file(self, 
+                          file_path: Path, 
+                          pattern: ModulePattern) -> Optional[Tuple[ModuleInfo, SemanticAnalysis]]:
+        """Extract module info and run semantic analysis for a single file"""
         try:
-            data = json.loads(latest.read_text())
-            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-            return ProcessingCheckpoint(**data)
+            print(f"  Processing {file_path.relative_to(self.repo_path)}...")
+            
+            # Extract module info (file reads and git calls block, keep them off the loop)
+            module_info = await asyncio.to_thread(self.extract_module_info, file_path, pattern)
+            
+            # Semantic analysis with Gemini (or fallback if disabled)
+            enable_gemini = getattr(self, 'enable_gemini', True)
+            semantic_analysis = await self.analyze_with_gemini(module_info, enable_gemini=enable_gemini)
+            
+            return module_info, semantic_analysis
+            
         except Exception as e:
-            print(f"Failed to load checkpoint {latest}: {e}")
+            print(f"    ✗ Error processing {file_path.name}: {e}")
+            traceback.print_exc()
             return None
     
+    async def embed_and_save(self, 
+                            module_info: ModuleInfo, 
+                            semantic_analysis: SemanticAnalysis) -> bool:
+        """Embed an analyzed module (batched with other modules) and save it"""
+        try:
+            # Create embedding
+            embedding, embedding_text = await self.create_embedding(module_info, semantic_analysis)
+            
+            # Save to database
+            async with self._provider_semaphores['database']:
+                saved = await asyncio.to_thread(
+                    self.save_to_database, module_info, semantic_analysis, embedding, embedding_text
+                )
+            
+            if saved:
+                print(f"    ✓ Queued {module_info.package_code or 'module'}")
+            else:
+                print(f"    ✗ Failed to save {module_info.relative_path}")
+            return saved
+            
+        except Exception as e:
+            print(f"    ✗ Error processing {module_info.relative_path}: {e}")
+            return False
+    
+    async def process_file(self, file_path: Path, pattern: ModulePattern) -> bool:
+        """Run a single file through extract -> Gemini -> embed -> save"""
+        analyzed = await self.analyze_file(file_path, pattern)
+        if analyzed is None:
+            return False
+        return await self.embed_and_save(*analyzed)
+    
     async def process_batch(self, 
                            batch: List[Tuple[Path, ModulePattern]], 
                            batch_id: int, 
-                           model_family: str) -> Tuple[List[str], List[str]]:
-        """Process a batch of files"""
-        completed = []
-        failed = []
+                           model_family: str,
+                           force: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Process a batch of files, up to max_workers at a time
         
+        Files whose stored hash still matches are skipped and reported as
+        completed, unless force is set.
+        """
         print(f"\nProcessing batch {batch_id} ({model_family}): {len(batch)} files")
         
-        for file_path, pattern in batch:
-            try:
-                print(f"  Processing {file_path.relative_to(self.repo_path)}...")
-                
-                # Extract module info
-                module_info = self.extract_module_info(file_path, pattern)
-                
-                # Semantic analysis with Gemini (or fallback if disabled)
-                enable_gemini = getattr(self, 'enable_gemini', True)
-                semantic_analysis = await self.analyze_with_gemini(module_info, enable_gemini=enable_gemini)
-                
-                # Create embedding
-                embedding, embedding_text = await self.create_embedding(module_info, semantic_analysis)
-                
-                # Save to database
-                if self.save_to_database(module_info, semantic_analysis, embedding, embedding_text):
-                    completed.append(str(file_path))
-                    print(f"    ✓ Saved {module_info.package_code or 'module'}")
-                else:
-                    failed.append(str(file_path))
-                    print(f"    ✗ Failed to save")
-                
-                # Small delay to avoid rate limits
-                await asyncio.sleep(0.5)
-                
-            except Exception as e:
-                failed.append(str(file_path))
-                print(f"    ✗ Error processing {file_path.name}: {e}")
-                traceback.print_exc()
+        queued = batch
+        if not force:
+            batch, unchanged = await asyncio.to_thread(self.split_unchanged, batch)
+            if unchanged:
+                print(f"  Unchanged modules skipped: {len(unchanged)}")
+        
+        if self.max_workers == 1:
+            analyzed = []
+            for file_path, pattern in batch:
+                analyzed.append(await self.analyze_file(file_path, pattern))
+            
+            # Embed the whole batch together so it goes out as one request
+            async def finish(item) -> bool:
+                return item is not None and await self.embed_and_save(*item)
+            
+            results = await asyncio.gather(*(finish(item) for item in analyzed))
+        else:
+            worker_slots = asyncio.Semaphore(self.max_workers)
+            
+            async def run(file_path: Path, pattern: ModulePattern) -> bool:
+                async with worker_slots:
+                    return await self.process_file(file_path, pattern)
+            
+            results = await asyncio.gather(*(run(f, p) for f, p in batch))
+        
+        # Commit the batch's rows; only rows the database rejected fail
+        async with self._provider_semaphores['database']:
+            rejected = set(await asyncio.to_thread(self.flush_database_writes))
+        succeeded = {str(f): ok and str(f) not in rejected for (f, _), ok in zip(batch, results)}
+        
+        # Keep batch order so checkpoints match the serial run (unchanged files count as done)
+        completed = [str(f) for f, _ in queued if succeeded.get(str(f), True)]
+        failed = [str(f) for f, _ in queued if not succeeded.get(str(f), True)]
         
         return completed, failed
     
@@ -722,16 +858,21 @@ Focus on practical modeling applications and real-world usage patterns.
             start_batch = checkpoint.batch_id + 1
             total_processed = checkpoint.total_processed
             
-            # Filter out already completed files
-            completed_set = set(checkpoint.completed_files)
-            files = [(f, p) for f, p in files if str(f) not in completed_set]
+            # Filter out every file the journal has recorded as completed
+            files = [(f, p) for f, p in files if not self.is_file_completed(f)]
+        
+        if self.streaming:
+            total_processed = await self.stream_model_family(model_family, files, start_batch, total_processed)
+            print(f"\n{model_family.upper()} processing complete: {total_processed} modules processed")
+            return
         
         # Process in batches
         for i in range(0, len(files), self.batch_size):
             batch_id = start_batch + (i // self.batch_size)
             batch = files[i:i + self.batch_size]
             
-            completed, failed = await self.process_batch(batch, batch_id, model_family)
+            # process_all has already dropped unchanged files from the queue
+            completed, failed = await self.process_batch(batch, batch_id, model_family, force=True)
             total_processed += len(completed)
             
             # Save checkpoint
@@ -746,13 +887,90 @@ Focus on practical modeling applications and real-world usage patterns.
             self.save_checkpoint(checkpoint)
             
             print(f"Batch {batch_id} complete: {len(completed)} success, {len(failed)} failed")
-            
-            # Longer delay between batches
-            await asyncio.sleep(2)
         
         print(f"\n{model_family.upper()} processing complete: {total_processed} modules processed")
     
-    async def process_all(self):
+    async def stream_model_family(self, 
+                                  model_family: str, 
+                                  files: List[Tuple[Path, ModulePattern]], 
+                                  start_batch: int = 0, 
+                                  total_processed: int = 0) -> int:
+        """
+        Process files through concurrent parse -> analyze -> embed -> write stages
+        
+        Each DB flush of batch_size modules is one checkpoint batch. Returns the
+        updated total of processed modules.
+        """
+        state = {'batch_id': start_batch, 'total': total_processed}
+        failed_files: List[str] = []
+        
+        def on_error(item, stage_name: str, error: Exception):
+            file_path = item[0]
+            failed_files.append(str(file_path))
+            print(f"    ✗ {stage_name} failed for {Path(file_path).name}: {error}")
+        
+        async def parse(item):
+            file_path, pattern = item
+            print(f"  Processing {file_path.relative_to(self.repo_path)}...")
+            module_info = await asyncio.to_thread(self.extract_module_info, file_path, pattern)
+            return file_path, module_info
+        
+        async def analyze(item):
+            file_path, module_info = item
+            enable_gemini = getattr(self, 'enable_gemini', True)
+            semantic_analysis = await self.analyze_with_gemini(module_info, enable_gemini=enable_gemini)
+            return file_path, module_info, semantic_analysis
+        
+        async def embed(item):
+            file_path, module_info, semantic_analysis = item
+            embedding, embedding_text = await self.create_embedding(module_info, semantic_analysis)
+            return file_path, module_info, semantic_analysis, embedding, embedding_text
+        
+        async def write(batch):
+            completed = []
+            failed = failed_files[:]
+            failed_files.clear()
+            
+            for file_path, *row in batch:
+                saved = await asyncio.to_thread(self.save_to_database, *row)
+                (completed if saved else failed).append(str(file_path))
+            
+            # Commit the batch's rows; only rows the database rejected fail
+            rejected = set(await asyncio.to_thread(self.flush_database_writes))
+            failed.extend(f for f in completed if f in rejected)
+            completed = [f for f in completed if f not in rejected]
+            
+            state['total'] += len(completed)
+            self.save_checkpoint(ProcessingCheckpoint(
+                batch_id=state['batch_id'],
+                completed_files=completed,
+                failed_files=failed,
+                timestamp=datetime.now(),
+                total_processed=state['total'],
+                model_family=model_family
+            ))
+            print(f"Batch {state['batch_id']} complete: {len(completed)} success, {len(failed)} failed")
+            state['batch_id'] += 1
+            return completed
+        
+        pipeline = StagePipeline([
+            Stage('parse', parse, workers=self.stage_workers['parse']),
+            Stage('analyze', analyze, workers=self.stage_workers['analyze']),
+            Stage('embed', embed, workers=self.stage_workers['embed']),
+            # Analysis runs at API pace, so a timed batch would hold one module;
+            # flush only full batches (and the remainder at the end of the stream)
+            Stage('write', write, batch_size=self.batch_size, queue_size=self.batch_size * 2, batch_wait=None),
+        ], on_error=on_error)
+        await pipeline.run(files)
+        
+        if failed_files:
+            # No write batch followed these failures to journal them
+            self.journal.mark_failed_many(failed_files, model_family=model_family, batch_id=state['batch_id'])
+            print(f"  {len(failed_files)} modules failed after the last write batch (recorded in the journal)")
+        
+        return state['total']
+    
+    async def process_all(self, force_reprocess: bool = False):
         """Process all documented modules following documentation order"""
         
         print("🚀 Starting FloPy Semantic Database Processing")
@@ -766,6 +984,23 @@ Focus on practical modeling applications and real-world usage patterns.
         
         total_files = sum(len(files) for files in queue.values())
         print(f"Total modules to process: {total_files}")
+        
+        # Hash-first change detection: only new or changed files reach Gemini/OpenAI
+        if not force_reprocess:
+            manifest = self.load_hash_manifest()
+            filtered_queue = {}
+            for key, files in queue.items():
+                changed = self.filter_changed_files(files, manifest)
+                if changed:
+                    filtered_queue[key] = changed
+            queue = filtered_queue
+            changed_files = sum(len(files) for files in queue.values())
+            print(f"Unchanged modules skipped: {total_files - changed_files}, changed or new: {changed_files}")
+        
+        # Resolve per-file git history for every queued module in one pass
+        self.git_metadata.load_file_commits(
+            file_path for files in queue.values() for file_path, _ in files
+        )
         print()
         
         start_time = datetime.now()
@@ -786,6 +1021,8 @@ Focus on practical modeling applications and real-world usage patterns.
         print("🎉 FloPy Semantic Database Processing Complete!")
         print(f"⏱️  Total time: {duration}")
         print(f"📊 Total modules: {total_files}")
+        cache_stats = self.llm_cache.stats()
+        print(f"🗄️  LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
         print("=" * 80)
 
 
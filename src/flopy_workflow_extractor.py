@@ -7,11 +7,92 @@ These files have markdown cells as comments and code cells as Python code.
 """
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Set, Tuple
+from dataclasses import dataclass, field
 import hashlib
 from datetime import datetime
 
+try:
+    from .extraction_cache import extract_all_cached
+except ImportError:  # Imported as a flat module with src/ on sys.path
+    from extraction_cache import extract_all_cached
+
+
+@dataclass
+class TokenScan:
+    """Everything the extractor needs from one piece of text, found in one pass"""
+    package_calls: Set[str] = field(default_factory=set)  # Codes from ModflowXxx( / Mt3dXxx( / .xxx( calls
+    package_codes: Set[str] = field(default_factory=set)  # Bare package codes as whole words
+    functions: Set[str] = field(default_factory=set)      # Identifiers followed by '('
+    keywords: Set[str] = field(default_factory=set)       # Tag keywords found at word starts
+    model_markers: Set[str] = field(default_factory=set)  # Model-type markers (see MODEL_MARKERS)
+    
+    def update(self, other: 'TokenScan'):
+        self.package_calls |= other.package_calls
+        self.package_codes |= other.package_codes
+        self.functions |= other.functions
+        self.keywords |= other.keywords
+        self.model_markers |= other.model_markers
+
+
+class TokenScanner:
+    """
+    Single-pass, token-boundary scanner for packages, calls, tags and model type
+    
+    One precompiled regex walks the identifiers of the text; each token is
+    classified with set lookups and one anchored keyword match. Matching
+    whole tokens instead of substrings avoids false positives such as "OC"
+    inside "LOCATION" or "confined" inside "unconfined".
+    """
+    
+    TOKEN_RE = re.compile(r'(?P<dot>\.)?\b(?P<word>[A-Za-z_]\w*)(?P<call>\s*\()?')
+    
+    # Identifier prefixes that mark a model type (checked in _identify_model_type order)
+    MODEL_MARKERS = ('MFSimulation', 'ModflowGwf', 'ModflowNwt', 'ModflowUsg', 'Mt3d', 'Seawat', 'Modpath', 'mf2005')
+    
+    def __init__(self, packages: Set[str], keywords: List[str]):
+        self.packages = packages
+        # Longest first so "unconfined" wins over "confined"
+        self.keyword_re = re.compile('|'.join(sorted(map(re.escape, keywords), key=len, reverse=True)))
+    
+    def scan(self, text: str) -> TokenScan:
+        result = TokenScan()
+        for match in self.TOKEN_RE.finditer(text):
+            word = match.group('word')
+            
+            if word in self.packages:
+                result.package_codes.add(word)
+            
+            keyword = self.keyword_re.match(word.lower())
+            if keyword:
+                result.keywords.add(keyword.group(0))
+            
+            for marker in self.MODEL_MARKERS:
+                if word.startswith(marker):
+                    result.model_markers.add(marker)
+            
+            if not match.group('call'):
+                continue
+            
+            result.functions.add(word)
+            if word == 'Modflow':
+                result.model_markers.add('Modflow(')
+            
+            # Package instantiations: ModflowGwfWel(, ModflowWel(, Mt3dBtn(, m.dis(
+            code = None
+            if word.startswith('Modflow'):
+                code = word[len('Modflow'):].upper()
+                if code.startswith(('GWF', 'GWT')):
+                    code = code[3:]
+            elif word.startswith('Mt3d'):
+                code = word[len('Mt3d'):].upper()
+            elif match.group('dot') and 3 <= len(word) <= 4:
+                code = word.upper()
+            if code in self.packages:
+                result.package_calls.add(code)
+        
+        return result
+
 
 @dataclass
 class WorkflowCell:
@@ -19,6 +100,7 @@ class WorkflowCell:
     cell_type: str  # 'markdown' or 'code'
     content: str
     cell_number: int
+    tokens: TokenScan = field(default_factory=TokenScan, repr=False, compare=False)
 
 
 @dataclass
@@ -52,9 +134,42 @@ class JupytextWorkflow:
 class JupytextWorkflowExtractor:
     """Extract structured workflows from FloPy jupytext tutorials"""
     
+    # Bump when extraction output changes so cached workflows are re-extracted
+    EXTRACTOR_VERSION = "2"
+    
+    # Tag keyword -> tag, matched at the start of words
+    TAG_KEYWORDS = {
+        # Flow conditions
+        'steady': 'steady-state',
+        'transient': 'transient',
+        # Aquifer types
+        'unconfined': 'unconfined',
+        'confined': 'confined',
+        # Grid types
+        'voronoi': 'voronoi',
+        'triangle': 'triangular',
+        'triangular': 'triangular',
+        'quadtree': 'quadtree',
+        'unstructured': 'unstructured',
+        # Features
+        'well': 'wells',
+        'river': 'rivers',
+        'drain': 'drains',
+        'lake': 'lakes',
+        'stream': 'streams',
+        'recharge': 'recharge',
+        'evapotranspiration': 'evapotranspiration',
+        'transport': 'transport',
+        'particle': 'particle-tracking',
+        'budget': 'water-budget',
+        'observation': 'observations',
+        'boundary': 'boundary-conditions'
+    }
+    
     def __init__(self, tutorials_path: str):
         self.tutorials_path = Path(tutorials_path)
         self.flopy_packages = self._get_flopy_packages()
+        self.scanner = TokenScanner(self.flopy_packages, list(self.TAG_KEYWORDS))
         
     def _get_flopy_packages(self) -> set:
         """Get a set of known FloPy package names"""
@@ -77,22 +192,29 @@ class JupytextWorkflowExtractor:
             # Parse cells
             cells = self._parse_jupytext_cells(content)
             
+            # One token scan per cell; file-level results are their union
+            tokens = TokenScan()
+            for cell in cells:
+                cell.tokens = self.scanner.scan(cell.content)
+                tokens.update(cell.tokens)
+            
             # Extract metadata
             title = self._extract_title(cells)
             description = self._extract_description(cells)
-            model_type = self._identify_model_type(content)
+            model_type = self._identify_model_type(tokens)
             
             # Extract sections
             sections = self._extract_sections(cells)
             
             # Extract all packages used
-            packages_used = self._extract_all_packages(content)
+            packages_used = self._extract_all_packages(tokens)
             
             # Determine complexity
             complexity = self._determine_complexity(sections, packages_used)
             
             # Extract tags
-            tags = self._extract_tags(content, title, model_type)
+            tokens.update(self.scanner.scan(title))
+            tags = self._extract_tags(tokens, model_type)
             
             # Calculate file hash
             file_hash = hashlib.sha256(content.encode()).hexdigest()
@@ -221,21 +343,22 @@ class JupytextWorkflowExtractor:
         
         return ' '.join(description_parts)[:500]  # Limit length
     
-    def _identify_model_type(self, content: str) -> str:
+    def _identify_model_type(self, tokens: TokenScan) -> str:
         """Identify the primary model type"""
-        if 'MFSimulation' in content or 'ModflowGwf' in content:
+        markers = tokens.model_markers
+        if 'MFSimulation' in markers or 'ModflowGwf' in markers:
             return 'mf6'
-        elif 'Modflow(' in content and 'mf2005' in content:
+        elif 'Modflow(' in markers and 'mf2005' in markers:
             return 'mf2005'
-        elif 'ModflowNwt' in content:
+        elif 'ModflowNwt' in markers:
             return 'mfnwt'
-        elif 'ModflowUsg' in content:
+        elif 'ModflowUsg' in markers:
             return 'mfusg'
-        elif 'Mt3d' in content:
+        elif 'Mt3d' in markers:
             return 'mt3d'
-        elif 'Seawat' in content:
+        elif 'Seawat' in markers:
             return 'seawat'
-        elif 'Modpath' in content:
+        elif 'Modpath' in markers:
             return 'modpath'
         else:
             return 'unknown'
@@ -294,14 +417,9 @@ class JupytextWorkflowExtractor:
             elif cell.cell_type == 'code':
                 code_snippets.append(cell.content)
                 
-                # Extract packages
-                for pkg in self.flopy_packages:
-                    if pkg in cell.content:
-                        packages_used.add(pkg)
-                
-                # Extract function calls
-                func_calls = re.findall(r'(\w+)\s*\(', cell.content)
-                key_functions.update(func_calls)
+                # Packages and function calls from the cell's token scan
+                packages_used |= cell.tokens.package_codes | cell.tokens.package_calls
+                key_functions |= cell.tokens.functions
         
         return WorkflowSection(
             title=title,
@@ -312,32 +430,9 @@ class JupytextWorkflowExtractor:
             key_functions=sorted(key_functions)[:10]  # Limit to top 10
         )
     
-    def _extract_all_packages(self, content: str) -> List[str]:
-        """Extract all FloPy packages used"""
-        packages = set()
-        
-        # Look for package instantiation patterns
-        patterns = [
-            r'Modflow(\w+)\s*\(',
-            r'flopy\.mf6\.Modflow(\w+)\s*\(',
-            r'Mt3d(\w+)\s*\(',
-            r'\.(\w{3,4})\s*\(',  # Common package codes
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, content)
-            for match in matches:
-                pkg = match.upper()
-                # Clean up
-                if pkg.startswith('GWF'):
-                    pkg = pkg[3:]
-                elif pkg.startswith('GWT'):
-                    pkg = pkg[3:]
-                
-                if pkg in self.flopy_packages:
-                    packages.add(pkg)
-        
-        return sorted(packages)
+    def _extract_all_packages(self, tokens: TokenScan) -> List[str]:
+        """Extract all FloPy packages instantiated in the tutorial"""
+        return sorted(tokens.package_calls)
     
     def _determine_complexity(self, sections: List[WorkflowSection], packages: List[str]) -> str:
         """Determine tutorial complexity"""
@@ -355,70 +450,33 @@ class JupytextWorkflowExtractor:
         else:
             return "advanced"
     
-    def _extract_tags(self, content: str, title: str, model_type: str) -> List[str]:
+    def _extract_tags(self, tokens: TokenScan, model_type: str) -> List[str]:
         """Extract descriptive tags"""
-        tags = [model_type]
-        
-        content_lower = content.lower()
-        title_lower = title.lower()
-        
-        # Flow conditions
-        if 'steady' in content_lower or 'steady-state' in content_lower:
-            tags.append('steady-state')
-        if 'transient' in content_lower:
-            tags.append('transient')
-        
-        # Aquifer types
-        if 'unconfined' in content_lower or 'unconfined' in title_lower:
-            tags.append('unconfined')
-        if 'confined' in content_lower:
-            tags.append('confined')
-        
-        # Grid types
-        if 'voronoi' in content_lower or 'voronoi' in title_lower:
-            tags.append('voronoi')
-        if 'triangle' in content_lower or 'triangular' in title_lower:
-            tags.append('triangular')
-        if 'quadtree' in content_lower:
-            tags.append('quadtree')
-        if 'unstructured' in content_lower:
-            tags.append('unstructured')
-        
-        # Features
-        feature_keywords = {
-            'well': 'wells',
-            'river': 'rivers',
-            'drain': 'drains', 
-            'lake': 'lakes',
-            'stream': 'streams',
-            'recharge': 'recharge',
-            'evapotranspiration': 'evapotranspiration',
-            'transport': 'transport',
-            'particle': 'particle-tracking',
-            'budget': 'water-budget',
-            'observation': 'observations',
-            'boundary': 'boundary-conditions'
-        }
-        
-        for keyword, tag in feature_keywords.items():
-            if keyword in content_lower:
-                tags.append(tag)
-        
-        return list(set(tags))
+        tags = {model_type}
+        tags.update(self.TAG_KEYWORDS[keyword] for keyword in tokens.keywords)
+        return list(tags)
     
-    def extract_all_workflows(self) -> List[JupytextWorkflow]:
-        """Extract workflows from all tutorial files"""
-        workflows = []
+    def extract_all_workflows(self, workers: Optional[int] = None) -> List[JupytextWorkflow]:
+        """
+        Extract workflows from all tutorial files
+        
+        Unchanged files (same sha256 and EXTRACTOR_VERSION) come from the
+        extraction cache; the rest are extracted across `workers` processes.
+        """
         tutorial_files = sorted(self.tutorials_path.glob("*.py"))
         
         print(f"Found {len(tutorial_files)} tutorial files")
         
-        for i, tutorial_file in enumerate(tutorial_files):
-            print(f"Processing {i+1}/{len(tutorial_files)}: {tutorial_file.name}")
-            workflow = self.extract_workflow(tutorial_file)
-            if workflow:
-                workflows.append(workflow)
+        results = extract_all_cached(
+            tutorial_files,
+            self.extract_workflow,
+            extractor=type(self).__name__,
+            version=self.EXTRACTOR_VERSION,
+            workers=workers
+        )
+        workflows = [workflow for workflow in results if workflow]
         
+        print(f"Extracted {len(workflows)}/{len(tutorial_files)} workflows")
         return workflows
 
 
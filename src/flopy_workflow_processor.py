@@ -10,8 +10,7 @@ import json
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
 import google.genai as genai
 from openai import AsyncOpenAI
 
@@ -19,23 +18,41 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 from flopy_workflow_extractor import JupytextWorkflowExtractor, JupytextWorkflow
+from db_writer import pooled_connection, ensure_data_version_table, bump_data_version
+from llm_cache import get_llm_cache
+from embedding_cache import get_embedding_cache
+from stage_pipeline import Stage, StagePipeline
+from workflow_similarity import rebuild_similarity_graph, update_workflow_edges, count_edges
 
 
 class WorkflowProcessor:
     """Process and store FloPy workflows with semantic analysis"""
     
+    # Workflows at or above this cosine similarity are linked as 'similar'
+    SIMILARITY_THRESHOLD = 0.8
+    
     def __init__(self,
                  tutorials_path: str,
                  neon_conn_string: str,
                  gemini_api_key: str,
-                 openai_api_key: str):
+                 openai_api_key: str,
+                 stage_workers: Optional[Dict[str, int]] = None):
         self.tutorials_path = Path(tutorials_path)
         self.neon_conn = neon_conn_string
         
+        # Worker counts for process_workflows_streaming()
+        self.stage_workers = {'check': 2, 'analyze': 4, 'embed': 4, 'store': 2}
+        if stage_workers:
+            self.stage_workers.update(stage_workers)
+        
         # Initialize AI clients
         self.gemini_client = genai.Client(api_key=gemini_api_key)
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
         
+        # Analysis responses are cached on disk, keyed by model + prompt
+        self.llm_cache = get_llm_cache()
+        self.embedding_cache = get_embedding_cache()
+        
         # Initialize extractor
         self.extractor = JupytextWorkflowExtractor(tutorials_path)
         
@@ -148,7 +165,7 @@ class WorkflowProcessor:
         """
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
+            with pooled_connection(self.neon_conn) as conn:
                 with conn.cursor() as cur:
                     # Create tables
                     for schema in table_schemas:
@@ -158,6 +175,9 @@ class WorkflowProcessor:
                     for index in index_schemas:
                         cur.execute(index)
                     
+                    # Search caches key on this; writes below bump it
+                    ensure_data_version_table(cur)
+                    
                     # Create trigger
                     cur.execute(trigger_sql)
                     
@@ -213,16 +233,23 @@ Focus on practical applications and real-world usage patterns.
         max_retries = 3
         retry_delay = 2  # seconds
         
+        cache_key = self.llm_cache.make_key("gemini-2.5-pro", prompt)
+        cached_text = self.llm_cache.get(cache_key)
+        
         for attempt in range(max_retries):
             try:
-                response = await asyncio.to_thread(
-                    self.gemini_client.models.generate_content,
-                    model="gemini-2.5-pro",  # Use the pro model from config
-                    contents=prompt
-                )
-                
-                # Parse markdown response
-                text = response.text
+                if cached_text is not None:
+                    # Replay a cached response; a live call follows if it no longer parses
+                    text, cached_text = cached_text, None
+                else:
+                    response = await asyncio.to_thread(
+                        self.gemini_client.models.generate_content,
+                        model="gemini-2.5-pro",  # Use the pro model from config
+                        contents=prompt
+                    )
+                    
+                    # Parse response
+                    text = response.text
                 
                 # Extract sections
                 import re
@@ -242,6 +269,8 @@ Focus on practical applications and real-world usage patterns.
                 if not use_cases:
                     raise ValueError("AI analysis returned no use cases")
                 
+                self.llm_cache.put(cache_key, "gemini-2.5-pro", text)
+                
                 return {
                     'workflow_purpose': purpose,
                     'best_use_cases': use_cases,
@@ -325,33 +354,150 @@ Focus on practical applications and real-world usage patterns.
         
         combined_text = ' '.join(filter(None, text_parts))
         
+        cached = self.embedding_cache.get("text-embedding-3-small", combined_text)
+        if cached is not None:
+            return cached, combined_text
+        
         try:
             response = await self.openai_client.embeddings.create(
                 input=combined_text,
                 model="text-embedding-3-small"
             )
-            return response.data[0].embedding, combined_text
+            embedding = response.data[0].embedding
+            self.embedding_cache.put("text-embedding-3-small", combined_text, embedding)
+            return embedding, combined_text
             
         except Exception as e:
             print(f"Embedding creation failed for {workflow.title}: {e}")
             return [0.0] * 1536, combined_text
     
+    def is_workflow_unchanged(self, workflow: JupytextWorkflow) -> bool:
+        """True if the stored row for this notebook has the same file hash"""
+        with pooled_connection(self.neon_conn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, file_hash FROM flopy_workflows WHERE tutorial_file = %s",
+                    (workflow.tutorial_file,)
+                )
+                existing = cur.fetchone()
+        
+        return bool(existing and existing[1] == workflow.file_hash)
+    
+    def store_workflow(self, 
+                       workflow: JupytextWorkflow, 
+                       analysis: Dict[str, Any], 
+                       embedding: List[float], 
+                       embedding_text: str):
+        """Upsert the workflow row and replace its steps (committed together)"""
+        with pooled_connection(self.neon_conn) as conn:
+            with conn.cursor() as cur:
+                # Insert or update workflow
+                workflow_sql = """
+                    INSERT INTO flopy_workflows (
+                        tutorial_file, title, description, model_type,
+                        packages_used, num_steps, complexity, tags,
+                        workflow_purpose, best_use_cases, prerequisites, common_modifications,
+                        embedding_text, embedding, file_hash, total_lines, extracted_at
+                    ) VALUES (
+                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                    ) ON CONFLICT (tutorial_file) DO UPDATE SET
+                        title = EXCLUDED.title,
+                        description = EXCLUDED.description,
+                        model_type = EXCLUDED.model_type,
+                        packages_used = EXCLUDED.packages_used,
+                        num_steps = EXCLUDED.num_steps,
+                        complexity = EXCLUDED.complexity,
+                        tags = EXCLUDED.tags,
+                        workflow_purpose = EXCLUDED.workflow_purpose,
+                        best_use_cases = EXCLUDED.best_use_cases,
+                        prerequisites = EXCLUDED.prerequisites,
+                        common_modifications = EXCLUDED.common_modifications,
+                        embedding_text = EXCLUDED.embedding_text,
+                        embedding = EXCLUDED.embedding,
+                        file_hash = EXCLUDED.file_hash,
+                        total_lines = EXCLUDED.total_lines,
+                        extracted_at = EXCLUDED.extracted_at,
+                        processed_at = NOW()
+                    RETURNING id
+                """
+                
+                cur.execute(workflow_sql, (
+                    workflow.tutorial_file,
+                    workflow.title,
+                    workflow.description,
+                    workflow.model_type,
+                    workflow.packages_used,
+                    len(workflow.sections),
+                    workflow.complexity,
+                    workflow.tags,
+                    analysis['workflow_purpose'],
+                    analysis['best_use_cases'],
+                    analysis['prerequisites'],
+                    analysis['common_modifications'],
+                    embedding_text,
+                    embedding,
+                    workflow.file_hash,
+                    workflow.total_lines,
+                    workflow.extracted_at
+                ))
+                
+                workflow_id = cur.fetchone()[0]
+                
+                # Delete existing steps
+                cur.execute("DELETE FROM flopy_workflow_steps WHERE workflow_id = %s", (workflow_id,))
+                
+                # Insert workflow sections as steps (one multi-row INSERT)
+                step_rows = []
+                for i, section in enumerate(workflow.sections, 1):
+                    # Combine code snippets into one
+                    code_snippet = '\n\n'.join(section.code_snippets[:3]) if section.code_snippets else ''
+                    
+                    # Get imports from cells
+                    imports = []
+                    for cell in section.cells:
+                        if cell.cell_type == 'code':
+                            for line in cell.content.splitlines():
+                                if line.strip().startswith(('import ', 'from ')):
+                                    imports.append(line.strip())
+                    
+                    step_rows.append((
+                        workflow_id,
+                        i,
+                        section.title,
+                        code_snippet,
+                        imports[:10],  # Limit imports
+                        section.packages_used,
+                        section.key_functions[:20],  # Limit functions
+                        Json({})  # No parameters in sections
+                    ))
+                
+                if step_rows:
+                    execute_values(cur, """
+                        INSERT INTO flopy_workflow_steps (
+                            workflow_id, step_number, description, code_snippet,
+                            imports, flopy_classes, key_functions, parameters
+                        ) VALUES %s
+                    """, step_rows)
+                
+                # Swap this workflow's similarity edges for ones based on the new embedding
+                update_workflow_edges(
+                    cur, 'flopy_workflows', 'flopy_workflow_relationships', workflow_id,
+                    threshold=self.SIMILARITY_THRESHOLD
+                )
+                
+                # Cached search results for the previous data version are now stale
+                bump_data_version(cur, 'flopy_workflows')
+        
+        print(f"✓ Saved workflow: {workflow.title}")
+    
     async def process_workflow(self, workflow: JupytextWorkflow) -> bool:
         """Process a single workflow and store in database"""
         
         try:
             # Check if already processed
-            with psycopg2.connect(self.neon_conn) as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "SELECT id, file_hash FROM flopy_workflows WHERE tutorial_file = %s",
-                        (workflow.tutorial_file,)
-                    )
-                    existing = cur.fetchone()
-                    
-                    if existing and existing[1] == workflow.file_hash:
-                        print(f"Skipping {workflow.tutorial_file} - unchanged")
-                        return True
+            if self.is_workflow_unchanged(workflow):
+                print(f"Skipping {workflow.tutorial_file} - unchanged")
+                return True
             
             # Analyze with Gemini
             analysis = await self.analyze_workflow_with_gemini(workflow)
@@ -360,103 +506,58 @@ Focus on practical applications and real-world usage patterns.
             embedding, embedding_text = await self.create_workflow_embedding(workflow, analysis)
             
             # Store in database
-            with psycopg2.connect(self.neon_conn) as conn:
-                with conn.cursor() as cur:
-                    # Insert or update workflow
-                    workflow_sql = """
-                        INSERT INTO flopy_workflows (
-                            tutorial_file, title, description, model_type,
-                            packages_used, num_steps, complexity, tags,
-                            workflow_purpose, best_use_cases, prerequisites, common_modifications,
-                            embedding_text, embedding, file_hash, total_lines, extracted_at
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        ) ON CONFLICT (tutorial_file) DO UPDATE SET
-                            title = EXCLUDED.title,
-                            description = EXCLUDED.description,
-                            model_type = EXCLUDED.model_type,
-                            packages_used = EXCLUDED.packages_used,
-                            num_steps = EXCLUDED.num_steps,
-                            complexity = EXCLUDED.complexity,
-                            tags = EXCLUDED.tags,
-                            workflow_purpose = EXCLUDED.workflow_purpose,
-                            best_use_cases = EXCLUDED.best_use_cases,
-                            prerequisites = EXCLUDED.prerequisites,
-                            common_modifications = EXCLUDED.common_modifications,
-                            embedding_text = EXCLUDED.embedding_text,
-                            embedding = EXCLUDED.embedding,
-                            file_hash = EXCLUDED.file_hash,
-                            total_lines = EXCLUDED.total_lines,
-                            extracted_at = EXCLUDED.extracted_at,
-                            processed_at = NOW()
-                        RETURNING id
-                    """
-                    
-                    cur.execute(workflow_sql, (
-                        workflow.tutorial_file,
-                        workflow.title,
-                        workflow.description,
-                        workflow.model_type,
-                        workflow.packages_used,
-                        len(workflow.sections),
-                        workflow.complexity,
-                        workflow.tags,
-                        analysis['workflow_purpose'],
-                        analysis['best_use_cases'],
-                        analysis['prerequisites'],
-                        analysis['common_modifications'],
-                        embedding_text,
-                        embedding,
-                        workflow.file_hash,
-                        workflow.total_lines,
-                        workflow.extracted_at
-                    ))
-                    
-                    workflow_id = cur.fetchone()[0]
-                    
-                    # Delete existing steps
-                    cur.execute("DELETE FROM flopy_workflow_steps WHERE workflow_id = %s", (workflow_id,))
-                    
-                    # Insert workflow sections as steps
-                    for i, section in enumerate(workflow.sections, 1):
-                        # Combine code snippets into one
-                        code_snippet = '\n\n'.join(section.code_snippets[:3]) if section.code_snippets else ''
-                        
-                        # Get imports from cells
-                        imports = []
-                        for cell in section.cells:
-                            if cell.cell_type == 'code':
-                                for line in cell.content.splitlines():
-                                    if line.strip().startswith(('import ', 'from ')):
-                                        imports.append(line.strip())
-                        
-                        step_sql = """
-                            INSERT INTO flopy_workflow_steps (
-                                workflow_id, step_number, description, code_snippet,
-                                imports, flopy_classes, key_functions, parameters
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """
-                        
-                        cur.execute(step_sql, (
-                            workflow_id,
-                            i,
-                            section.title,
-                            code_snippet,
-                            imports[:10],  # Limit imports
-                            section.packages_used,
-                            section.key_functions[:20],  # Limit functions
-                            Json({})  # No parameters in sections
-                        ))
-                    
-                    conn.commit()
-                    print(f"✓ Saved workflow: {workflow.title}")
-                    return True
+            self.store_workflow(workflow, analysis, embedding, embedding_text)
+            return True
                     
         except Exception as e:
             print(f"Failed to process {workflow.tutorial_file}: {e}")
             return False
     
-    async def process_all_workflows(self):
+    async def process_workflows_streaming(self, workflows: List[JupytextWorkflow]) -> int:
+        """
+        Process workflows through concurrent check -> analyze -> embed -> store stages
+        
+        Returns the number of workflows stored or already up to date.
+        """
+        successful = []
+        
+        def on_error(workflow, stage_name: str, error: Exception):
+            if isinstance(workflow, tuple):
+                workflow = workflow[0]
+            print(f"Failed to process {workflow.tutorial_file} ({stage_name}): {error}")
+        
+        async def check(workflow):
+            if await asyncio.to_thread(self.is_workflow_unchanged, workflow):
+                print(f"Skipping {workflow.tutorial_file} - unchanged")
+                successful.append(workflow.tutorial_file)
+                return None
+            return workflow
+        
+        async def analyze(workflow):
+            analysis = await self.analyze_workflow_with_gemini(workflow)
+            return workflow, analysis
+        
+        async def embed(item):
+            workflow, analysis = item
+            embedding, embedding_text = await self.create_workflow_embedding(workflow, analysis)
+            return workflow, analysis, embedding, embedding_text
+        
+        async def store(item):
+            await asyncio.to_thread(self.store_workflow, *item)
+            successful.append(item[0].tutorial_file)
+            return None
+        
+        pipeline = StagePipeline([
+            Stage('check', check, workers=self.stage_workers['check']),
+            Stage('analyze', analyze, workers=self.stage_workers['analyze']),
+            Stage('embed', embed, workers=self.stage_workers['embed']),
+            Stage('store', store, workers=self.stage_workers['store']),
+        ], on_error=on_error)
+        await pipeline.run(workflows)
+        
+        return len(successful)
+    
+    async def process_all_workflows(self, streaming: bool = False, rebuild_similarity: bool = False):
         """Process all tutorial workflows"""
         
         print("🚀 Starting FloPy Workflow Extraction")
@@ -467,64 +568,48 @@ Focus on practical applications and real-world usage patterns.
         print(f"\nExtracted {len(workflows)} workflows")
         
         # Process each workflow
-        successful = 0
-        for i, workflow in enumerate(workflows):
-            print(f"\nProcessing {i+1}/{len(workflows)}: {workflow.title}")
-            if await self.process_workflow(workflow):
-                successful += 1
-            
-            # Small delay to respect rate limits
-            await asyncio.sleep(1)
+        if streaming:
+            successful = await self.process_workflows_streaming(workflows)
+        else:
+            successful = 0
+            for i, workflow in enumerate(workflows):
+                print(f"\nProcessing {i+1}/{len(workflows)}: {workflow.title}")
+                if await self.process_workflow(workflow):
+                    successful += 1
+                
+                # Small delay to respect rate limits
+                await asyncio.sleep(1)
         
         print(f"\n✅ Workflow processing complete: {successful}/{len(workflows)} successful")
+        cache_stats = self.llm_cache.stats()
+        print(f"🗄️  LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
         
-        # Find similar workflows
-        print("\n🔍 Finding similar workflows...")
-        await self.find_similar_workflows()
+        # Edges of re-ingested workflows were updated as they were stored; a full
+        # rebuild is only needed on request or when the graph was never built
+        if rebuild_similarity or not self.has_similarity_graph():
+            print("\n🔍 Finding similar workflows...")
+            await self.find_similar_workflows()
     
-    async def find_similar_workflows(self, threshold: float = 0.8):
+    def has_similarity_graph(self) -> bool:
+        with pooled_connection(self.neon_conn) as conn:
+            with conn.cursor() as cur:
+                return count_edges(cur, 'flopy_workflow_relationships') > 0
+    
+    async def find_similar_workflows(self, threshold: float = SIMILARITY_THRESHOLD, top_k: Optional[int] = None):
         """Find and store relationships between similar workflows"""
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
+            with pooled_connection(self.neon_conn) as conn:
                 with conn.cursor() as cur:
-                    # Get all workflow embeddings
-                    cur.execute("""
-                        SELECT id, title, embedding 
-                        FROM flopy_workflows
-                    """)
-                    
-                    workflows = cur.fetchall()
-                    
-                    # Compare each pair
-                    relationships = []
-                    for i, (id1, title1, emb1) in enumerate(workflows):
-                        for j, (id2, title2, emb2) in enumerate(workflows[i+1:], i+1):
-                            # Calculate cosine similarity using SQL
-                            cur.execute("""
-                                SELECT 1 - (%s::vector <=> %s::vector) as similarity
-                            """, (emb1, emb2))
-                            similarity = cur.fetchone()[0]
-                            
-                            if similarity >= threshold:
-                                relationships.append({
-                                    'source': id1,
-                                    'target': id2,
-                                    'type': 'similar',
-                                    'score': similarity
-                                })
-                    
-                    # Store relationships
-                    for rel in relationships:
-                        cur.execute("""
-                            INSERT INTO flopy_workflow_relationships 
-                            (source_workflow_id, target_workflow_id, relationship_type, similarity_score)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT DO NOTHING
-                        """, (rel['source'], rel['target'], rel['type'], rel['score']))
-                    
-                    conn.commit()
-                    print(f"✓ Found {len(relationships)} similar workflow pairs")
+                    # One embedding fetch, blocked matrix products, one bulk insert
+                    count = rebuild_similarity_graph(
+                        cur,
+                        'flopy_workflows',
+                        'flopy_workflow_relationships',
+                        threshold=threshold,
+                        top_k=top_k
+                    )
+                    print(f"✓ Found {count} similar workflow pairs")
                     
         except Exception as e:
             print(f"Error finding similar workflows: {e}")
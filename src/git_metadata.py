@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Git Metadata Provider for the Processing Pipelines
+
+Resolves repository git information once per run instead of forking
+`git` for every processed module:
+- HEAD commit, branch and date are resolved once and cached
+- The last commit touching each documented module is collected in a
+  single `git log --name-only` pass over all module paths
+"""
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+
+
+class GitMetadataProvider:
+    """Run-scoped cache of git information for a repository"""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = Path(repo_path)
+        self._head: Optional[Dict[str, Any]] = None
+        self._file_commits: Dict[str, Dict[str, Any]] = {}
+
+    def _git(self, *args: str) -> str:
+        return subprocess.check_output(['git', *args], cwd=self.repo_path).decode()
+
+    @staticmethod
+    def _parse_commit_date(date_str: str) -> datetime:
+        """Parse `%ci` output (e.g. '2024-05-01 12:30:00 +0200')"""
+        parts = date_str.split()
+        return datetime.strptime(parts[0] + ' ' + parts[1], '%Y-%m-%d %H:%M:%S')
+
+    def head_info(self) -> Dict[str, Any]:
+        """Get HEAD commit, branch and date (resolved once per run)"""
+        if self._head is None:
+            try:
+                commit_hash, commit_date_str = self._git(
+                    'log', '-1', '--format=%H%x00%ci', 'HEAD'
+                ).strip().split('\x00')
+                branch = self._git('branch', '--show-current').strip()
+
+                self._head = {
+                    'commit_hash': commit_hash,
+                    'branch': branch or 'detached',
+                    'commit_date': self._parse_commit_date(commit_date_str)
+                }
+            except Exception as e:
+                print(f"Warning: Could not get git info: {e}")
+                self._head = {
+                    'commit_hash': None,
+                    'branch': None,
+                    'commit_date': None
+                }
+        return self._head
+
+    def load_file_commits(self, file_paths: Iterable[Path]) -> int:
+        """
+        Find the last commit touching each file in one `git log` pass
+
+        The log is read newest-first and stopped as soon as every file
+        has been seen, so the cost is bounded by the history needed
+        rather than the number of files.
+
+        Returns:
+            Number of files resolved to a commit
+        """
+        repo_root = self.repo_path.resolve()
+        pending = set()
+        for file_path in file_paths:
+            try:
+                pending.add(str(Path(file_path).resolve().relative_to(repo_root)))
+            except ValueError:
+                continue  # Not inside this repository
+        pending -= self._file_commits.keys()
+
+        if not pending:
+            return 0
+
+        resolved = 0
+        try:
+            proc = subprocess.Popen(
+                ['git', 'log', '--name-only', '--relative', '--format=%x00%H%x00%ci',
+                 'HEAD', '--', *sorted(pending)],
+                cwd=self.repo_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            commit_hash = None
+            commit_date = None
+
+            for raw_line in proc.stdout:
+                line = raw_line.decode().rstrip('\n')
+                if line.startswith('\x00'):
+                    _, commit_hash, commit_date_str = line.split('\x00')
+                    commit_date = self._parse_commit_date(commit_date_str)
+                elif line and line in pending:
+                    self._file_commits[line] = {
+                        'commit_hash': commit_hash,
+                        'commit_date': commit_date
+                    }
+                    pending.discard(line)
+                    resolved += 1
+                    if not pending:
+                        break
+
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
+
+        except Exception as e:
+            print(f"Warning: Could not read git history: {e}")
+
+        return resolved
+
+    def file_info(self, file_path: Path) -> Dict[str, Any]:
+        """
+        Get git info for a single file from the in-memory map
+
+        Files that were not loaded (or are untracked) fall back to HEAD.
+        """
+        head = self.head_info()
+        try:
+            relative_path = str(Path(file_path).resolve().relative_to(self.repo_path.resolve()))
+        except ValueError:
+            return head
+
+        file_commit = self._file_commits.get(relative_path)
+        if not file_commit:
+            return head
+
+        return {
+            'commit_hash': file_commit['commit_hash'],
+            'branch': head['branch'],
+            'commit_date': file_commit['commit_date']
+        }
@@ -1,8 +1,11 @@
 import os
+import sys
 import asyncio
 import asyncpg
 import strawberry
+from strawberry.dataloader import DataLoader
 from strawberry.fastapi import GraphQLRouter
+from strawberry.types import Info
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import json
@@ -10,6 +13,16 @@ import numpy as np
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from enum import Enum
+from openai import AsyncOpenAI
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.query_embedding_cache import get_query_embedding_cache
+from src.embedding_batcher import EmbeddingBatcher
+from src.rate_limiter import get_rate_limiter
+from src.pg_statements import StatementRegistry
+from src.search_result_cache import GRAPHQL_VERSION_TABLES, SearchResultCache, fetch_data_version
+from src.vector_search import VectorSearch, SEARCH_CORPORA
 
 # Load environment variables
 load_dotenv()
@@ -17,19 +30,213 @@ load_dotenv()
 # Database connection pool
 db_pool = None
 
+# Query embeddings are computed server-side (cached per distinct query)
+query_embeddings = None
+
+# Search results per (query, mode, entity type, limit, data version)
+search_results = SearchResultCache(max_entries=int(os.getenv('SEARCH_RESULT_CACHE_SIZE', '1024')))
+
+# searchAll over the pipeline tables; pool connections bind vectors in binary
+vector_search = VectorSearch(os.getenv('NEON_CONNECTION_STRING'), binary_vectors=True)
+
+# Reciprocal rank fusion: score = sum(1 / (RRF_K + rank)) over the candidate lists
+RRF_K = 60
+HYBRID_CANDIDATES = 4  # Candidates per list, as a multiple of the requested limit
+
+# Concurrent searches are embedded together: a batch is sent after this window or when full
+EMBEDDING_BATCH_WINDOW = float(os.getenv('EMBEDDING_BATCH_WINDOW_MS', '5')) / 1000
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+
 async def init_db():
-    global db_pool
-    db_pool = await asyncpg.create_pool(
+    global db_pool, query_embeddings
+    # Connections come up with binary vector codecs and every resolver statement prepared
+    db_pool = await statements.create_pool(
         os.getenv('NEON_CONNECTION_STRING'),
         min_size=10,
         max_size=20
     )
+    openai_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    query_embeddings = get_query_embedding_cache(
+        openai_client,
+        batcher=EmbeddingBatcher(
+            openai_client,
+            max_wait=EMBEDDING_BATCH_WINDOW,
+            max_batch_inputs=EMBEDDING_BATCH_SIZE,
+            rate_limiter=get_rate_limiter('openai')
+        )
+    )
 
 async def close_db():
     global db_pool
     if db_pool:
         await db_pool.close()
 
+# Resolver SQL, prepared once per pooled connection
+statements = StatementRegistry()
+
+LOAD_MODULES = statements.register('load_modules', """
+    SELECT id, relative_path, model_family, package_code,
+           semantic_purpose, module_docstring, user_scenarios, related_concepts
+    FROM modules
+    WHERE id = ANY($1::uuid[])
+""")
+
+LOAD_CLASSES = statements.register('load_classes', """
+    SELECT c.*, m.relative_path
+    FROM classes c
+    JOIN modules m ON c.module_id = m.id
+    WHERE c.id = ANY($1::uuid[])
+""")
+
+LOAD_FUNCTIONS = statements.register('load_functions', """
+    SELECT f.*, m.relative_path, c.class_name
+    FROM functions f
+    JOIN modules m ON f.module_id = m.id
+    LEFT JOIN classes c ON f.class_id = c.id
+    WHERE f.id = ANY($1::uuid[])
+""")
+
+LOAD_METHODS_BY_CLASS = statements.register('load_methods_by_class', """
+    SELECT f.*, m.relative_path, c.class_name
+    FROM functions f
+    JOIN classes c ON f.class_id = c.id
+    JOIN modules m ON c.module_id = m.id
+    WHERE f.class_id = ANY($1::uuid[])
+""")
+
+# target_uuid is derived inline so this works with or without the generated
+# column from tools/database/relationships_typed_ids.sql
+LOAD_RELATIONSHIPS_BY_SOURCE = statements.register('load_relationships_by_source', """
+    SELECT source_id, target_id, target_type, relationship_type, strength,
+           CASE WHEN target_id ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+                THEN target_id::uuid
+           END AS target_uuid
+    FROM relationships
+    WHERE source_id = ANY($1::text[])
+""")
+
+EXACT_PACKAGES = statements.register('exact_packages', """
+    SELECT id, relative_path, model_family, package_code,
+           semantic_purpose, module_docstring, user_scenarios, related_concepts
+    FROM modules
+    WHERE package_code = $1 
+       OR relative_path ILIKE '%' || $2 || '%'
+    LIMIT $3
+""")
+
+EXACT_FUNCTIONS = statements.register('exact_functions', """
+    SELECT f.*, m.relative_path, c.class_name
+    FROM functions f
+    JOIN modules m ON f.module_id = m.id
+    LEFT JOIN classes c ON f.class_id = c.id
+    WHERE f.function_name ILIKE $1
+    LIMIT $2
+""")
+
+SEMANTIC_PACKAGES = statements.register('semantic_packages', """
+    SELECT id, relative_path, model_family, package_code,
+           semantic_purpose, module_docstring, user_scenarios, related_concepts,
+           1 - (embedding <=> $1::vector) as similarity
+    FROM modules
+    WHERE embedding IS NOT NULL
+    ORDER BY embedding <=> $1::vector
+    LIMIT $2
+""")
+
+FULLTEXT_PACKAGES = statements.register('fulltext_packages', """
+    SELECT id, relative_path, model_family, package_code,
+           semantic_purpose, module_docstring, user_scenarios, related_concepts,
+           ts_rank(search_vector, plainto_tsquery('english', $1)) as rank
+    FROM modules
+    WHERE search_vector @@ plainto_tsquery('english', $1)
+    ORDER BY rank DESC
+    LIMIT $2
+""")
+
+HYBRID_PACKAGES = statements.register('hybrid_packages', """
+    WITH semantic AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+        FROM (
+            SELECT id, embedding <=> $1::vector AS distance
+            FROM modules
+            WHERE embedding IS NOT NULL
+            ORDER BY embedding <=> $1::vector
+            LIMIT $4
+        ) nearest
+    ),
+    fulltext AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY text_rank DESC) AS rank
+        FROM (
+            SELECT id, ts_rank(search_vector, tsq) AS text_rank
+            FROM modules, plainto_tsquery('english', $2) tsq
+            WHERE search_vector @@ tsq
+            ORDER BY text_rank DESC
+            LIMIT $4
+        ) matches
+    ),
+    exact AS (
+        SELECT id, 1 AS rank
+        FROM modules
+        WHERE package_code = $3
+    ),
+    fused AS (
+        SELECT id, SUM(1.0 / ($5 + rank)) AS score
+        FROM (
+            SELECT id, rank FROM semantic
+            UNION ALL SELECT id, rank FROM fulltext
+            UNION ALL SELECT id, rank FROM exact
+        ) ranked
+        GROUP BY id
+    )
+    SELECT m.id, m.relative_path, m.model_family, m.package_code,
+           m.semantic_purpose, m.module_docstring, m.user_scenarios, m.related_concepts,
+           f.score
+    FROM fused f
+    JOIN modules m ON m.id = f.id
+    ORDER BY f.score DESC
+    LIMIT $6
+""")
+
+PACKAGE_BY_CODE = statements.register('package_by_code', """
+    SELECT id, relative_path, model_family, package_code,
+           semantic_purpose, module_docstring, user_scenarios, related_concepts
+    FROM modules
+    WHERE package_code = $1
+    LIMIT 1
+""")
+
+METHOD_BY_NAME = statements.register('method_by_name', """
+    SELECT f.*, m.relative_path, c.class_name
+    FROM functions f
+    JOIN modules m ON f.module_id = m.id
+    JOIN classes c ON f.class_id = c.id
+    WHERE f.function_name = $1 AND c.class_name = $2
+    LIMIT 1
+""")
+
+FUNCTION_BY_NAME = statements.register('function_by_name', """
+    SELECT f.*, m.relative_path
+    FROM functions f
+    JOIN modules m ON f.module_id = m.id
+    WHERE f.function_name = $1 AND f.class_id IS NULL
+    LIMIT 1
+""")
+
+CLASS_BY_NAME = statements.register('class_by_name', """
+    SELECT c.*, m.relative_path
+    FROM classes c
+    JOIN modules m ON c.module_id = m.id
+    WHERE c.class_name = $1
+    LIMIT 1
+""")
+
+USAGE_PATTERNS = statements.register('usage_patterns', """
+    SELECT * FROM usage_patterns
+    WHERE description ILIKE '%' || $1 || '%'
+       OR pattern_name ILIKE '%' || $1 || '%'
+    LIMIT $2
+""")
+
 # GraphQL Types
 @strawberry.type
 class Package:
@@ -65,7 +272,11 @@ class Class:
     docstring: str
     base_classes: List[str]
     purpose: Optional[str]
-    methods: List[Function]
+    
+    @strawberry.field
+    async def methods(self, info: Info) -> List[Function]:
+        """Methods are batched across all classes resolved in the request"""
+        return await info.context['loaders'].methods_by_class.load(self.id)
 
 @strawberry.type
 class SearchResult:
@@ -74,6 +285,15 @@ class SearchResult:
     classes: List[Class]
     total_results: int
 
+@strawberry.type
+class CorpusHit:
+    corpus: str  # Source table: flopy_modules, flopy_workflows, pyemu_modules, pyemu_workflows
+    id: str
+    title: Optional[str]
+    path: str
+    purpose: Optional[str]
+    score: float
+
 @strawberry.type
 class UsagePattern:
     id: str
@@ -112,6 +332,100 @@ class EntityType(Enum):
     CLASS = "class"
     ALL = "all"
 
+def function_from_row(row) -> Function:
+    return Function(
+        id=str(row['id']),
+        name=row['function_name'],
+        signature=row['signature'] or f"{row['function_name']}()",
+        docstring=row['docstring'] or '',
+        module_path=row['relative_path'],
+        class_name=row['class_name'],
+        what_it_does=row['what_it_does'],
+        when_to_use=row['when_to_use'],
+        line_number=row['line_number']
+    )
+
+def group_rows(keys: List[str], rows, key_column: str) -> List[list]:
+    """Rows grouped per key, in key order (DataLoader contract)"""
+    grouped = {key: [] for key in keys}
+    for row in rows:
+        grouped.setdefault(str(row[key_column]), []).append(row)
+    return [grouped[key] for key in keys]
+
+class Loaders:
+    """
+    Per-request DataLoaders keyed by id
+    
+    Every .load() issued while resolving one request is collected and sent
+    as a single `= ANY($1)` query per loader, so nested fields (methods,
+    relationship targets) cost one query per level instead of one per item.
+    """
+    
+    def __init__(self):
+        self.modules = DataLoader(load_fn=self._load_modules)
+        self.classes = DataLoader(load_fn=self._load_classes)
+        self.functions = DataLoader(load_fn=self._load_functions)
+        self.methods_by_class = DataLoader(load_fn=self._load_methods_by_class)
+        self.relationships_by_source = DataLoader(load_fn=self._load_relationships_by_source)
+    
+    @staticmethod
+    async def _fetch_by_id(statement: str, keys: List[str]) -> list:
+        async with db_pool.acquire() as conn:
+            rows = await statements.fetch(conn, statement, keys)
+        by_id = {str(row['id']): row for row in rows}
+        return [by_id.get(key) for key in keys]
+    
+    async def _load_modules(self, keys: List[str]) -> list:
+        return await self._fetch_by_id(LOAD_MODULES, keys)
+    
+    async def _load_classes(self, keys: List[str]) -> list:
+        return await self._fetch_by_id(LOAD_CLASSES, keys)
+    
+    async def _load_functions(self, keys: List[str]) -> list:
+        return await self._fetch_by_id(LOAD_FUNCTIONS, keys)
+    
+    async def _load_methods_by_class(self, keys: List[str]) -> List[List[Function]]:
+        async with db_pool.acquire() as conn:
+            rows = await statements.fetch(conn, LOAD_METHODS_BY_CLASS, keys)
+        return [[function_from_row(row) for row in group] for group in group_rows(keys, rows, 'class_id')]
+    
+    async def _load_relationships_by_source(self, keys: List[str]) -> list:
+        async with db_pool.acquire() as conn:
+            rows = await statements.fetch(conn, LOAD_RELATIONSHIPS_BY_SOURCE, keys)
+        return group_rows(keys, rows, 'source_id')
+    
+    async def entity(self, entity_id: str) -> Optional[Dict[str, str]]:
+        """Type and display name of a module, class or function id"""
+        module, cls, function = await asyncio.gather(
+            self.modules.load(entity_id),
+            self.classes.load(entity_id),
+            self.functions.load(entity_id)
+        )
+        if module:
+            return {'type': 'module', 'name': module['relative_path']}
+        if cls:
+            return {'type': 'class', 'name': cls['class_name']}
+        if function:
+            return {'type': 'function', 'name': function['function_name']}
+        return None
+    
+    async def entity_name(self, entity_type: str, entity_id: Optional[Any]) -> Optional[str]:
+        if entity_id is None:
+            return None
+        loader, name_column = {
+            'module': (self.modules, 'relative_path'),
+            'class': (self.classes, 'class_name'),
+            'function': (self.functions, 'function_name'),
+        }.get(entity_type, (None, None))
+        if loader is None:
+            return None
+        row = await loader.load(str(entity_id))
+        return row[name_column] if row else None
+
+async def get_context() -> Dict[str, Any]:
+    """Fresh loaders per request so cached rows never leak between requests"""
+    return {'loaders': Loaders()}
+
 # Query Resolvers
 @strawberry.type
 class Query:
@@ -124,23 +438,38 @@ class Query:
         limit: int = 20
     ) -> SearchResult:
         """Search across the FloPy knowledge base"""
+        async with db_pool.acquire() as conn:
+            data_version = await fetch_data_version(conn, GRAPHQL_VERSION_TABLES)
         
+        # Served from cache until the data version (or the tables behind it) changes
+        return await search_results.get_or_compute(
+            query,
+            (mode.value, entity_type.value, limit),
+            data_version,
+            lambda: self.run_search(query, mode, entity_type, limit)
+        )
+    
+    async def run_search(
+        self,
+        query: str,
+        mode: SearchMode,
+        entity_type: EntityType,
+        limit: int
+    ) -> SearchResult:
         packages = []
         functions = []
         classes = []
         
+        # Embed the query before taking a connection from the pool
+        query_embedding = None
+        if mode in (SearchMode.SEMANTIC, SearchMode.HYBRID) and entity_type in [EntityType.PACKAGE, EntityType.ALL]:
+            query_embedding = await query_embeddings.get(query)  # Bound as binary vector
+        
         async with db_pool.acquire() as conn:
             if mode == SearchMode.EXACT:
                 # Exact match on package codes and names
                 if entity_type in [EntityType.PACKAGE, EntityType.ALL]:
-                    package_rows = await conn.fetch("""
-                        SELECT id, relative_path, model_family, package_code,
-                               semantic_purpose, module_docstring, user_scenarios, related_concepts
-                        FROM modules
-                        WHERE package_code = $1 
-                           OR relative_path ILIKE '%' || $2 || '%'
-                        LIMIT $3
-                    """, query.upper(), query, limit)
+                    package_rows = await statements.fetch(conn, EXACT_PACKAGES, query.upper(), query, limit)
                     
                     packages = [
                         Package(
@@ -157,14 +486,7 @@ class Query:
                     ]
                 
                 if entity_type in [EntityType.FUNCTION, EntityType.ALL]:
-                    function_rows = await conn.fetch("""
-                        SELECT f.*, m.relative_path, c.class_name
-                        FROM functions f
-                        JOIN modules m ON f.module_id = m.id
-                        LEFT JOIN classes c ON f.class_id = c.id
-                        WHERE f.function_name ILIKE $1
-                        LIMIT $2
-                    """, f"%{query}%", limit)
+                    function_rows = await statements.fetch(conn, EXACT_FUNCTIONS, f"%{query}%", limit)
                     
                     functions = [
                         Function(
@@ -181,20 +503,8 @@ class Query:
                     ]
             
             elif mode == SearchMode.SEMANTIC:
-                # Generate embedding for query
-                # For now, we'll use a placeholder - in production, call Gemini
-                query_embedding = [0.0] * 1536  # Placeholder
-                
                 if entity_type in [EntityType.PACKAGE, EntityType.ALL]:
-                    package_rows = await conn.fetch("""
-                        SELECT id, relative_path, model_family, package_code,
-                               semantic_purpose, module_docstring, user_scenarios, related_concepts,
-                               1 - (semantic_embedding <=> $1::vector) as similarity
-                        FROM modules
-                        WHERE semantic_embedding IS NOT NULL
-                        ORDER BY semantic_embedding <=> $1::vector
-                        LIMIT $2
-                    """, query_embedding, limit)
+                    package_rows = await statements.fetch(conn, SEMANTIC_PACKAGES, query_embedding, limit)
                     
                     packages = [
                         Package(
@@ -214,15 +524,7 @@ class Query:
             elif mode == SearchMode.FULLTEXT:
                 # Full-text search
                 if entity_type in [EntityType.PACKAGE, EntityType.ALL]:
-                    package_rows = await conn.fetch("""
-                        SELECT id, relative_path, model_family, package_code,
-                               semantic_purpose, module_docstring, user_scenarios, related_concepts,
-                               ts_rank(search_content, plainto_tsquery('english', $1)) as rank
-                        FROM modules
-                        WHERE search_content @@ plainto_tsquery('english', $1)
-                        ORDER BY rank DESC
-                        LIMIT $2
-                    """, query, limit)
+                    package_rows = await statements.fetch(conn, FULLTEXT_PACKAGES, query, limit)
                     
                     packages = [
                         Package(
@@ -240,45 +542,31 @@ class Query:
                     ]
             
             else:  # HYBRID mode
-                # Combine all search methods
-                # This is a simplified hybrid approach
-                # In production, you'd want more sophisticated ranking
-                
-                # Try exact match first
-                exact_packages = await conn.fetch("""
-                    SELECT id, relative_path, model_family, package_code,
-                           semantic_purpose, module_docstring, user_scenarios, related_concepts
-                    FROM modules
-                    WHERE package_code = $1
-                    LIMIT 5
-                """, query.upper())
-                
-                # Then full-text search
-                fulltext_packages = await conn.fetch("""
-                    SELECT id, relative_path, model_family, package_code,
-                           semantic_purpose, module_docstring, user_scenarios, related_concepts
-                    FROM modules
-                    WHERE search_content @@ plainto_tsquery('english', $1)
-                        AND package_code != $2
-                    ORDER BY ts_rank(search_content, plainto_tsquery('english', $1)) DESC
-                    LIMIT $3
-                """, query, query.upper(), limit - len(exact_packages))
-                
-                all_packages = list(exact_packages) + list(fulltext_packages)
-                
-                packages = [
-                    Package(
-                        id=str(row['id']),
-                        name=row['package_code'] or os.path.basename(row['relative_path']),
-                        code=row['package_code'],
-                        model_family=row['model_family'],
-                        file_path=row['relative_path'],
-                        purpose=row['semantic_purpose'] or '',
-                        docstring=row['module_docstring'] or '',
-                        user_scenarios=row['user_scenarios'] or [],
-                        related_concepts=row['related_concepts'] or []
-                    ) for row in all_packages
-                ]
+                # Package ranking only, like the semantic and full-text modes
+                if entity_type in [EntityType.PACKAGE, EntityType.ALL]:
+                    # One round trip: exact, vector (ANN index) and full-text (GIN index)
+                    # candidates fused by reciprocal rank fusion
+                    candidates = limit * HYBRID_CANDIDATES
+                    
+                    package_rows = await statements.fetch(
+                        conn, HYBRID_PACKAGES,
+                        query_embedding, query, query.upper(), candidates, RRF_K, limit
+                    )
+                    
+                    packages = [
+                        Package(
+                            id=str(row['id']),
+                            name=row['package_code'] or os.path.basename(row['relative_path']),
+                            code=row['package_code'],
+                            model_family=row['model_family'],
+                            file_path=row['relative_path'],
+                            purpose=row['semantic_purpose'] or '',
+                            docstring=row['module_docstring'] or '',
+                            user_scenarios=row['user_scenarios'] or [],
+                            related_concepts=row['related_concepts'] or [],
+                            score=float(row['score'])
+                        ) for row in package_rows
+                    ]
         
         total_results = len(packages) + len(functions) + len(classes)
         
@@ -289,17 +577,45 @@ class Query:
             total_results=total_results
         )
     
+    @strawberry.field
+    async def search_all(
+        self,
+        query: str,
+        limit: int = 20,
+        corpora: Optional[List[str]] = None
+    ) -> List[CorpusHit]:
+        """One ranked list over FloPy and PyEMU modules and workflows"""
+        selected = {name: SEARCH_CORPORA[name] for name in (corpora or SEARCH_CORPORA) if name in SEARCH_CORPORA}
+        if not selected:
+            return []
+        
+        async with db_pool.acquire() as conn:
+            data_version = await fetch_data_version(conn, GRAPHQL_VERSION_TABLES)
+        
+        async def run():
+            query_embedding = await query_embeddings.get(query)
+            async with db_pool.acquire() as conn:
+                rows = await vector_search.search_all_async(conn, query_embedding, limit, corpora=selected)
+            return [
+                CorpusHit(
+                    corpus=row['corpus'],
+                    id=row['id'],
+                    title=row['title'],
+                    path=row['path'],
+                    purpose=row['purpose'],
+                    score=float(row['similarity'])
+                ) for row in rows
+            ]
+        
+        return await search_results.get_or_compute(
+            query, ('all', tuple(selected), limit), data_version, run
+        )
+    
     @strawberry.field
     async def get_package(self, package_code: str) -> Optional[Package]:
         """Get a specific package by its code"""
         async with db_pool.acquire() as conn:
-            row = await conn.fetchrow("""
-                SELECT id, relative_path, model_family, package_code,
-                       semantic_purpose, module_docstring, user_scenarios, related_concepts
-                FROM modules
-                WHERE package_code = $1
-                LIMIT 1
-            """, package_code.upper())
+            row = await statements.fetchrow(conn, PACKAGE_BY_CODE, package_code.upper())
             
             if row:
                 return Package(
@@ -320,22 +636,9 @@ class Query:
         """Get a specific function by name"""
         async with db_pool.acquire() as conn:
             if class_name:
-                row = await conn.fetchrow("""
-                    SELECT f.*, m.relative_path, c.class_name
-                    FROM functions f
-                    JOIN modules m ON f.module_id = m.id
-                    JOIN classes c ON f.class_id = c.id
-                    WHERE f.function_name = $1 AND c.class_name = $2
-                    LIMIT 1
-                """, function_name, class_name)
+                row = await statements.fetchrow(conn, METHOD_BY_NAME, function_name, class_name)
             else:
-                row = await conn.fetchrow("""
-                    SELECT f.*, m.relative_path
-                    FROM functions f
-                    JOIN modules m ON f.module_id = m.id
-                    WHERE f.function_name = $1 AND f.class_id IS NULL
-                    LIMIT 1
-                """, function_name)
+                row = await statements.fetchrow(conn, FUNCTION_BY_NAME, function_name)
             
             if row:
                 return Function(
@@ -356,58 +659,25 @@ class Query:
         """Get a specific class by name"""
         async with db_pool.acquire() as conn:
             # Get class info
-            class_row = await conn.fetchrow("""
-                SELECT c.*, m.relative_path
-                FROM classes c
-                JOIN modules m ON c.module_id = m.id
-                WHERE c.class_name = $1
-                LIMIT 1
-            """, class_name)
+            class_row = await statements.fetchrow(conn, CLASS_BY_NAME, class_name)
             
             if not class_row:
                 return None
             
-            # Get methods
-            method_rows = await conn.fetch("""
-                SELECT f.*
-                FROM functions f
-                WHERE f.class_id = $1
-            """, class_row['id'])
-            
-            methods = [
-                Function(
-                    id=str(row['id']),
-                    name=row['function_name'],
-                    signature=row['signature'] or f"{row['function_name']}()",
-                    docstring=row['docstring'] or '',
-                    module_path=class_row['relative_path'],
-                    class_name=class_name,
-                    what_it_does=row['what_it_does'],
-                    when_to_use=row['when_to_use'],
-                    line_number=row['line_number']
-                ) for row in method_rows
-            ]
-            
             return Class(
                 id=str(class_row['id']),
                 name=class_row['class_name'],
                 module_path=class_row['relative_path'],
                 docstring=class_row['docstring'] or '',
                 base_classes=class_row['base_classes'] or [],
-                purpose=class_row['purpose'],
-                methods=methods
+                purpose=class_row['purpose']
             )
     
     @strawberry.field
     async def find_usage_patterns(self, concept: str, limit: int = 10) -> List[UsagePattern]:
         """Find usage patterns for a concept"""
         async with db_pool.acquire() as conn:
-            rows = await conn.fetch("""
-                SELECT * FROM usage_patterns
-                WHERE description ILIKE '%' || $1 || '%'
-                   OR pattern_name ILIKE '%' || $1 || '%'
-                LIMIT $2
-            """, concept, limit)
+            rows = await statements.fetch(conn, USAGE_PATTERNS, concept, limit)
             
             return [
                 UsagePattern(
@@ -421,55 +691,37 @@ class Query:
             ]
     
     @strawberry.field
-    async def get_relationships(self, entity_id: str) -> ConceptGraph:
+    async def get_relationships(self, entity_id: str, info: Info) -> Optional[ConceptGraph]:
         """Get relationships for an entity"""
-        async with db_pool.acquire() as conn:
-            # Get entity info
-            entity = await conn.fetchrow("""
-                SELECT 'module' as type, relative_path as name 
-                FROM modules WHERE id = $1
-                UNION
-                SELECT 'class' as type, class_name as name 
-                FROM classes WHERE id = $1
-                UNION
-                SELECT 'function' as type, function_name as name 
-                FROM functions WHERE id = $1
-            """, entity_id)
-            
-            if not entity:
-                return None
-            
-            # Get relationships
-            rel_rows = await conn.fetch("""
-                SELECT r.*, 
-                       CASE 
-                           WHEN r.target_type = 'module' THEN m.relative_path
-                           WHEN r.target_type = 'class' THEN c.class_name
-                           WHEN r.target_type = 'function' THEN f.function_name
-                       END as target_name
-                FROM relationships r
-                LEFT JOIN modules m ON r.target_id = m.id::text AND r.target_type = 'module'
-                LEFT JOIN classes c ON r.target_id = c.id::text AND r.target_type = 'class'
-                LEFT JOIN functions f ON r.target_id = f.id::text AND r.target_type = 'function'
-                WHERE r.source_id = $1
-            """, entity_id)
-            
-            relationships = [
-                Relationship(
-                    target_id=row['target_id'],
-                    target_name=row['target_name'] or 'Unknown',
-                    target_type=row['target_type'],
-                    relationship_type=row['relationship_type'],
-                    strength=row['strength']
-                ) for row in rel_rows
-            ]
-            
-            return ConceptGraph(
-                entity_id=entity_id,
-                entity_type=entity['type'],
-                entity_name=entity['name'],
-                relationships=relationships
-            )
+        loaders = info.context['loaders']
+        
+        # Get entity info
+        entity = await loaders.entity(entity_id)
+        if not entity:
+            return None
+        
+        # Get relationships; target names resolve through the batched loaders
+        rel_rows = await loaders.relationships_by_source.load(entity_id)
+        target_names = await asyncio.gather(*(
+            loaders.entity_name(row['target_type'], row['target_uuid']) for row in rel_rows
+        ))
+        
+        relationships = [
+            Relationship(
+                target_id=row['target_id'],
+                target_name=target_name or 'Unknown',
+                target_type=row['target_type'],
+                relationship_type=row['relationship_type'],
+                strength=row['strength']
+            ) for row, target_name in zip(rel_rows, target_names)
+        ]
+        
+        return ConceptGraph(
+            entity_id=entity_id,
+            entity_type=entity['type'],
+            entity_name=entity['name'],
+            relationships=relationships
+        )
 
 # Create FastAPI app
 app = FastAPI(title="FloPy Knowledge Base API")
@@ -478,7 +730,7 @@ app = FastAPI(title="FloPy Knowledge Base API")
 schema = strawberry.Schema(query=Query)
 
 # Add GraphQL route
-graphql_app = GraphQLRouter(schema)
+graphql_app = GraphQLRouter(schema, context_getter=get_context)
 app.include_router(graphql_app, prefix="/graphql")
 
 # Lifecycle events
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Persistent LLM Response Cache
+
+Gemini analysis prompts are deterministic functions of module/workflow
+content, so re-runs, crash-resumes and schema tweaks should not pay for
+them again. Responses are stored in SQLite keyed by
+sha256(model, prompt, generation config):
+- LRU eviction bounded by total response size (a running total is kept,
+  so puts below the limit never scan the table)
+- Hit/miss counters for reporting
+- Bypass flag (or LLM_CACHE_BYPASS=1) to force fresh calls
+
+Callers store a response only after it parsed successfully, so a bad
+response is never replayed.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "flopy_expert" / "llm_responses.sqlite"
+
+# Eviction trims down to this fraction of max_bytes, so the puts that
+# follow do not each cross the limit and evict again
+EVICT_TO_FRACTION = 0.9
+
+
+class LLMResponseCache:
+    """SQLite-backed, size-bounded LRU cache of LLM response text"""
+
+    def __init__(self,
+                 db_path: Optional[Path] = None,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 bypass: bool = False):
+        self.db_path = Path(db_path or os.environ.get('LLM_CACHE_PATH', DEFAULT_CACHE_PATH))
+        self.max_bytes = max_bytes
+        self.bypass = bypass or os.environ.get('LLM_CACHE_BYPASS') == '1'
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+        self._bytes = self._total_bytes()
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, prompt: Any, config: Optional[Dict[str, Any]] = None) -> str:
+        """Content address for a (model, prompt, generation config) triple"""
+        payload = json.dumps(
+            {'model': model, 'prompt': prompt, 'config': config or {}},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss or when bypassed"""
+        if self.bypass:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        """Store a response that parsed successfully, evicting old entries if needed"""
+        if self.bypass:
+            return
+
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, model, response, size, now, now))
+            self._bytes += size - (replaced[0] if replaced else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under the low-water mark"""
+        # Other processes may share the file: count for real before deleting
+        self._bytes = self._total_bytes()
+        if self._bytes <= self.max_bytes:
+            return
+
+        excess = self._bytes - int(self.max_bytes * EVICT_TO_FRACTION)
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+        self._bytes -= freed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': total,
+            'bypass': self.bypass
+        }
+
+
+_shared_caches: Dict[str, LLMResponseCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache(db_path: Optional[Path] = None) -> LLMResponseCache:
+    """Get the process-wide cache instance for a path (shared by all analysis stages)"""
+    path = str(Path(db_path or os.environ.get('LLM_CACHE_PATH', DEFAULT_CACHE_PATH)))
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = LLMResponseCache(path)
+        return _shared_caches[path]
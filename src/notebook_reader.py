@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Streaming Notebook Reader
+
+Example notebooks often carry large base64 images and long stdout dumps in
+their cell outputs, which the workflow extractors never look at. Reading a
+notebook with json.load materialised all of it. With ijson installed the
+notebook is instead parsed as a stream of events:
+- Only the requested fields of each cell (default: cell_type, source,
+  metadata, execution_count) are built into Python objects
+- Everything else, `outputs` in particular, is skipped event by event and
+  never assembled, so memory stays tied to the size of the sources
+
+Without ijson the reader falls back to json.load and drops the same fields
+afterwards, so callers see identical cells either way.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+try:
+    import ijson
+except ImportError:  # Optional: fall back to json.load
+    ijson = None
+
+CELL_FIELDS = ('cell_type', 'source', 'metadata', 'execution_count')
+
+_VALUE_END_EVENTS = {'null', 'boolean', 'integer', 'double', 'number', 'string', 'end_map', 'end_array'}
+
+
+def _iter_cells_streaming(f, fields: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    cell = None
+    key = None
+    builder = None
+
+    # use_float: plain floats like json.load, not Decimal
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if prefix == 'cells.item':
+            if event == 'start_map':
+                cell = {}
+            elif event == 'end_map':
+                yield cell
+                cell = None
+            elif event == 'map_key':
+                key = value
+                builder = ijson.ObjectBuilder() if key in fields else None
+            continue
+
+        if builder is None or cell is None:
+            continue  # Outputs and other unwanted fields
+
+        builder.event(event, value)
+        if prefix == f'cells.item.{key}' and event in _VALUE_END_EVENTS:
+            cell[key] = builder.value
+            builder = None
+
+
+def _iter_cells_json(f, fields: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    for cell in json.load(f).get('cells', []):
+        yield {name: cell[name] for name in fields if name in cell}
+
+
+def iter_notebook_cells(notebook_path: Path, fields: Sequence[str] = CELL_FIELDS) -> Iterator[Dict[str, Any]]:
+    """Cells of an .ipynb file, each holding only `fields` (outputs skipped)"""
+    with open(notebook_path, 'rb') as f:
+        if ijson is not None:
+            yield from _iter_cells_streaming(f, fields)
+        else:
+            yield from _iter_cells_json(f, fields)
+
+
+def read_notebook_cells(notebook_path: Path, fields: Sequence[str] = CELL_FIELDS) -> List[Dict[str, Any]]:
+    return list(iter_notebook_cells(notebook_path, fields))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Prepared Statements and Binary pgvector Codecs for asyncpg
+
+Every resolver used to send its SQL text on each call, and embeddings were
+bound as ~20 KB decimal strings cast with `::text::vector`. Pools created
+through a StatementRegistry instead:
+- Register binary codecs for pgvector `vector` and `halfvec` on every new
+  connection, so embeddings travel as packed float32/float16 and `$1::vector`
+  accepts a list or numpy array directly (results decode to numpy arrays)
+- Prepare every registered statement once per pooled connection; calls
+  then only bind parameters and execute (no parse/plan per request)
+- Prepare lazily, and re-prepare once after a schema change, so a statement
+  on a table that does not exist yet never breaks pool startup
+"""
+import struct
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+import numpy as np
+
+
+# pgvector binary format: uint16 dimensions, uint16 unused, then big-endian elements
+_HEADER = struct.Struct('>HH')
+
+_VECTOR_TYPES_SQL = """
+    SELECT t.typname, n.nspname
+    FROM pg_type t
+    JOIN pg_namespace n ON n.oid = t.typnamespace
+    WHERE t.typname IN ('vector', 'halfvec')
+"""
+
+
+def _encoder(dtype: str):
+    def encode(value: Any) -> bytes:
+        array = np.asarray(value, dtype=dtype)
+        return _HEADER.pack(array.shape[0], 0) + array.tobytes()
+    return encode
+
+
+def _decoder(dtype: str):
+    def decode(data: bytes) -> np.ndarray:
+        dimensions, _ = _HEADER.unpack_from(data)
+        return np.frombuffer(data, dtype=dtype, count=dimensions, offset=_HEADER.size).astype(np.float32)
+    return decode
+
+
+VECTOR_CODECS = {
+    'vector': (_encoder('>f4'), _decoder('>f4')),
+    'halfvec': (_encoder('>f2'), _decoder('>f2')),
+}
+
+
+async def register_vector_codecs(conn: asyncpg.Connection) -> List[str]:
+    """Install binary codecs for the pgvector types present in the database"""
+    registered = []
+    for type_name, schema in await conn.fetch(_VECTOR_TYPES_SQL):
+        encoder, decoder = VECTOR_CODECS[type_name]
+        await conn.set_type_codec(
+            type_name,
+            schema=schema,
+            encoder=encoder,
+            decoder=decoder,
+            format='binary'
+        )
+        registered.append(type_name)
+    return registered
+
+
+class PreparedConnection(asyncpg.Connection):
+    """asyncpg connection that keeps the registry's prepared statements"""
+
+    @property
+    def prepared_statements(self) -> Dict[str, Any]:
+        if 'prepared_statements' not in self.__dict__:
+            self.__dict__['prepared_statements'] = {}
+        return self.__dict__['prepared_statements']
+
+
+class StatementRegistry:
+    """Named SQL statements prepared once per pooled connection"""
+
+    def __init__(self):
+        self.statements: Dict[str, str] = {}
+
+    def register(self, name: str, sql: str) -> str:
+        """Add a statement; returns its name for use with fetch()/fetchrow()/fetchval()"""
+        if name in self.statements and self.statements[name] != sql:
+            raise ValueError(f"Statement '{name}' is already registered with different SQL")
+        self.statements[name] = sql
+        return name
+
+    async def init_connection(self, conn: asyncpg.Connection):
+        """Pool `init` hook: codecs first (prepared statements capture them), then statements"""
+        await register_vector_codecs(conn)
+        for name in self.statements:
+            try:
+                await self.prepared(conn, name)
+            except asyncpg.PostgresError as e:
+                print(f"  Warning: could not prepare '{name}' (will retry on first use): {e}")
+
+    async def create_pool(self, dsn: Optional[str], **kwargs) -> asyncpg.Pool:
+        """asyncpg.create_pool() whose connections carry the codecs and statements"""
+        return await asyncpg.create_pool(
+            dsn,
+            connection_class=PreparedConnection,
+            init=self.init_connection,
+            **kwargs
+        )
+
+    async def prepared(self, conn: Any, name: str):
+        """The connection's prepared statement for `name` (prepared on first use)"""
+        statements = conn.prepared_statements
+        statement = statements.get(name)
+        if statement is None:
+            statement = await conn.prepare(self.statements[name])
+            statements[name] = statement
+        return statement
+
+    async def _run(self, conn: Any, name: str, method: str, args: tuple):
+        statement = await self.prepared(conn, name)
+        try:
+            return await getattr(statement, method)(*args)
+        except (asyncpg.InvalidCachedStatementError, asyncpg.OutdatedSchemaCacheError):
+            # Table changed under the statement: prepare again and retry once
+            conn.prepared_statements.pop(name, None)
+            statement = await self.prepared(conn, name)
+            return await getattr(statement, method)(*args)
+
+    async def fetch(self, conn: Any, name: str, *args) -> List[asyncpg.Record]:
+        return await self._run(conn, name, 'fetch', args)
+
+    async def fetchrow(self, conn: Any, name: str, *args) -> Optional[asyncpg.Record]:
+        return await self._run(conn, name, 'fetchrow', args)
+
+    async def fetchval(self, conn: Any, name: str, *args) -> Any:
+        return await self._run(conn, name, 'fetchval', args)
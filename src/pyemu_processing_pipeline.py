@@ -6,7 +6,6 @@ Adapted from FloPy pipeline but focused on uncertainty analysis and PEST concept
 """
 import asyncio
 import hashlib
-import json
 import traceback
 from datetime import datetime
 from pathlib import Path
@@ -15,13 +14,19 @@ from dataclasses import dataclass, asdict
 import ast
 import re
 
-import psycopg2
 from psycopg2.extras import RealDictCursor
 import google.genai as genai
 from openai import AsyncOpenAI
-import subprocess
 
 from .pyemu_docs_parser import PyEMUDocsParser, PyEMUModule
+from .git_metadata import GitMetadataProvider
+from .embedding_batcher import EmbeddingBatcher
+from .db_writer import BulkUpserter, pooled_connection, ensure_data_version_table
+from .llm_cache import get_llm_cache
+from .embedding_cache import get_embedding_cache
+from .rate_limiter import get_rate_limiter, estimate_tokens
+from .stage_pipeline import Stage, StagePipeline
+from .checkpoint_journal import CheckpointJournal
 
 
 @dataclass
@@ -76,24 +81,67 @@ class PyEMUProcessor:
                  openai_api_key: str,
                  batch_size: int = 10,
                  gemini_model: str = "gemini-2.5-flash",
-                 openai_model: str = "text-embedding-3-small"):
+                 openai_model: str = "text-embedding-3-small",
+                 streaming: bool = False,
+                 stage_workers: Optional[Dict[str, int]] = None):
         self.repo_path = Path(repo_path)
         self.neon_conn = neon_conn_string
         self.batch_size = batch_size
         
+        # Streaming mode overlaps parse -> analyze -> embed -> write across files
+        self.streaming = streaming
+        self.stage_workers = {'parse': 2, 'analyze': 4, 'embed': 8}
+        if stage_workers:
+            self.stage_workers.update(stage_workers)
+        
         # Initialize AI clients
         self.gemini_client = genai.Client(api_key=gemini_api_key)
         self.gemini_model = "gemini-2.5-pro"  # Always use pro for better quality
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
         self.openai_model = openai_model
         
+        # Embedding requests from all modules are coalesced into multi-input calls
+        self.embedding_batcher = EmbeddingBatcher(
+            self.openai_client,
+            model=self.openai_model,
+            cache=get_embedding_cache(),
+            rate_limiter=get_rate_limiter('openai')
+        )
+        
+        # Analysis responses are cached on disk, keyed by model + prompt
+        self.llm_cache = get_llm_cache()
+        
+        # Shared per-provider rate limits pace the API calls instead of fixed sleeps
+        self.gemini_limiter = get_rate_limiter('gemini')
+        
         # Initialize docs parser
         self.docs_parser = PyEMUDocsParser(repo_path)
         
+        # Git metadata is resolved once per run, not per module
+        self.git_metadata = GitMetadataProvider(repo_path)
+        
         # Create checkpoints directory
         self.checkpoints_dir = Path("/home/danilopezmella/flopy_expert/pyemu_checkpoints")
         self.checkpoints_dir.mkdir(exist_ok=True)
         
+        # Append-only journal of completed/failed files across all batches and runs
+        self.journal = CheckpointJournal(self.checkpoints_dir / "journal.jsonl")
+        
+        # Module rows are buffered and upserted once per batch over a pooled connection
+        self.module_writer = BulkUpserter(
+            neon_conn_string,
+            table='pyemu_modules',
+            columns=[
+                'file_path', 'relative_path', 'category', 'module_name',
+                'module_docstring', 'source_code', 'semantic_purpose', 'use_cases',
+                'pest_integration', 'statistical_concepts', 'common_pitfalls', 'embedding_text',
+                'embedding', 'file_hash', 'last_modified', 'git_commit_hash',
+                'git_branch', 'git_commit_date'
+            ],
+            conflict_columns=['file_path'],
+            version_source='pyemu_modules'
+        )
+        
         # Ensure database tables exist
         self._ensure_tables_exist()
     
@@ -176,7 +224,7 @@ class PyEMUProcessor:
         ]
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
+            with pooled_connection(self.neon_conn) as conn:
                 with conn.cursor() as cur:
                     # Create tables
                     for schema in table_schemas:
@@ -186,7 +234,9 @@ class PyEMUProcessor:
                     for index in index_schemas:
                         cur.execute(index)
                     
-                    conn.commit()
+                    # Search caches key on this; writes below bump it
+                    ensure_data_version_table(cur)
+                    
                     print("✅ pyEMU database tables and indexes ready")
                     
         except Exception as e:
@@ -197,43 +247,42 @@ class PyEMUProcessor:
         """Calculate SHA256 hash of file content"""
         return hashlib.sha256(file_path.read_bytes()).hexdigest()
     
-    def get_git_info(self) -> Dict[str, Any]:
-        """Get current git information from repository"""
+    def load_hash_manifest(self, file_paths: Optional[List[str]] = None) -> Dict[str, str]:
+        """Fetch the stored file hash of every module (or just `file_paths`) in a single query"""
         try:
-            # Get current commit hash
-            commit_hash = subprocess.check_output(
-                ['git', 'rev-parse', 'HEAD'], 
-                cwd=self.repo_path
-            ).decode().strip()
-            
-            # Get current branch
-            branch = subprocess.check_output(
-                ['git', 'branch', '--show-current'], 
-                cwd=self.repo_path
-            ).decode().strip()
-            
-            # Get commit date
-            commit_date_str = subprocess.check_output(
-                ['git', 'show', '-s', '--format=%ci', 'HEAD'], 
-                cwd=self.repo_path
-            ).decode().strip()
-            
-            # Parse the date string
-            commit_date = datetime.strptime(commit_date_str.split()[0] + ' ' + commit_date_str.split()[1], 
-                                          '%Y-%m-%d %H:%M:%S')
-            
-            return {
-                'commit_hash': commit_hash,
-                'branch': branch or 'detached',
-                'commit_date': commit_date
-            }
+            with pooled_connection(self.neon_conn) as conn:
+                with conn.cursor() as cur:
+                    if file_paths is None:
+                        cur.execute("SELECT file_path, file_hash FROM pyemu_modules")
+                    else:
+                        cur.execute(
+                            "SELECT file_path, file_hash FROM pyemu_modules WHERE file_path = ANY(%s)",
+                            (list(file_paths),)
+                        )
+                    return dict(cur.fetchall())
         except Exception as e:
-            print(f"Warning: Could not get git info: {e}")
-            return {
-                'commit_hash': None,
-                'branch': None,
-                'commit_date': None
-            }
+            print(f"Warning: Could not load stored file hashes: {e}")
+            return {}
+    
+    def filter_changed_files(self, 
+                             files: List[Tuple[Path, PyEMUModule]], 
+                             manifest: Dict[str, str]) -> List[Tuple[Path, PyEMUModule]]:
+        """Keep only files that are new or whose SHA256 differs from the stored row"""
+        return [
+            (file_path, item) for file_path, item in files
+            if manifest.get(str(file_path)) != self.get_file_hash(file_path)
+        ]
+    
+    def split_unchanged(self, 
+                        batch: List[Tuple[Path, PyEMUModule]]) -> Tuple[List[Tuple[Path, PyEMUModule]], List[str]]:
+        """Split a batch into the files to process and the paths whose stored hash still matches"""
+        changed = self.filter_changed_files(batch, self.load_hash_manifest([str(f) for f, _ in batch]))
+        changed_paths = {str(f) for f, _ in changed}
+        return changed, [str(f) for f, _ in batch if str(f) not in changed_paths]
+    
+    def get_git_info(self) -> Dict[str, Any]:
+        """Get current git information from repository"""
+        return self.git_metadata.head_info()
     
     def extract_module_info(self, file_path: Path, module: PyEMUModule) -> PyEMUModuleInfo:
         """Extract information from a pyEMU module"""
@@ -243,8 +292,8 @@ class PyEMUProcessor:
         # Extract module name from path
         module_name = file_path.stem
         
-        # Get git information
-        git_info = self.get_git_info()
+        # Get git information (last commit touching this file)
+        git_info = self.git_metadata.file_info(file_path)
         
         # Parse AST to extract docstring, imports, classes, functions
         try:
@@ -355,18 +404,27 @@ Focus on practical calibration and uncertainty quantification applications.
 """
         
         max_retries = 3
-        retry_delay = 2  # seconds
+        
+        cache_key = self.llm_cache.make_key(self.gemini_model, prompt)
+        cached_text = self.llm_cache.get(cache_key)
         
         for attempt in range(max_retries):
             try:
-                response = await asyncio.to_thread(
-                    self.gemini_client.models.generate_content,
-                    model=self.gemini_model,
-                    contents=prompt
-                )
-                
-                # Parse markdown response
-                text = response.text
+                if cached_text is not None:
+                    # Replay a cached response; a live call follows if it no longer parses
+                    text, cached_text = cached_text, None
+                else:
+                    await self.gemini_limiter.acquire(estimate_tokens(prompt))
+                    response = await asyncio.to_thread(
+                        self.gemini_client.models.generate_content,
+                        model=self.gemini_model,
+                        contents=prompt
+                    )
+                    
+                    self.gemini_limiter.report_success()
+                    
+                    # Parse response
+                    text = response.text
                 
                 # Extract sections using regex
                 purpose_match = re.search(r'## Purpose\s*\n(.+?)(?=\n## |$)', text, re.DOTALL)
@@ -413,6 +471,8 @@ Focus on practical calibration and uncertainty quantification applications.
                     print(f"  Warning: No use cases extracted, using defaults")
                     use_cases = ["General uncertainty analysis", "PEST integration"]
                 
+                self.llm_cache.put(cache_key, self.gemini_model, text)
+                
                 return PyEMUSemanticAnalysis(
                     semantic_purpose=purpose,
                     use_cases=use_cases,
@@ -423,10 +483,12 @@ Focus on practical calibration and uncertainty quantification applications.
                 
             except Exception as e:
                 print(f"Gemini attempt {attempt + 1}/{max_retries} failed for {module_info.relative_path}: {e}")
+                # 429s slow the shared limiter down (the next acquire() waits);
+                # other failures such as 5xx or timeouts back off here
+                delay = self.gemini_limiter.retry_delay(e, attempt, base_delay=2)
                 if attempt < max_retries - 1:
-                    print(f"  Retrying in {retry_delay} seconds...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
+                    print(f"  Retrying in {delay:.0f} seconds..." if delay else "  Retrying...")
+                    await asyncio.sleep(delay)
                 else:
                     print(f"  All retries exhausted. Using fallback analysis.")
                     return self._create_fallback_analysis(module_info)
@@ -501,168 +563,185 @@ Focus on practical calibration and uncertainty quantification applications.
         combined_text = " ".join(filter(None, text_parts))
         
         try:
-            response = await self.openai_client.embeddings.create(
-                input=combined_text,
-                model=self.openai_model
-            )
-            return response.data[0].embedding, combined_text
+            embedding = await self.embedding_batcher.embed(combined_text)
+            return embedding, combined_text
             
         except Exception as e:
+            # No zero-vector fallback - the module is marked failed and retried next run
             print(f"Embedding creation failed for {module_info.relative_path}: {e}")
-            # Return zero vector as fallback
-            return [0.0] * 1536, combined_text
+            raise
     
     def save_to_database(self, 
                         module_info: PyEMUModuleInfo, 
                         semantic_analysis: PyEMUSemanticAnalysis, 
                         embedding: List[float],
                         embedding_text: str) -> bool:
-        """Save processed pyEMU module to database"""
+        """
+        Queue a processed module for the next bulk write
+        
+        Unchanged files are filtered out by the hash manifest before analysis,
+        so anything reaching here is written. Rows are committed by
+        flush_database_writes() at the end of each batch.
+        """
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
-                with conn.cursor() as cur:
-                    # Check if module already exists
-                    cur.execute(
-                        "SELECT id, file_hash FROM pyemu_modules WHERE file_path = %s",
-                        (module_info.file_path,)
-                    )
-                    existing = cur.fetchone()
-                    
-                    if existing and existing[1] == module_info.file_hash:
-                        print(f"Skipping {module_info.relative_path} - unchanged")
-                        return True
-                    
-                    # Insert or update module
-                    sql = """
-                        INSERT INTO pyemu_modules (
-                            file_path, relative_path, category, module_name,
-                            module_docstring, source_code, semantic_purpose,
-                            use_cases, pest_integration, statistical_concepts, common_pitfalls,
-                            embedding_text, embedding, file_hash, last_modified,
-                            git_commit_hash, git_branch, git_commit_date
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        ) ON CONFLICT (file_path) DO UPDATE SET
-                            relative_path = EXCLUDED.relative_path,
-                            category = EXCLUDED.category,
-                            module_name = EXCLUDED.module_name,
-                            module_docstring = EXCLUDED.module_docstring,
-                            source_code = EXCLUDED.source_code,
-                            semantic_purpose = EXCLUDED.semantic_purpose,
-                            use_cases = EXCLUDED.use_cases,
-                            pest_integration = EXCLUDED.pest_integration,
-                            statistical_concepts = EXCLUDED.statistical_concepts,
-                            common_pitfalls = EXCLUDED.common_pitfalls,
-                            embedding_text = EXCLUDED.embedding_text,
-                            embedding = EXCLUDED.embedding,
-                            file_hash = EXCLUDED.file_hash,
-                            last_modified = EXCLUDED.last_modified,
-                            git_commit_hash = EXCLUDED.git_commit_hash,
-                            git_branch = EXCLUDED.git_branch,
-                            git_commit_date = EXCLUDED.git_commit_date,
-                            processed_at = NOW()
-                    """
-                    
-                    # Read source code
-                    source_code = Path(module_info.file_path).read_text(encoding='utf-8')
-                    
-                    cur.execute(sql, (
-                        module_info.file_path,
-                        module_info.relative_path,
-                        module_info.category,
-                        module_info.module_name,
-                        module_info.module_docstring,
-                        source_code,
-                        semantic_analysis.semantic_purpose,
-                        semantic_analysis.use_cases,
-                        semantic_analysis.pest_integration,
-                        semantic_analysis.statistical_concepts,
-                        semantic_analysis.common_pitfalls,
-                        embedding_text,
-                        embedding,
-                        module_info.file_hash,
-                        module_info.last_modified,
-                        module_info.git_commit_hash,
-                        module_info.git_branch,
-                        module_info.git_commit_date
-                    ))
-                    
-                    conn.commit()
-                    return True
-                    
+            # Read source code
+            source_code = Path(module_info.file_path).read_text(encoding='utf-8')
+            
+            self.module_writer.add({
+                'file_path': module_info.file_path,
+                'relative_path': module_info.relative_path,
+                'category': module_info.category,
+                'module_name': module_info.module_name,
+                'module_docstring': module_info.module_docstring,
+                'source_code': source_code,
+                'semantic_purpose': semantic_analysis.semantic_purpose,
+                'use_cases': semantic_analysis.use_cases,
+                'pest_integration': semantic_analysis.pest_integration,
+                'statistical_concepts': semantic_analysis.statistical_concepts,
+                'common_pitfalls': semantic_analysis.common_pitfalls,
+                'embedding_text': embedding_text,
+                'embedding': embedding,
+                'file_hash': module_info.file_hash,
+                'last_modified': module_info.last_modified,
+                'git_commit_hash': module_info.git_commit_hash,
+                'git_branch': module_info.git_branch,
+                'git_commit_date': module_info.git_commit_date,
+            })
+            return True
+            
         except Exception as e:
             print(f"Database save failed for {module_info.relative_path}: {e}")
             return False
     
+    def flush_database_writes(self) -> List[str]:
+        """
+        Write all queued modules over a pooled connection
+        
+        Returns the file paths whose rows could not be written; a bad row
+        or an unreachable database fails only those modules.
+        """
+        written, rejected = self.module_writer.flush()
+        if written:
+            print(f"  💾 Wrote {written} modules to pyemu_modules")
+        for (file_path,), error in rejected.items():
+            print(f"Database write failed for {file_path}: {error}")
+        return [file_path for (file_path,) in rejected]
+    
     def save_checkpoint(self, checkpoint: PyEMUProcessingCheckpoint):
-        """Save processing checkpoint to disk"""
-        checkpoint_file = self.checkpoints_dir / f"checkpoint_{checkpoint.category}_{checkpoint.batch_id}.json"
-        
-        # Convert dataclass to dict and handle datetime serialization
-        checkpoint_data = asdict(checkpoint)
-        checkpoint_data['timestamp'] = checkpoint.timestamp.isoformat()
+        """Append a batch's outcomes to the checkpoint journal"""
+        # File hashes let resume tell a completed file from one edited since
+        versions = {}
+        for file_path in checkpoint.completed_files:
+            try:
+                versions[file_path] = self.get_file_hash(Path(file_path))
+            except OSError:
+                pass
         
-        checkpoint_file.write_text(json.dumps(checkpoint_data, indent=2))
-        print(f"Checkpoint saved: {checkpoint_file}")
+        self.journal.mark_completed_many(
+            checkpoint.completed_files, versions=versions,
+            category=checkpoint.category, batch_id=checkpoint.batch_id
+        )
+        self.journal.mark_failed_many(
+            checkpoint.failed_files, category=checkpoint.category, batch_id=checkpoint.batch_id
+        )
+        self.journal.set_meta(checkpoint.category, {
+            'batch_id': checkpoint.batch_id,
+            'total_processed': checkpoint.total_processed,
+            'timestamp': checkpoint.timestamp.isoformat()
+        })
+        print(f"Checkpoint saved: batch {checkpoint.batch_id} -> {self.journal.path.name}")
     
     def load_checkpoint(self, category: str) -> Optional[PyEMUProcessingCheckpoint]:
-        """Load the latest checkpoint for a category"""
-        checkpoints = list(self.checkpoints_dir.glob(f"checkpoint_{category}_*.json"))
-        
-        if not checkpoints:
+        """Rebuild the resume point for a category from the journal"""
+        progress = self.journal.get_meta(category)
+        if not progress:
             return None
         
-        # Find latest checkpoint
-        latest = max(checkpoints, key=lambda p: p.stat().st_mtime)
-        
-        try:
-            data = json.loads(latest.read_text())
-            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-            return PyEMUProcessingCheckpoint(**data)
-        except Exception as e:
-            print(f"Failed to load checkpoint {latest}: {e}")
-            return None
+        return PyEMUProcessingCheckpoint(
+            batch_id=progress['batch_id'],
+            completed_files=self.journal.completed_items(category=category),
+            failed_files=[f for f, entry in self.journal.failed.items() if entry.get('category') == category],
+            timestamp=datetime.fromisoformat(progress['timestamp']),
+            total_processed=progress['total_processed'],
+            category=category
+        )
+    
+    def is_file_completed(self, file_path: Path) -> bool:
+        """O(1) journal lookup; a file edited since it completed counts as pending"""
+        if not self.journal.is_completed(str(file_path)):
+            return False
+        return self.journal.is_completed(str(file_path), version=self.get_file_hash(file_path))
     
     async def process_batch(self, 
                            batch: List[Tuple[Path, PyEMUModule]], 
                            batch_id: int, 
-                           category: str) -> Tuple[List[str], List[str]]:
-        """Process a batch of pyEMU files"""
+                           category: str,
+                           force: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Process a batch of pyEMU files
+        
+        Files whose stored hash still matches are skipped and reported as
+        completed, unless force is set.
+        """
         completed = []
         failed = []
         
         print(f"\nProcessing batch {batch_id} ({category}): {len(batch)} files")
         
+        if not force:
+            batch, completed = await asyncio.to_thread(self.split_unchanged, batch)
+            if completed:
+                print(f"  Unchanged modules skipped: {len(completed)}")
+        
+        analyzed = []
         for file_path, module in batch:
             try:
                 print(f"  Processing {file_path.relative_to(self.repo_path)}...")
                 
-                # Extract module info
-                module_info = self.extract_module_info(file_path, module)
+                # Extract module info (file reads and git calls block, keep them off the loop)
+                module_info = await asyncio.to_thread(self.extract_module_info, file_path, module)
                 
                 # Semantic analysis with Gemini
                 semantic_analysis = await self.analyze_with_gemini(module_info)
-                
-                # Create embedding
-                embedding, embedding_text = await self.create_embedding(module_info, semantic_analysis)
-                
-                # Save to database
-                if self.save_to_database(module_info, semantic_analysis, embedding, embedding_text):
-                    completed.append(str(file_path))
-                    print(f"    ✓ Saved {module_info.module_name}")
-                else:
-                    failed.append(str(file_path))
-                    print(f"    ✗ Failed to save")
-                
-                # Small delay to avoid rate limits
-                await asyncio.sleep(0.5)
+                analyzed.append((file_path, module_info, semantic_analysis))
                 
             except Exception as e:
                 failed.append(str(file_path))
                 print(f"    ✗ Error processing {file_path.name}: {e}")
                 traceback.print_exc()
         
+        # Embed the whole batch together so it goes out as one request
+        embeddings = await asyncio.gather(
+            *(self.create_embedding(module_info, semantic_analysis)
+              for _, module_info, semantic_analysis in analyzed),
+            return_exceptions=True
+        )
+        
+        for (file_path, module_info, semantic_analysis), result in zip(analyzed, embeddings):
+            if isinstance(result, Exception):
+                failed.append(str(file_path))
+                print(f"    ✗ Embedding failed for {module_info.module_name}")
+                continue
+            
+            embedding, embedding_text = result
+            
+            # Queue for the batch write
+            saved = await asyncio.to_thread(
+                self.save_to_database, module_info, semantic_analysis, embedding, embedding_text
+            )
+            if saved:
+                completed.append(str(file_path))
+                print(f"    ✓ Queued {module_info.module_name}")
+            else:
+                failed.append(str(file_path))
+                print(f"    ✗ Failed to save")
+        
+        # Commit the batch's rows; only rows the database rejected fail
+        rejected = set(await asyncio.to_thread(self.flush_database_writes))
+        failed.extend(f for f in completed if f in rejected)
+        completed = [f for f in completed if f not in rejected]
+        
         return completed, failed
     
     async def process_category(self, category: str, files: List[Tuple[Path, PyEMUModule]]):
@@ -682,16 +761,21 @@ Focus on practical calibration and uncertainty quantification applications.
             start_batch = checkpoint.batch_id + 1
             total_processed = checkpoint.total_processed
             
-            # Filter out already completed files
-            completed_set = set(checkpoint.completed_files)
-            files = [(f, m) for f, m in files if str(f) not in completed_set]
+            # Filter out every file the journal has recorded as completed
+            files = [(f, m) for f, m in files if not self.is_file_completed(f)]
+        
+        if self.streaming:
+            total_processed = await self.stream_category(category, files, start_batch, total_processed)
+            print(f"\n{category.upper()} processing complete: {total_processed} modules processed")
+            return
         
         # Process in batches
         for i in range(0, len(files), self.batch_size):
             batch_id = start_batch + (i // self.batch_size)
             batch = files[i:i + self.batch_size]
             
-            completed, failed = await self.process_batch(batch, batch_id, category)
+            # process_all has already dropped unchanged files from the queue
+            completed, failed = await self.process_batch(batch, batch_id, category, force=True)
             total_processed += len(completed)
             
             # Save checkpoint
@@ -706,13 +790,89 @@ Focus on practical calibration and uncertainty quantification applications.
             self.save_checkpoint(checkpoint)
             
             print(f"Batch {batch_id} complete: {len(completed)} success, {len(failed)} failed")
-            
-            # Longer delay between batches
-            await asyncio.sleep(2)
         
         print(f"\n{category.upper()} processing complete: {total_processed} modules processed")
     
-    async def process_all(self):
+    async def stream_category(self, 
+                              category: str, 
+                              files: List[Tuple[Path, PyEMUModule]], 
+                              start_batch: int = 0, 
+                              total_processed: int = 0) -> int:
+        """
+        Process files through concurrent parse -> analyze -> embed -> write stages
+        
+        Each DB flush of batch_size modules is one checkpoint batch. Returns the
+        updated total of processed modules.
+        """
+        state = {'batch_id': start_batch, 'total': total_processed}
+        failed_files: List[str] = []
+        
+        def on_error(item, stage_name: str, error: Exception):
+            file_path = item[0]
+            failed_files.append(str(file_path))
+            print(f"    ✗ {stage_name} failed for {Path(file_path).name}: {error}")
+        
+        async def parse(item):
+            file_path, module = item
+            print(f"  Processing {file_path.relative_to(self.repo_path)}...")
+            module_info = await asyncio.to_thread(self.extract_module_info, file_path, module)
+            return file_path, module_info
+        
+        async def analyze(item):
+            file_path, module_info = item
+            semantic_analysis = await self.analyze_with_gemini(module_info)
+            return file_path, module_info, semantic_analysis
+        
+        async def embed(item):
+            file_path, module_info, semantic_analysis = item
+            embedding, embedding_text = await self.create_embedding(module_info, semantic_analysis)
+            return file_path, module_info, semantic_analysis, embedding, embedding_text
+        
+        async def write(batch):
+            completed = []
+            failed = failed_files[:]
+            failed_files.clear()
+            
+            for file_path, *row in batch:
+                saved = await asyncio.to_thread(self.save_to_database, *row)
+                (completed if saved else failed).append(str(file_path))
+            
+            # Commit the batch's rows; only rows the database rejected fail
+            rejected = set(await asyncio.to_thread(self.flush_database_writes))
+            failed.extend(f for f in completed if f in rejected)
+            completed = [f for f in completed if f not in rejected]
+            
+            state['total'] += len(completed)
+            self.save_checkpoint(PyEMUProcessingCheckpoint(
+                batch_id=state['batch_id'],
+                completed_files=completed,
+                failed_files=failed,
+                timestamp=datetime.now(),
+                total_processed=state['total'],
+                category=category
+            ))
+            print(f"Batch {state['batch_id']} complete: {len(completed)} success, {len(failed)} failed")
+            state['batch_id'] += 1
+            return completed
+        
+        pipeline = StagePipeline([
+            Stage('parse', parse, workers=self.stage_workers['parse']),
+            Stage('analyze', analyze, workers=self.stage_workers['analyze']),
+            Stage('embed', embed, workers=self.stage_workers['embed']),
+            # Analysis runs at API pace, so a timed batch would hold one module;
+            # flush only full batches (and the remainder at the end of the stream)
+            Stage('write', write, batch_size=self.batch_size, queue_size=self.batch_size * 2, batch_wait=None),
+        ], on_error=on_error)
+        await pipeline.run(files)
+        
+        if failed_files:
+            # No write batch followed these failures to journal them
+            self.journal.mark_failed_many(failed_files, category=category, batch_id=state['batch_id'])
+            print(f"  {len(failed_files)} modules failed after the last write batch (recorded in the journal)")
+        
+        return state['total']
+    
+    async def process_all(self, force_reprocess: bool = False):
         """Process all documented pyEMU modules"""
         
         print("🚀 Starting pyEMU Semantic Database Processing")
@@ -726,6 +886,23 @@ Focus on practical calibration and uncertainty quantification applications.
         
         total_files = sum(len(files) for files in queue.values())
         print(f"Total modules to process: {total_files}")
+        
+        # Hash-first change detection: only new or changed files reach Gemini/OpenAI
+        if not force_reprocess:
+            manifest = self.load_hash_manifest()
+            filtered_queue = {}
+            for key, files in queue.items():
+                changed = self.filter_changed_files(files, manifest)
+                if changed:
+                    filtered_queue[key] = changed
+            queue = filtered_queue
+            changed_files = sum(len(files) for files in queue.values())
+            print(f"Unchanged pyEMU modules skipped: {total_files - changed_files}, changed or new: {changed_files}")
+        
+        # Resolve per-file git history for every queued module in one pass
+        self.git_metadata.load_file_commits(
+            file_path for files in queue.values() for file_path, _ in files
+        )
         print()
         
         start_time = datetime.now()
@@ -746,6 +923,8 @@ Focus on practical calibration and uncertainty quantification applications.
         print("🎉 pyEMU Semantic Database Processing Complete!")
         print(f"⏱️  Total time: {duration}")
         print(f"📊 Total modules: {total_files}")
+        cache_stats = self.llm_cache.stats()
+        print(f"🗄️  LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
         print("=" * 80)
 
 
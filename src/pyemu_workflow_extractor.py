@@ -5,7 +5,6 @@ PyEmu Workflow Extractor
 Extracts uncertainty analysis workflows from PyEmu example notebooks.
 Focuses on PEST setup, uncertainty analysis, and optimization patterns.
 """
-import json
 import hashlib
 from pathlib import Path
 from datetime import datetime
@@ -14,13 +13,20 @@ from typing import List, Dict, Any, Optional, Tuple
 import ast
 import re
 
+try:
+    from .extraction_cache import extract_all_cached
+    from .notebook_reader import read_notebook_cells
+except ImportError:  # Imported as a flat module with src/ on sys.path
+    from extraction_cache import extract_all_cached
+    from notebook_reader import read_notebook_cells
+
 
 @dataclass
 class PyEmuWorkflowCell:
     """Single cell from a PyEmu notebook"""
     cell_type: str  # 'code' or 'markdown'
     content: str
-    outputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)  # Left empty: outputs are skipped when reading notebooks
     execution_count: Optional[int] = None
 
 
@@ -72,6 +78,9 @@ class PyEmuWorkflow:
 class PyEmuWorkflowExtractor:
     """Extract uncertainty analysis workflows from PyEmu notebooks"""
     
+    # Bump when extraction output changes so cached workflows are re-extracted
+    EXTRACTOR_VERSION = "2"
+    
     def __init__(self, examples_path: str):
         self.examples_path = Path(examples_path)
         
@@ -97,8 +106,8 @@ class PyEmuWorkflowExtractor:
     def extract_workflow(self, notebook_path: Path) -> Optional[PyEmuWorkflow]:
         """Extract workflow from a single notebook"""
         try:
-            with open(notebook_path, 'r', encoding='utf-8') as f:
-                notebook = json.load(f)
+            # Cell outputs (images, stdout dumps) are skipped while parsing
+            notebook = {'cells': read_notebook_cells(notebook_path)}
             
             # Extract basic info
             title = self._extract_title(notebook_path, notebook)
@@ -188,18 +197,9 @@ class PyEmuWorkflowExtractor:
             cell_type = cell['cell_type']
             content = ''.join(cell.get('source', []))
             
-            outputs = []
-            if cell_type == 'code' and 'outputs' in cell:
-                for output in cell['outputs']:
-                    if 'text' in output:
-                        outputs.append(''.join(output['text']))
-                    elif 'data' in output and 'text/plain' in output['data']:
-                        outputs.append(''.join(output['data']['text/plain']))
-            
             cells.append(PyEmuWorkflowCell(
                 cell_type=cell_type,
                 content=content,
-                outputs=outputs,
                 execution_count=cell.get('execution_count')
             ))
         
@@ -434,22 +434,25 @@ class PyEmuWorkflowExtractor:
         with open(file_path, 'rb') as f:
             return hashlib.md5(f.read()).hexdigest()
     
-    def extract_all_workflows(self) -> List[PyEmuWorkflow]:
-        """Extract all PyEmu example workflows"""
-        workflows = []
-        
+    def extract_all_workflows(self, workers: Optional[int] = None) -> List[PyEmuWorkflow]:
+        """Extract all PyEmu example workflows (cached per file hash, parallel on misses)"""
         # Find all notebook files
         notebook_files = sorted(self.examples_path.glob("*.ipynb"))
         
         print(f"Found {len(notebook_files)} PyEmu example notebooks")
         
-        for nb_file in notebook_files:
-            print(f"  Extracting {nb_file.name}...", end='')
-            workflow = self.extract_workflow(nb_file)
+        results = extract_all_cached(
+            notebook_files,
+            self.extract_workflow,
+            extractor=type(self).__name__,
+            version=self.EXTRACTOR_VERSION,
+            workers=workers
+        )
+        
+        workflows = []
+        for nb_file, workflow in zip(notebook_files, results):
+            print(f"  {nb_file.name} {'✓' if workflow else '✗'}")
             if workflow:
                 workflows.append(workflow)
-                print(" ✓")
-            else:
-                print(" ✗")
         
         return workflows
\ No newline at end of file
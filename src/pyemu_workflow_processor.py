@@ -10,31 +10,48 @@ import json
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
 import google.genai as genai
 from openai import AsyncOpenAI
 
 import sys
 sys.path.append(str(Path(__file__).parent))
 from pyemu_workflow_extractor import PyEmuWorkflowExtractor, PyEmuWorkflow
+from db_writer import pooled_connection, ensure_data_version_table, bump_data_version
+from llm_cache import get_llm_cache
+from embedding_cache import get_embedding_cache
+from stage_pipeline import Stage, StagePipeline
+from workflow_similarity import rebuild_similarity_graph, update_workflow_edges, count_edges
 
 
 class PyEmuWorkflowProcessor:
     """Process and store PyEmu uncertainty analysis workflows"""
     
+    # Workflows at or above this cosine similarity are linked as 'similar'
+    SIMILARITY_THRESHOLD = 0.75
+    
     def __init__(self,
                  examples_path: str,
                  neon_conn_string: str,
                  gemini_api_key: str,
-                 openai_api_key: str):
+                 openai_api_key: str,
+                 stage_workers: Optional[Dict[str, int]] = None):
         self.examples_path = Path(examples_path)
         self.neon_conn = neon_conn_string
         
+        # Worker counts for process_workflows_streaming()
+        self.stage_workers = {'check': 2, 'analyze': 4, 'embed': 4, 'store': 2}
+        if stage_workers:
+            self.stage_workers.update(stage_workers)
+        
         # Initialize AI clients
         self.gemini_client = genai.Client(api_key=gemini_api_key)
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
         
+        # Analysis responses are cached on disk, keyed by model + prompt
+        self.llm_cache = get_llm_cache()
+        self.embedding_cache = get_embedding_cache()
+        
         # Initialize extractor
         self.extractor = PyEmuWorkflowExtractor(examples_path)
         
@@ -154,7 +171,7 @@ class PyEmuWorkflowProcessor:
         """
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
+            with pooled_connection(self.neon_conn) as conn:
                 with conn.cursor() as cur:
                     # Create tables
                     for schema in table_schemas:
@@ -164,6 +181,9 @@ class PyEmuWorkflowProcessor:
                     for index in index_schemas:
                         cur.execute(index)
                     
+                    # Search caches key on this; writes below bump it
+                    ensure_data_version_table(cur)
+                    
                     # Create trigger
                     cur.execute(trigger_sql)
                     
@@ -219,16 +239,23 @@ Focus on practical uncertainty quantification and parameter estimation applicati
         max_retries = 3
         retry_delay = 2  # seconds
         
+        cache_key = self.llm_cache.make_key("gemini-2.5-pro", prompt)
+        cached_text = self.llm_cache.get(cache_key)
+        
         for attempt in range(max_retries):
             try:
-                response = await asyncio.to_thread(
-                    self.gemini_client.models.generate_content,
-                    model="gemini-2.5-pro",  # Use the pro model for better quality
-                    contents=prompt
-                )
-                
-                # Parse response
-                text = response.text
+                if cached_text is not None:
+                    # Replay a cached response; a live call follows if it no longer parses
+                    text, cached_text = cached_text, None
+                else:
+                    response = await asyncio.to_thread(
+                        self.gemini_client.models.generate_content,
+                        model="gemini-2.5-pro",  # Use the pro model for better quality
+                        contents=prompt
+                    )
+                    
+                    # Parse response
+                    text = response.text
                 
                 # Extract sections
                 import re
@@ -253,6 +280,8 @@ Focus on practical uncertainty quantification and parameter estimation applicati
                 if not practices:
                     raise ValueError(f"AI analysis returned no best practices")
                 
+                self.llm_cache.put(cache_key, "gemini-2.5-pro", text)
+                
                 print(f"  ✓ Analysis successful!")
                 
                 return {
@@ -360,33 +389,151 @@ Focus on practical uncertainty quantification and parameter estimation applicati
         
         combined_text = ' '.join(filter(None, text_parts))
         
+        cached = self.embedding_cache.get("text-embedding-3-small", combined_text)
+        if cached is not None:
+            return cached, combined_text
+        
         try:
             response = await self.openai_client.embeddings.create(
                 input=combined_text,
                 model="text-embedding-3-small"
             )
-            return response.data[0].embedding, combined_text
+            embedding = response.data[0].embedding
+            self.embedding_cache.put("text-embedding-3-small", combined_text, embedding)
+            return embedding, combined_text
             
         except Exception as e:
             print(f"Embedding creation failed for {workflow.title}: {e}")
             return [0.0] * 1536, combined_text
     
+    def is_workflow_unchanged(self, workflow: PyEmuWorkflow) -> bool:
+        """True if the stored row for this notebook has the same file hash"""
+        with pooled_connection(self.neon_conn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, file_hash FROM pyemu_workflows WHERE notebook_file = %s",
+                    (workflow.notebook_file,)
+                )
+                existing = cur.fetchone()
+        
+        return bool(existing and existing[1] == workflow.file_hash)
+    
+    def store_workflow(self, 
+                       workflow: PyEmuWorkflow, 
+                       analysis: Dict[str, Any], 
+                       embedding: List[float], 
+                       embedding_text: str):
+        """Upsert the workflow row and replace its sections (committed together)"""
+        with pooled_connection(self.neon_conn) as conn:
+            with conn.cursor() as cur:
+                # Insert or update workflow
+                workflow_sql = """
+                    INSERT INTO pyemu_workflows (
+                        notebook_file, title, description, workflow_type,
+                        pest_concepts, uncertainty_methods, pyemu_modules, prerequisites,
+                        num_sections, total_cells, code_cells, complexity, tags,
+                        workflow_purpose, best_practices, common_applications, implementation_tips,
+                        embedding_text, embedding, file_hash, extracted_at
+                    ) VALUES (
+                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                    ) ON CONFLICT (notebook_file) DO UPDATE SET
+                        title = EXCLUDED.title,
+                        description = EXCLUDED.description,
+                        workflow_type = EXCLUDED.workflow_type,
+                        pest_concepts = EXCLUDED.pest_concepts,
+                        uncertainty_methods = EXCLUDED.uncertainty_methods,
+                        pyemu_modules = EXCLUDED.pyemu_modules,
+                        prerequisites = EXCLUDED.prerequisites,
+                        num_sections = EXCLUDED.num_sections,
+                        total_cells = EXCLUDED.total_cells,
+                        code_cells = EXCLUDED.code_cells,
+                        complexity = EXCLUDED.complexity,
+                        tags = EXCLUDED.tags,
+                        workflow_purpose = EXCLUDED.workflow_purpose,
+                        best_practices = EXCLUDED.best_practices,
+                        common_applications = EXCLUDED.common_applications,
+                        implementation_tips = EXCLUDED.implementation_tips,
+                        embedding_text = EXCLUDED.embedding_text,
+                        embedding = EXCLUDED.embedding,
+                        file_hash = EXCLUDED.file_hash,
+                        extracted_at = EXCLUDED.extracted_at,
+                        processed_at = NOW()
+                    RETURNING id
+                """
+                
+                cur.execute(workflow_sql, (
+                    workflow.notebook_file,
+                    workflow.title,
+                    workflow.description,
+                    workflow.workflow_type,
+                    workflow.pest_concepts,
+                    workflow.uncertainty_methods,
+                    workflow.pyemu_modules,
+                    workflow.prerequisites,
+                    len(workflow.sections),
+                    workflow.total_cells,
+                    workflow.code_cells,
+                    workflow.complexity,
+                    workflow.tags,
+                    analysis['workflow_purpose'],
+                    analysis['best_practices'],
+                    analysis['common_applications'],
+                    analysis['implementation_tips'],
+                    embedding_text,
+                    embedding,
+                    workflow.file_hash,
+                    workflow.extracted_at
+                ))
+                
+                workflow_id = cur.fetchone()[0]
+                
+                # Delete existing sections
+                cur.execute("DELETE FROM pyemu_workflow_sections WHERE workflow_id = %s", (workflow_id,))
+                
+                # Insert sections (one multi-row INSERT)
+                section_rows = [
+                    (
+                        workflow_id,
+                        i,
+                        section.title,
+                        section.description,
+                        section.pest_concepts[:10],
+                        section.uncertainty_methods[:10],
+                        section.pyemu_classes[:10],
+                        section.key_functions[:20],
+                        section.code_snippets[:3]
+                    )
+                    for i, section in enumerate(workflow.sections, 1)
+                ]
+                
+                if section_rows:
+                    execute_values(cur, """
+                        INSERT INTO pyemu_workflow_sections (
+                            workflow_id, section_number, title, description,
+                            pest_concepts, uncertainty_methods, pyemu_classes,
+                            key_functions, code_snippets
+                        ) VALUES %s
+                    """, section_rows)
+                
+                # Swap this workflow's similarity edges for ones based on the new embedding
+                update_workflow_edges(
+                    cur, 'pyemu_workflows', 'pyemu_workflow_relationships', workflow_id,
+                    threshold=self.SIMILARITY_THRESHOLD
+                )
+                
+                # Cached search results for the previous data version are now stale
+                bump_data_version(cur, 'pyemu_workflows')
+        
+        print(f"✓ Saved PyEmu workflow: {workflow.title}")
+    
     async def process_workflow(self, workflow: PyEmuWorkflow) -> bool:
-        """Process a single PyEmu workflow"""
+        """Process a single PyEmu workflow and store in database"""
         
         try:
             # Check if already processed
-            with psycopg2.connect(self.neon_conn) as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "SELECT id, file_hash FROM pyemu_workflows WHERE notebook_file = %s",
-                        (workflow.notebook_file,)
-                    )
-                    existing = cur.fetchone()
-                    
-                    if existing and existing[1] == workflow.file_hash:
-                        print(f"Skipping {workflow.notebook_file} - unchanged")
-                        return True
+            if self.is_workflow_unchanged(workflow):
+                print(f"Skipping {workflow.notebook_file} - unchanged")
+                return True
             
             # Analyze with Gemini
             analysis = await self.analyze_workflow_with_gemini(workflow)
@@ -395,103 +542,58 @@ Focus on practical uncertainty quantification and parameter estimation applicati
             embedding, embedding_text = await self.create_workflow_embedding(workflow, analysis)
             
             # Store in database
-            with psycopg2.connect(self.neon_conn) as conn:
-                with conn.cursor() as cur:
-                    # Insert or update workflow
-                    workflow_sql = """
-                        INSERT INTO pyemu_workflows (
-                            notebook_file, title, description, workflow_type,
-                            pest_concepts, uncertainty_methods, pyemu_modules, prerequisites,
-                            num_sections, total_cells, code_cells, complexity, tags,
-                            workflow_purpose, best_practices, common_applications, implementation_tips,
-                            embedding_text, embedding, file_hash, extracted_at
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                        ) ON CONFLICT (notebook_file) DO UPDATE SET
-                            title = EXCLUDED.title,
-                            description = EXCLUDED.description,
-                            workflow_type = EXCLUDED.workflow_type,
-                            pest_concepts = EXCLUDED.pest_concepts,
-                            uncertainty_methods = EXCLUDED.uncertainty_methods,
-                            pyemu_modules = EXCLUDED.pyemu_modules,
-                            prerequisites = EXCLUDED.prerequisites,
-                            num_sections = EXCLUDED.num_sections,
-                            total_cells = EXCLUDED.total_cells,
-                            code_cells = EXCLUDED.code_cells,
-                            complexity = EXCLUDED.complexity,
-                            tags = EXCLUDED.tags,
-                            workflow_purpose = EXCLUDED.workflow_purpose,
-                            best_practices = EXCLUDED.best_practices,
-                            common_applications = EXCLUDED.common_applications,
-                            implementation_tips = EXCLUDED.implementation_tips,
-                            embedding_text = EXCLUDED.embedding_text,
-                            embedding = EXCLUDED.embedding,
-                            file_hash = EXCLUDED.file_hash,
-                            extracted_at = EXCLUDED.extracted_at,
-                            processed_at = NOW()
-                        RETURNING id
-                    """
-                    
-                    cur.execute(workflow_sql, (
-                        workflow.notebook_file,
-                        workflow.title,
-                        workflow.description,
-                        workflow.workflow_type,
-                        workflow.pest_concepts,
-                        workflow.uncertainty_methods,
-                        workflow.pyemu_modules,
-                        workflow.prerequisites,
-                        len(workflow.sections),
-                        workflow.total_cells,
-                        workflow.code_cells,
-                        workflow.complexity,
-                        workflow.tags,
-                        analysis['workflow_purpose'],
-                        analysis['best_practices'],
-                        analysis['common_applications'],
-                        analysis['implementation_tips'],
-                        embedding_text,
-                        embedding,
-                        workflow.file_hash,
-                        workflow.extracted_at
-                    ))
-                    
-                    workflow_id = cur.fetchone()[0]
-                    
-                    # Delete existing sections
-                    cur.execute("DELETE FROM pyemu_workflow_sections WHERE workflow_id = %s", (workflow_id,))
-                    
-                    # Insert sections
-                    for i, section in enumerate(workflow.sections, 1):
-                        section_sql = """
-                            INSERT INTO pyemu_workflow_sections (
-                                workflow_id, section_number, title, description,
-                                pest_concepts, uncertainty_methods, pyemu_classes,
-                                key_functions, code_snippets
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """
-                        
-                        cur.execute(section_sql, (
-                            workflow_id,
-                            i,
-                            section.title,
-                            section.description,
-                            section.pest_concepts[:10],
-                            section.uncertainty_methods[:10],
-                            section.pyemu_classes[:10],
-                            section.key_functions[:20],
-                            section.code_snippets[:3]
-                        ))
-                    
-                    conn.commit()
-                    print(f"✓ Saved PyEmu workflow: {workflow.title}")
-                    return True
+            self.store_workflow(workflow, analysis, embedding, embedding_text)
+            return True
                     
         except Exception as e:
             print(f"Failed to process {workflow.notebook_file}: {e}")
             return False
     
-    async def process_all_workflows(self):
+    async def process_workflows_streaming(self, workflows: List[PyEmuWorkflow]) -> int:
+        """
+        Process workflows through concurrent check -> analyze -> embed -> store stages
+        
+        Returns the number of workflows stored or already up to date.
+        """
+        successful = []
+        
+        def on_error(workflow, stage_name: str, error: Exception):
+            if isinstance(workflow, tuple):
+                workflow = workflow[0]
+            print(f"Failed to process {workflow.notebook_file} ({stage_name}): {error}")
+        
+        async def check(workflow):
+            if await asyncio.to_thread(self.is_workflow_unchanged, workflow):
+                print(f"Skipping {workflow.notebook_file} - unchanged")
+                successful.append(workflow.notebook_file)
+                return None
+            return workflow
+        
+        async def analyze(workflow):
+            analysis = await self.analyze_workflow_with_gemini(workflow)
+            return workflow, analysis
+        
+        async def embed(item):
+            workflow, analysis = item
+            embedding, embedding_text = await self.create_workflow_embedding(workflow, analysis)
+            return workflow, analysis, embedding, embedding_text
+        
+        async def store(item):
+            await asyncio.to_thread(self.store_workflow, *item)
+            successful.append(item[0].notebook_file)
+            return None
+        
+        pipeline = StagePipeline([
+            Stage('check', check, workers=self.stage_workers['check']),
+            Stage('analyze', analyze, workers=self.stage_workers['analyze']),
+            Stage('embed', embed, workers=self.stage_workers['embed']),
+            Stage('store', store, workers=self.stage_workers['store']),
+        ], on_error=on_error)
+        await pipeline.run(workflows)
+        
+        return len(successful)
+    
+    async def process_all_workflows(self, streaming: bool = False, rebuild_similarity: bool = False):
         """Process all PyEmu example workflows"""
         
         print("🚀 Starting PyEmu Workflow Extraction")
@@ -502,64 +604,48 @@ Focus on practical uncertainty quantification and parameter estimation applicati
         print(f"\nExtracted {len(workflows)} PyEmu workflows")
         
         # Process each workflow
-        successful = 0
-        for i, workflow in enumerate(workflows):
-            print(f"\nProcessing {i+1}/{len(workflows)}: {workflow.title}")
-            if await self.process_workflow(workflow):
-                successful += 1
-            
-            # Small delay to respect rate limits
-            await asyncio.sleep(1)
+        if streaming:
+            successful = await self.process_workflows_streaming(workflows)
+        else:
+            successful = 0
+            for i, workflow in enumerate(workflows):
+                print(f"\nProcessing {i+1}/{len(workflows)}: {workflow.title}")
+                if await self.process_workflow(workflow):
+                    successful += 1
+                
+                # Small delay to respect rate limits
+                await asyncio.sleep(1)
         
         print(f"\n✅ PyEmu workflow processing complete: {successful}/{len(workflows)} successful")
+        cache_stats = self.llm_cache.stats()
+        print(f"🗄️  LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
         
-        # Find similar workflows
-        print("\n🔍 Finding similar PyEmu workflows...")
-        await self.find_similar_workflows()
+        # Edges of re-ingested workflows were updated as they were stored; a full
+        # rebuild is only needed on request or when the graph was never built
+        if rebuild_similarity or not self.has_similarity_graph():
+            print("\n🔍 Finding similar PyEmu workflows...")
+            await self.find_similar_workflows()
     
-    async def find_similar_workflows(self, threshold: float = 0.75):
+    def has_similarity_graph(self) -> bool:
+        with pooled_connection(self.neon_conn) as conn:
+            with conn.cursor() as cur:
+                return count_edges(cur, 'pyemu_workflow_relationships') > 0
+    
+    async def find_similar_workflows(self, threshold: float = SIMILARITY_THRESHOLD, top_k: Optional[int] = None):
         """Find relationships between similar PyEmu workflows"""
         
         try:
-            with psycopg2.connect(self.neon_conn) as conn:
+            with pooled_connection(self.neon_conn) as conn:
                 with conn.cursor() as cur:
-                    # Get all workflow embeddings
-                    cur.execute("""
-                        SELECT id, title, embedding 
-                        FROM pyemu_workflows
-                    """)
-                    
-                    workflows = cur.fetchall()
-                    
-                    # Compare each pair
-                    relationships = []
-                    for i, (id1, title1, emb1) in enumerate(workflows):
-                        for j, (id2, title2, emb2) in enumerate(workflows[i+1:], i+1):
-                            # Calculate cosine similarity
-                            cur.execute("""
-                                SELECT 1 - (%s::vector <=> %s::vector) as similarity
-                            """, (emb1, emb2))
-                            similarity = cur.fetchone()[0]
-                            
-                            if similarity >= threshold:
-                                relationships.append({
-                                    'source': id1,
-                                    'target': id2,
-                                    'type': 'similar',
-                                    'score': similarity
-                                })
-                    
-                    # Store relationships
-                    for rel in relationships:
-                        cur.execute("""
-                            INSERT INTO pyemu_workflow_relationships 
-                            (source_workflow_id, target_workflow_id, relationship_type, similarity_score)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT DO NOTHING
-                        """, (rel['source'], rel['target'], rel['type'], rel['score']))
-                    
-                    conn.commit()
-                    print(f"✓ Found {len(relationships)} similar PyEmu workflow pairs")
+                    # One embedding fetch, blocked matrix products, one bulk insert
+                    count = rebuild_similarity_graph(
+                        cur,
+                        'pyemu_workflows',
+                        'pyemu_workflow_relationships',
+                        threshold=threshold,
+                        top_k=top_k
+                    )
+                    print(f"✓ Found {count} similar PyEmu workflow pairs")
                     
         except Exception as e:
             print(f"Error finding similar workflows: {e}")
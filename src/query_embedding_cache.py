@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Query Embedding Cache for the Search Entry Points
+
+A single user query fans out to several searches (modules, workflows,
+per-domain), and each used to embed the same string again. This cache
+makes every distinct query cost at most one OpenAI round trip:
+- In-memory LRU with a TTL, shared by all searches in the process
+- Concurrent requests for the same query await a single in-flight call;
+  if that call's request is cancelled, a waiting request takes it over
+- Optional on-disk tier (the local EmbeddingCache) so repeated queries
+  survive restarts
+- Optional EmbeddingBatcher so distinct queries arriving together (e.g.
+  concurrent API requests) share one multi-input embeddings call
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+
+
+class QueryEmbeddingCache:
+    """Async LRU + TTL cache of query embeddings with in-flight de-duplication"""
+
+    def __init__(self,
+                 openai_client: Any,
+                 model: str = "text-embedding-3-small",
+                 max_entries: int = 1024,
+                 ttl: float = 3600.0,
+                 disk_cache: Optional[EmbeddingCache] = None,
+                 dimensions: int = 1536,
+                 batcher: Optional[Any] = None):
+        self.openai_client = openai_client
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_cache = disk_cache
+        self.dimensions = dimensions
+        self.batcher = batcher  # EmbeddingBatcher; None sends one request per query
+
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+        # Stats
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _lookup(self, query: str) -> Optional[List[float]]:
+        entry = self._entries.get(query)
+        if entry is None:
+            return None
+
+        expires_at, vector = entry
+        if expires_at < time.monotonic():
+            del self._entries[query]
+            return None
+
+        self._entries.move_to_end(query)
+        return vector
+
+    def _store(self, query: str, vector: List[float]):
+        self._entries[query] = (time.monotonic() + self.ttl, vector)
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, query: str) -> List[float]:
+        """Embedding for a query string, computed at most once while cached"""
+        while True:
+            vector = self._lookup(query)
+            if vector is not None:
+                self.hits += 1
+                return vector
+
+            # Someone is already embedding this query: wait for their result
+            pending = self._in_flight.get(query)
+            if pending is None:
+                break
+            try:
+                vector = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # This request was cancelled, not the one computing
+                continue  # The computing request went away: take over
+            self.hits += 1
+            return vector
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[query] = future
+        try:
+            vector = await self._compute(query)
+            self._store(query, vector)
+            future.set_result(vector)
+            return vector
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if not future.done():
+                future.cancel()  # Cancelled (e.g. client disconnected): release the waiters
+            del self._in_flight[query]
+
+    async def _compute(self, query: str) -> List[float]:
+        if self.disk_cache is not None:
+            vector = self.disk_cache.get(self.model, query, self.dimensions)
+            if vector is not None:
+                self.disk_hits += 1
+                return vector
+
+        self.misses += 1
+        if self.batcher is not None:
+            vector = await self.batcher.embed(query)
+        else:
+            response = await self.openai_client.embeddings.create(
+                model=self.model,
+                input=query
+            )
+            vector = response.data[0].embedding
+
+        if self.disk_cache is not None:
+            self.disk_cache.put(self.model, query, vector)
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self._entries)
+        }
+
+
+_shared_caches: Dict[str, QueryEmbeddingCache] = {}
+
+
+def get_query_embedding_cache(openai_client: Any,
+                              model: str = "text-embedding-3-small",
+                              use_disk: bool = True,
+                              batcher: Optional[Any] = None) -> QueryEmbeddingCache:
+    """Get the process-wide query cache for a model (first caller's client is used)"""
+    if model not in _shared_caches:
+        _shared_caches[model] = QueryEmbeddingCache(
+            openai_client,
+            model=model,
+            disk_cache=get_embedding_cache() if use_disk else None
+        )
+    if batcher is not None:
+        _shared_caches[model].batcher = batcher
+    return _shared_caches[model]
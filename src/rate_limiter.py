@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Shared Rate Limiter for API Providers
+
+Replaces the fixed sleeps and exponential-backoff loops in the pipelines
+with per-provider token buckets:
+- A requests-per-minute bucket and an optional tokens-per-minute bucket
+- Callers reserve capacity before each call and only wait when the
+  bucket is empty, so pipelines run at the maximum allowed rate
+- 429 / RESOURCE_EXHAUSTED responses halve the rate and honour
+  Retry-After; successful calls recover it gradually
+- Other failures (5xx, timeouts) are not the limiter's business; callers
+  back off for those with retry_delay()
+
+Limiters are shared per provider within a process, so every stage that
+talks to Gemini (or OpenAI) draws from the same budget.
+"""
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+# Conservative defaults; override with configure_rate_limits() / config.RATE_LIMITS
+DEFAULT_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+    'gemini': {'rpm': 150, 'tpm': 2000000},
+    'openai': {'rpm': 3000, 'tpm': 1000000},
+    'claude': {'rpm': 50},
+}
+
+# Status values the OpenAI (status_code), Gemini (code / status) and HTTP clients use for a 429
+RATE_LIMIT_STATUSES = (429, 'RESOURCE_EXHAUSTED', 'TOO_MANY_REQUESTS')
+RATE_LIMIT_ERROR_TYPES = ('RateLimitError', 'ResourceExhausted', 'TooManyRequests')
+
+# Plain-text errors (e.g. CLI stderr): a 429 status, not any "429" in the text
+_RATE_LIMIT_MESSAGE = re.compile(
+    r"\b(?:error code|status(?: code)?|http(?:/[\d.]+)?)\s*[:=]?\s*429\b"
+    r"|\b429 too many requests\b|\bRESOURCE_EXHAUSTED\b|\brate limit(?:ed| exceeded)\b",
+    re.IGNORECASE
+)
+
+
+class TokenBucket:
+    """Token bucket whose refill rate can be lowered and recovered at runtime"""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        self.max_rate = per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1.0, self.max_rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take `amount` tokens, going into debt if needed
+
+        Returns:
+            Seconds the caller must wait before the reservation is covered
+        """
+        self.refill(now)
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider"""
+
+    def __init__(self,
+                 name: str,
+                 rpm: int,
+                 tpm: Optional[int] = None,
+                 min_fraction: float = 0.05,
+                 recovery_fraction: float = 0.05):
+        self.name = name
+        self.min_fraction = min_fraction
+        self.recovery_fraction = recovery_fraction
+
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.configure(rpm, tpm)
+
+        # Stats
+        self.calls = 0
+        self.throttle_events = 0
+        self.waited_seconds = 0.0
+
+    def configure(self, rpm: int, tpm: Optional[int] = None):
+        """Apply new limits in place, so every holder of this limiter sees them"""
+        with self._lock:
+            self.requests = TokenBucket(rpm)
+            self.tokens = TokenBucket(tpm) if tpm else None
+
+    def _buckets(self):
+        return [b for b in (self.requests, self.tokens) if b is not None]
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = self.requests.reserve(1, now)
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            delay = max(delay, self._paused_until - now)
+            self.calls += 1
+            self.waited_seconds += delay
+            return delay
+
+    async def acquire(self, tokens: int = 1):
+        """Wait (without blocking the event loop) until a call is allowed"""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: int = 1):
+        """Blocking variant of acquire() for synchronous pipelines"""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def report_rate_limited(self, retry_after: Optional[float] = None):
+        """Slow down after a 429: halve the rate and pause for Retry-After"""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets():
+                bucket.refill(now)
+                bucket.rate = max(bucket.max_rate * self.min_fraction, bucket.rate / 2)
+            pause = retry_after if retry_after is not None else 1.0 / self.requests.rate
+            self._paused_until = max(self._paused_until, now + pause)
+            self.throttle_events += 1
+            current_rpm = self.requests.rate * 60
+
+        print(f"⏳ {self.name} rate limited - pausing {pause:.1f}s, now at {current_rpm:.0f} rpm")
+
+    def report_success(self):
+        """Recover the rate gradually after successful calls"""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets():
+                if bucket.rate < bucket.max_rate:
+                    bucket.refill(now)
+                    bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate * self.recovery_fraction)
+
+    def handle_error(self, error: Exception) -> bool:
+        """
+        Feed an API error to the limiter
+
+        Returns:
+            True if it was a rate-limit error (already accounted for), so the
+            caller can retry immediately - the next acquire() does the waiting
+        """
+        if not is_rate_limit_error(error):
+            return False
+        self.report_rate_limited(retry_after_seconds(error))
+        return True
+
+    def retry_delay(self, error: Exception, attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+        """
+        Feed an API error to the limiter and get the wait before retrying
+
+        Returns:
+            0 for rate-limit errors (the next acquire() waits), otherwise an
+            exponential backoff for errors the limiter does not pace
+        """
+        if self.handle_error(error):
+            return 0.0
+        return min(max_delay, base_delay * 2 ** attempt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'throttle_events': self.throttle_events,
+            'waited_seconds': round(self.waited_seconds, 1),
+            'current_rpm': round(self.requests.rate * 60, 1)
+        }
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Recognise 429s from the OpenAI and Gemini clients (and plain messages)"""
+    if type(error).__name__ in RATE_LIMIT_ERROR_TYPES:
+        return True
+    for source in (error, getattr(error, 'response', None)):
+        for attr in ('status_code', 'code', 'status'):
+            value = getattr(source, attr, None)
+            if isinstance(value, (int, str)) and value in RATE_LIMIT_STATUSES:
+                return True
+    return bool(_RATE_LIMIT_MESSAGE.search(str(error)))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Extract Retry-After (header or Gemini retryDelay) from an API error"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        try:
+            if headers.get('retry-after-ms'):
+                return float(headers['retry-after-ms']) / 1000
+            if headers.get('retry-after'):
+                return float(headers['retry-after'])
+        except (TypeError, ValueError):
+            pass
+
+    match = re.search(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+_limits: Dict[str, Dict[str, int]] = {k: dict(v) for k, v in DEFAULT_RATE_LIMITS.items()}
+_limiters_lock = threading.Lock()
+
+
+def configure_rate_limits(limits: Optional[Dict[str, Dict[str, int]]]):
+    """Override provider limits, e.g. {'gemini': {'rpm': 1000, 'tpm': 4000000}}"""
+    if not limits:
+        return
+    with _limiters_lock:
+        for provider, provider_limits in limits.items():
+            _limits.setdefault(provider, {}).update(provider_limits)
+            limiter = _limiters.get(provider)
+            if limiter is not None:
+                # Processors built earlier hold this instance; update it rather than replace it
+                limiter.configure(_limits[provider]['rpm'], _limits[provider].get('tpm'))
+
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Get the process-wide limiter for a provider"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = _limits.get(provider, {'rpm': 60})
+            _limiters[provider] = ProviderRateLimiter(provider, limits['rpm'], limits.get('tpm'))
+        return _limiters[provider]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
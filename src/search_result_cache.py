@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Versioned Search Result Cache
+
+The knowledge base only changes when a processing pipeline commits, yet
+every search re-ran its vector and full-text queries. Results are cached
+under (normalized query, search parameters, data_version):
+- data_version is the search_data_version counter the pipelines bump in
+  the same transaction as their writes (see db_writer.bump_data_version),
+  so a re-ingest changes the key and stale rows are never served
+- Tables written outside the pipelines (the GraphQL modules/functions/
+  classes tables) nothing bumps, so their row counts and newest
+  processed_at/completed_at are folded into the version instead
+- Entries of older versions are dropped as soon as a newer version is seen;
+  a request that read a superseded version is answered but not cached
+- Concurrent identical searches await a single in-flight computation; if
+  its request is cancelled, a waiting request takes it over
+- Failures are never cached
+- Without a data version (table not created yet) nothing is cached
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Set, Tuple
+
+import asyncpg
+
+DATA_VERSION_QUERY = "SELECT version FROM search_data_version WHERE id"
+
+# Tables served by the GraphQL API that no pipeline bumps the counter for,
+# with the timestamp column (if any) their writers set on every write
+GRAPHQL_VERSION_TABLES: Dict[str, Optional[str]] = {
+    'modules': 'processed_at',
+    'functions': None,
+    'classes': None,
+    'relationships': None,
+    'usage_patterns': None,
+    'processing_log': 'completed_at',
+}
+
+# Fingerprint query per table set, built once per process from the live schema
+_fingerprint_queries: Dict[Tuple, Optional[str]] = {}
+
+
+async def _fingerprint_query(conn: Any, tables: Mapping[str, Optional[str]]) -> Optional[str]:
+    """SELECT of the counter plus count/max(timestamp) of each table that exists"""
+    key = tuple(sorted(tables.items(), key=lambda item: item[0]))
+    if key in _fingerprint_queries:
+        return _fingerprint_queries[key]
+
+    rows = await conn.fetch("""
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = ANY(current_schemas(false))
+          AND table_name = ANY($1::text[])
+    """, ['search_data_version', *tables])
+    columns: Dict[str, Set[str]] = {}
+    for row in rows:
+        columns.setdefault(row['table_name'], set()).add(row['column_name'])
+
+    parts = []
+    if 'search_data_version' in columns:
+        parts.append("(SELECT version FROM search_data_version WHERE id)")
+    for table, timestamp_column in key:
+        if table not in columns:
+            continue
+        parts.append(f"(SELECT count(*) FROM {table})")
+        if timestamp_column in columns[table]:
+            parts.append(f"(SELECT max({timestamp_column}) FROM {table})")
+
+    query = f"SELECT {', '.join(parts)}" if parts else None
+    if 'search_data_version' in columns:
+        # Until the pipelines create the counter table, look again next time
+        _fingerprint_queries[key] = query
+    return query
+
+
+async def fetch_data_version(conn: Any,
+                             untracked_tables: Optional[Mapping[str, Optional[str]]] = None) -> Optional[Hashable]:
+    """Current search data version over an asyncpg connection (None if untracked)
+
+    With `untracked_tables` the version is a tuple that also changes whenever
+    one of those tables gains, loses or re-stamps rows.
+    """
+    if untracked_tables:
+        query = await _fingerprint_query(conn, untracked_tables)
+        if query is None:
+            return None
+        try:
+            return tuple(await conn.fetchrow(query))
+        except (asyncpg.UndefinedTableError, asyncpg.UndefinedColumnError):
+            _fingerprint_queries.clear()  # Schema changed under us
+            return None
+
+    try:
+        version = await conn.fetchval(DATA_VERSION_QUERY)
+    except asyncpg.UndefinedTableError:
+        return None
+    return 0 if version is None else version
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search string"""
+    return ' '.join(query.lower().split())
+
+
+class SearchResultCache:
+    """LRU of search results keyed by query, parameters and data version"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.data_version: Optional[Hashable] = None
+
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+        self._superseded: Set[Hashable] = set()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    def _observe_version(self, data_version: Hashable) -> bool:
+        """Move to a newer version; False if this one was already superseded"""
+        if data_version == self.data_version:
+            return True
+        if data_version in self._superseded:
+            # Read before the latest ingest landed: don't roll the cache back
+            return False
+        if self.data_version is not None:
+            self._superseded.add(self.data_version)
+        # Everything cached so far belongs to an older ingest
+        self._entries.clear()
+        self.data_version = data_version
+        return True
+
+    async def get_or_compute(self,
+                             query: str,
+                             params: Tuple[Hashable, ...],
+                             data_version: Optional[Hashable],
+                             compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached result of `compute()` for this query/params at this data version"""
+        if data_version is None or not self._observe_version(data_version):
+            self.misses += 1
+            return await compute()
+
+        key = (normalize_query(query), params, data_version)
+
+        while True:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            # The same search is already running: wait for its result
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            try:
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # This request was cancelled, not the one computing
+                continue  # The computing request went away: take over
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await compute()
+            if data_version == self.data_version:  # A newer ingest may have landed meanwhile
+                self._entries[key] = result
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if not future.done():
+                future.cancel()  # Cancelled (e.g. client disconnected): release the waiters
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'data_version': self.data_version
+        }
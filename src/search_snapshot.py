@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Offline Vector Index Snapshot
+
+The searchable corpus is a few hundred 1536-d vectors per table, small
+enough to search exactly in-process. A snapshot holds, per table:
+- <table>.npy: float32 embeddings, L2-normalised, loaded memory-mapped
+- <table>.json: columnar metadata ({column: [values]}) in the same row order
+- manifest.json: tables, row counts, dimensions and the source data version
+  (written last, so a snapshot without a manifest is incomplete)
+
+SearchSnapshot answers the same queries as VectorSearch.search_async /
+search_all_async with one matrix-vector product per table, without a
+database connection.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .db_writer import pooled_connection
+from .vector_search import SEARCH_CORPORA
+from .workflow_similarity import normalize_rows
+
+DEFAULT_SNAPSHOT_DIR = Path.home() / ".cache" / "flopy_expert" / "search_snapshot"
+
+HIT_PREFIX = 'hit_'  # Metadata columns holding the unified-search fields (SEARCH_CORPORA)
+
+
+def _write_atomic(path: Path, write):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _column_dimensions(cur, table: str, column: str) -> int:
+    """Declared width of a vector(n) column (0 if the column is unsized)"""
+    cur.execute(
+        "SELECT atttypmod FROM pg_attribute WHERE attrelid = %s::regclass AND attname = %s",
+        (table, column)
+    )
+    row = cur.fetchone()
+    return max(row[0], 0) if row else 0
+
+
+def export_snapshot(conn_string: str,
+                    snapshot_dir: Path,
+                    columns: Dict[str, Sequence[str]],
+                    corpora: Optional[Dict[str, Dict[str, str]]] = None,
+                    column: str = 'embedding') -> Dict[str, Any]:
+    """
+    Dump ids, metadata and embeddings of each table into a snapshot
+
+    Args:
+        columns: table -> metadata columns to keep
+        corpora: unified-search column expressions per table (default
+            SEARCH_CORPORA), stored as hit_* columns
+
+    Returns:
+        The manifest that was written
+    """
+    corpora = SEARCH_CORPORA if corpora is None else corpora
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        'exported_at': datetime.now().isoformat(),
+        'data_version': None,
+        'dimensions': None,
+        'tables': {}
+    }
+
+    with pooled_connection(conn_string) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('search_data_version') IS NOT NULL")
+            if cur.fetchone()[0]:
+                cur.execute("SELECT version FROM search_data_version WHERE id")
+                row = cur.fetchone()
+                manifest['data_version'] = row[0] if row else 0
+
+            for table, table_columns in columns.items():
+                hit_columns = {f"{HIT_PREFIX}{name}": expr for name, expr in corpora.get(table, {}).items()}
+                selects = list(table_columns) + [f"{expr} AS {alias}" for alias, expr in hit_columns.items()]
+                cur.execute(f"""
+                    SELECT {', '.join(selects)}, {column}::real[]
+                    FROM {table}
+                    WHERE {column} IS NOT NULL
+                """)
+                rows = cur.fetchall()
+
+                names = list(table_columns) + list(hit_columns)
+                metadata = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+                if rows:
+                    vectors = normalize_rows(np.array([row[-1] for row in rows], dtype=np.float32))
+                else:
+                    # Nothing embedded yet: keep the table, searching it finds nothing
+                    vectors = np.empty((0, _column_dimensions(cur, table, column)), dtype=np.float32)
+
+                _write_atomic(snapshot_dir / f"{table}.npy", lambda f: np.save(f, vectors))
+                _write_atomic(
+                    snapshot_dir / f"{table}.json",
+                    lambda f: f.write(json.dumps(metadata, default=str).encode('utf-8'))
+                )
+
+                manifest['tables'][table] = {'rows': len(rows), 'columns': names}
+                if rows:
+                    manifest['dimensions'] = vectors.shape[1]
+
+    _write_atomic(
+        snapshot_dir / 'manifest.json',
+        lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8'))
+    )
+    return manifest
+
+
+class SearchSnapshot:
+    """Exact cosine top-k over an exported snapshot"""
+
+    def __init__(self, snapshot_dir: Path):
+        self.snapshot_dir = Path(snapshot_dir)
+        manifest_path = self.snapshot_dir / 'manifest.json'
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"No search snapshot at {self.snapshot_dir} (run the export first)")
+
+        with open(manifest_path, 'r') as f:
+            self.manifest = json.load(f)
+        self._tables: Dict[str, tuple] = {}
+
+    @property
+    def data_version(self) -> Any:
+        """Source data version, or the export time when it was untracked"""
+        version = self.manifest.get('data_version')
+        return version if version is not None else self.manifest['exported_at']
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self.manifest['tables'])
+
+    def _load(self, table: str):
+        if table not in self._tables:
+            if table not in self.manifest['tables']:
+                raise KeyError(f"Table '{table}' is not in the snapshot")
+            vectors = np.load(self.snapshot_dir / f"{table}.npy", mmap_mode='r')
+            with open(self.snapshot_dir / f"{table}.json", 'r') as f:
+                metadata = json.load(f)
+            self._tables[table] = (vectors, metadata)
+        return self._tables[table]
+
+    def _top_k(self, table: str, query_embedding: Sequence[float], limit: int):
+        vectors, metadata = self._load(table)
+        if len(vectors) == 0 or limit <= 0:
+            return [], None, metadata
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = vectors @ query
+
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores, metadata
+
+    def search(self,
+               table: str,
+               columns: Sequence[str],
+               query_embedding: Sequence[float],
+               limit: int = 5) -> List[Dict[str, Any]]:
+        """Top-k rows of one table with distance and similarity (cosine)"""
+        top, scores, metadata = self._top_k(table, query_embedding, limit)
+        results = []
+        for i in top:
+            similarity = float(scores[i])
+            row = {name: metadata[name][i] for name in columns}
+            row.update(distance=1 - similarity, similarity=similarity)
+            results.append(row)
+        return results
+
+    def search_all(self,
+                   query_embedding: Sequence[float],
+                   limit: int = 10,
+                   tables: Optional[Sequence[str]] = None,
+                   per_table_limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Merged top-k across tables, shaped like VectorSearch.search_all_async rows"""
+        hits = []
+        for table in tables or self.tables:
+            top, scores, metadata = self._top_k(table, query_embedding, per_table_limit or limit)
+            hit_columns = [name for name in metadata if name.startswith(HIT_PREFIX)]
+            for i in top:
+                hit = {'corpus': table}
+                hit.update({name[len(HIT_PREFIX):]: metadata[name][i] for name in hit_columns})
+                hit['similarity'] = float(scores[i])
+                hits.append(hit)
+
+        hits.sort(key=lambda hit: hit['similarity'], reverse=True)
+        return hits[:limit]
+
+    def counts(self) -> Dict[str, int]:
+        return {table: info['rows'] for table, info in self.manifest['tables'].items()}
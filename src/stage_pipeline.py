@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Streaming Stage Pipeline
+
+Generic asyncio producer/consumer pipeline used by the processors to
+overlap their stages (parse -> analyze -> embed -> write):
+- Each stage has its own worker count and reads from a bounded queue
+- A slow stage (DB, rate-limited API) fills its input queue and
+  backpressure stops upstream stages from running ahead
+- Batch stages receive lists of items (e.g. one DB flush per batch)
+- A failing item is reported through `on_error` and dropped; the rest
+  of the stream keeps flowing
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline stage
+
+    `func` takes an item and returns the item for the next stage (None
+    drops it). With batch_size > 0 it takes a list of items and returns a
+    list of results; a batch is sent when full or `batch_wait` seconds
+    after its first item arrived. With batch_wait=None a batch is only
+    sent when full or at the end of the stream.
+    """
+    name: str
+    func: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+    queue_size: int = 16
+    batch_size: int = 0
+    batch_wait: Optional[float] = 1.0
+
+
+class StagePipeline:
+    """Runs items through a chain of stages connected by bounded queues"""
+
+    def __init__(self,
+                 stages: List[Stage],
+                 on_error: Optional[Callable[[Any, str, Exception], None]] = None):
+        if not stages:
+            raise ValueError("StagePipeline needs at least one stage")
+        self.stages = stages
+        self.on_error = on_error or self._print_error
+
+    @staticmethod
+    def _print_error(item: Any, stage_name: str, error: Exception):
+        print(f"    ✗ {stage_name} failed for {item}: {error}")
+
+    async def run(self, items: Iterable[Any]) -> List[Any]:
+        """Feed items through all stages and return the final stage's outputs"""
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        results: List[Any] = []
+
+        async def produce():
+            for item in items:
+                await queues[0].put(item)  # Blocks when the first stage falls behind
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+
+        async def emit(index: int, output: Any):
+            if output is None:
+                return
+            if index + 1 < len(self.stages):
+                await queues[index + 1].put(output)
+            else:
+                results.append(output)
+
+        async def work(index: int):
+            stage = self.stages[index]
+            in_queue = queues[index]
+
+            while True:
+                item = await in_queue.get()
+                if item is _DONE:
+                    return
+
+                if stage.batch_size <= 0:
+                    try:
+                        output = await stage.func(item)
+                    except Exception as e:
+                        self.on_error(item, stage.name, e)
+                        continue
+                    await emit(index, output)
+                    continue
+
+                # Batch stage: collect up to batch_size items or until batch_wait expires
+                batch = [item]
+                finished = False
+                if stage.batch_wait is not None:
+                    deadline = asyncio.get_running_loop().time() + stage.batch_wait
+                while len(batch) < stage.batch_size:
+                    try:
+                        if stage.batch_wait is None:
+                            next_item = await in_queue.get()
+                        else:
+                            remaining = deadline - asyncio.get_running_loop().time()
+                            next_item = await asyncio.wait_for(in_queue.get(), timeout=max(remaining, 0))
+                    except asyncio.TimeoutError:
+                        break
+                    if next_item is _DONE:
+                        finished = True
+                        break
+                    batch.append(next_item)
+
+                try:
+                    outputs = await stage.func(batch)
+                except Exception as e:
+                    for failed_item in batch:
+                        self.on_error(failed_item, stage.name, e)
+                    outputs = []
+
+                for output in outputs or []:
+                    await emit(index, output)
+
+                if finished:
+                    return
+
+        async def run_stage(index: int):
+            await asyncio.gather(*(work(index) for _ in range(self.stages[index].workers)))
+            # Upstream is drained: tell the next stage's workers to stop
+            if index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    await queues[index + 1].put(_DONE)
+
+        await asyncio.gather(produce(), *(run_stage(i) for i in range(len(self.stages))))
+        return results
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Index-Aware Vector Search
+
+pgvector only uses an ANN index when the ORDER BY operator matches the
+index opclass. The pipelines build cosine indexes (ivfflat/hnsw with
+vector_cosine_ops), so ordering by `<->` (L2) silently turns every search
+into a sequential scan. This layer:
+- Reads each table's vector index opclass from the catalog and picks the
+  matching operator (<=> cosine, <-> L2, <#> inner product)
+- Converts the distance to a similarity score consistent with that metric
+- Sets ivfflat.probes / hnsw.ef_search in each search's transaction, sized
+  from the index (pgvector defaults probe 1 list, which can return fewer
+  than `limit` rows and miss the true nearest neighbours)
+- Verifies with EXPLAIN, under the same settings, that search plans of
+  tables large enough to need the index use it, raising SeqScanError when
+  one falls back to a sequential scan
+
+Searches run over the pooled psycopg2 connections, or over an asyncpg
+connection via search_async() for async callers. search_all_async() ranks
+several tables in one round trip (UNION ALL of per-table ANN subqueries).
+"""
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .db_writer import pooled_connection
+
+
+# opclass -> (distance operator, SQL turning that distance into a similarity)
+OPCLASS_OPERATORS: Dict[str, Tuple[str, str]] = {
+    'vector_cosine_ops': ('<=>', '1 - ({distance})'),
+    'vector_l2_ops': ('<->', '1 / (1 + ({distance}))'),
+    'vector_ip_ops': ('<#>', '-({distance})'),
+}
+
+# Distance -> cosine similarity for unit-length embeddings, so scores from tables
+# indexed with different metrics can be ranked together
+OPCLASS_COSINE: Dict[str, str] = {
+    'vector_cosine_ops': '1 - ({distance})',
+    'vector_l2_ops': '1 - ({distance}) * ({distance}) / 2',
+    'vector_ip_ops': '-({distance})',
+}
+
+DEFAULT_OPCLASS = 'vector_cosine_ops'  # Embeddings are normalised; all pipeline indexes are cosine
+
+IVFFLAT_DEFAULT_LISTS = 100
+HNSW_DEFAULT_EF_SEARCH = 40
+HNSW_MAX_EF_SEARCH = 1000
+
+# pgvector sizes ivfflat at about rows / 1000 lists: below that the index is
+# oversized for the data (or was built before the data arrived), so every
+# list is probed and a sequential scan is an acceptable plan
+ROWS_PER_LIST = 1000
+
+# Opclass, method, options and table row estimate of the ivfflat/hnsw index on
+# a column ({table}/{column} are the driver's placeholders)
+OPCLASS_SQL = """
+    SELECT opc.opcname, am.amname, ix.reloptions, t.reltuples
+    FROM pg_index i
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_class ix ON ix.oid = i.indexrelid
+    JOIN pg_am am ON am.oid = ix.relam
+    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = i.indkey[0]
+    JOIN pg_opclass opc ON opc.oid = i.indclass[0]
+    WHERE t.relname = {table}
+      AND a.attname = {column}
+      AND am.amname IN ('ivfflat', 'hnsw')
+    ORDER BY (am.amname = 'hnsw') DESC
+    LIMIT 1
+"""
+
+
+# Searchable pipeline tables mapped onto the common columns of a unified search hit
+SEARCH_CORPORA: Dict[str, Dict[str, str]] = {
+    'flopy_modules': {
+        'id': 'id::text',
+        'title': 'COALESCE(package_code, relative_path)',
+        'path': 'relative_path',
+        'purpose': 'semantic_purpose',
+    },
+    'flopy_workflows': {
+        'id': 'id::text',
+        'title': 'title',
+        'path': 'tutorial_file',
+        'purpose': 'workflow_purpose',
+    },
+    'pyemu_modules': {
+        'id': 'id::text',
+        'title': 'module_name',
+        'path': 'relative_path',
+        'purpose': 'semantic_purpose',
+    },
+    'pyemu_workflows': {
+        'id': 'id::text',
+        'title': 'title',
+        'path': 'notebook_file',
+        'purpose': 'workflow_purpose',
+    },
+}
+
+
+class SeqScanError(RuntimeError):
+    """A vector search plan does not use the table's ANN index"""
+
+
+@dataclass
+class VectorIndex:
+    """Shape of a table's ANN index, as far as search settings need it"""
+    opclass: str
+    method: str                   # 'ivfflat' or 'hnsw'
+    lists: Optional[int] = None   # ivfflat lists
+    rows: float = -1              # pg_class.reltuples (-1/0 when never analysed)
+
+    @classmethod
+    def from_row(cls, row) -> 'VectorIndex':
+        opclass, method, options, rows = row
+        lists = None
+        for option in options or []:
+            name, _, value = option.partition('=')
+            if name == 'lists':
+                lists = int(value)
+        return cls(opclass, method, lists, rows if rows is not None else -1)
+
+    @property
+    def exhaustive(self) -> bool:
+        """True when every list is probed, i.e. results are exact"""
+        if self.method != 'ivfflat':
+            return False
+        return self.rows < (self.lists or IVFFLAT_DEFAULT_LISTS) * ROWS_PER_LIST
+
+    def scan_settings(self, limit: int) -> Dict[str, int]:
+        """Index scan settings that return `limit` rows with good recall"""
+        if self.method == 'ivfflat':
+            lists = self.lists or IVFFLAT_DEFAULT_LISTS
+            probes = lists if self.exhaustive else math.ceil(math.sqrt(lists))
+            return {'ivfflat.probes': probes}
+        if self.method == 'hnsw':
+            # ef_search bounds the candidates an hnsw scan can return
+            return {'hnsw.ef_search': min(HNSW_MAX_EF_SEARCH, max(HNSW_DEFAULT_EF_SEARCH, 2 * limit))}
+        return {}
+
+
+def merge_scan_settings(settings: Sequence[Dict[str, int]]) -> Dict[str, int]:
+    """One set of settings for a statement over several indexes (largest wins)"""
+    merged: Dict[str, int] = {}
+    for setting in settings:
+        for name, value in setting.items():
+            merged[name] = max(value, merged.get(name, value))
+    return merged
+
+
+def vector_literal(embedding: Sequence[float]) -> str:
+    """Format an embedding as a pgvector text literal"""
+    return '[' + ','.join(map(str, embedding)) + ']'
+
+
+class VectorSearch:
+    """Builds and runs nearest-neighbour queries that match each table's index"""
+
+    def __init__(self,
+                 conn_string: str,
+                 default_opclass: str = DEFAULT_OPCLASS,
+                 binary_vectors: bool = False):
+        self.conn_string = conn_string
+        self.default_opclass = default_opclass
+        # asyncpg connections with pg_statements' binary vector codec take the embedding as is
+        self.binary_vectors = binary_vectors
+        self._opclasses: Dict[Tuple[str, str], Optional[str]] = {}
+        self._indexes: Dict[Tuple[str, str], Optional[VectorIndex]] = {}
+        self._lock = threading.Lock()
+
+    def _remember_index(self, key: Tuple[str, str], row) -> Optional[str]:
+        index = VectorIndex.from_row(tuple(row)) if row else None
+        with self._lock:
+            self._indexes[key] = index
+            self._opclasses[key] = index.opclass if index else None
+        return self._opclasses[key]
+
+    def index_opclass(self, table: str, column: str = 'embedding') -> Optional[str]:
+        """Opclass of the ivfflat/hnsw index on table.column (None if unindexed)"""
+        key = (table, column)
+        with self._lock:
+            if key in self._opclasses:
+                return self._opclasses[key]
+
+        with pooled_connection(self.conn_string) as conn:
+            with conn.cursor() as cur:
+                cur.execute(OPCLASS_SQL.format(table='%s', column='%s'), (table, column))
+                row = cur.fetchone()
+
+        return self._remember_index(key, row)
+
+    async def index_opclass_async(self, conn: Any, table: str, column: str = 'embedding') -> Optional[str]:
+        """index_opclass() over an asyncpg connection"""
+        key = (table, column)
+        if key not in self._opclasses:
+            row = await conn.fetchrow(OPCLASS_SQL.format(table='$1', column='$2'), table, column)
+            return self._remember_index(key, row)
+        return self._opclasses[key]
+
+    def scan_settings(self, tables: Sequence[str], limit: int, column: str = 'embedding') -> Dict[str, int]:
+        """ivfflat.probes / hnsw.ef_search for a search over these (already looked up) tables"""
+        return merge_scan_settings([
+            index.scan_settings(limit)
+            for index in (self._indexes.get((table, column)) for table in tables)
+            if index is not None
+        ])
+
+    @staticmethod
+    def _apply_settings(cur, settings: Dict[str, int]):
+        # set_config(..., true) is SET LOCAL: it ends with the search's transaction
+        for name, value in settings.items():
+            cur.execute("SELECT set_config(%s, %s, true)", (name, str(value)))
+
+    @staticmethod
+    async def _apply_settings_async(conn: Any, settings: Dict[str, int]):
+        for name, value in settings.items():
+            await conn.execute("SELECT set_config($1, $2, true)", name, str(value))
+
+    def operator(self, table: str, column: str = 'embedding') -> Tuple[str, str]:
+        """(distance operator, similarity template) matching the table's index"""
+        opclass = self.index_opclass(table, column) or self.default_opclass
+        return OPCLASS_OPERATORS.get(opclass, OPCLASS_OPERATORS[self.default_opclass])
+
+    def _vector_param(self, placeholder: str, binary: bool) -> str:
+        return f"{placeholder}::vector" if binary else f"CAST({placeholder}::text AS vector)"
+
+    def _bind_vector(self, query_embedding: Sequence[float]) -> Any:
+        return query_embedding if self.binary_vectors else vector_literal(query_embedding)
+
+    def build_query(self,
+                    table: str,
+                    columns: Sequence[str],
+                    column: str = 'embedding',
+                    where: Optional[str] = None,
+                    placeholders: Tuple[str, str] = ('%(query_vector)s', '%(limit)s'),
+                    binary: bool = False) -> str:
+        """
+        Nearest-neighbour SELECT for a table
+
+        Uses named parameters by default: %(query_vector)s, %(limit)s plus
+        any used in `where`; pass ('$1', '$2') for asyncpg. The ORDER BY is
+        the bare `column <op> vector` expression so the planner can satisfy
+        it from the index. `binary` binds the vector without a text cast.
+        """
+        vector_param, limit_param = placeholders
+        op, similarity = self.operator(table, column)
+        distance = f"{column} {op} {self._vector_param(vector_param, binary)}"
+        filters = f"{column} IS NOT NULL" + (f" AND ({where})" if where else "")
+
+        return f"""
+            SELECT
+                {', '.join(columns)},
+                {distance} AS distance,
+                {similarity.format(distance=distance)} AS similarity
+            FROM {table}
+            WHERE {filters}
+            ORDER BY {distance}
+            LIMIT {limit_param}
+        """
+
+    def search(self,
+               table: str,
+               columns: Sequence[str],
+               query_embedding: Sequence[float],
+               limit: int = 5,
+               column: str = 'embedding',
+               where: Optional[str] = None,
+               params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Top-k rows by the table's index metric, with distance and similarity"""
+        sql = self.build_query(table, columns, column, where)
+        query_params = {'query_vector': vector_literal(query_embedding), 'limit': limit, **(params or {})}
+
+        with pooled_connection(self.conn_string) as conn:
+            with conn.cursor() as cur:
+                self._apply_settings(cur, self.scan_settings([table], limit, column))
+                cur.execute(sql, query_params)
+                names = [desc[0] for desc in cur.description]
+                return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    async def search_async(self,
+                           conn: Any,
+                           table: str,
+                           columns: Sequence[str],
+                           query_embedding: Sequence[float],
+                           limit: int = 5,
+                           column: str = 'embedding') -> List[Dict[str, Any]]:
+        """search() over an asyncpg connection"""
+        await self.index_opclass_async(conn, table, column)
+
+        sql = self.build_query(table, columns, column, placeholders=('$1', '$2'), binary=self.binary_vectors)
+        async with conn.transaction():
+            await self._apply_settings_async(conn, self.scan_settings([table], limit, column))
+            rows = await conn.fetch(sql, self._bind_vector(query_embedding), limit)
+        return [dict(row) for row in rows]
+
+    def build_union_query(self,
+                          corpora: Dict[str, Dict[str, str]],
+                          column: str = 'embedding',
+                          binary: bool = False) -> str:
+        """
+        One ranked list over several tables
+
+        Each table contributes its own top-$2 ANN subquery (ordered by its
+        index operator, so every branch stays an index scan); the branches
+        are combined with UNION ALL and ranked by cosine similarity, which
+        is comparable across tables. Parameters: $1 vector, $2 per-table
+        limit, $3 overall limit. `corpora` maps table -> {output column: SQL
+        expression}; every table must produce the same output columns.
+        """
+        branches = []
+        for table, select in corpora.items():
+            opclass = self._opclasses.get((table, column)) or self.default_opclass
+            op, _ = OPCLASS_OPERATORS.get(opclass, OPCLASS_OPERATORS[self.default_opclass])
+            cosine = OPCLASS_COSINE.get(opclass, OPCLASS_COSINE[self.default_opclass])
+            distance = f"{column} {op} {self._vector_param('$1', binary)}"
+            outputs = ', '.join(f"{expr} AS {name}" for name, expr in select.items())
+
+            branches.append(f"""
+                (SELECT '{table}' AS corpus, {outputs},
+                        {cosine.format(distance=distance)} AS similarity
+                 FROM {table}
+                 WHERE {column} IS NOT NULL
+                 ORDER BY {distance}
+                 LIMIT $2)""")
+
+        return f"""
+            SELECT * FROM ({' UNION ALL '.join(branches)}
+            ) hits
+            ORDER BY similarity DESC
+            LIMIT $3
+        """
+
+    async def search_all_async(self,
+                               conn: Any,
+                               query_embedding: Sequence[float],
+                               limit: int = 10,
+                               corpora: Optional[Dict[str, Dict[str, str]]] = None,
+                               per_table_limit: Optional[int] = None,
+                               column: str = 'embedding') -> List[Dict[str, Any]]:
+        """Merged top-k across tables (default: SEARCH_CORPORA) in one round trip"""
+        corpora = corpora or SEARCH_CORPORA
+        for table in corpora:
+            await self.index_opclass_async(conn, table, column)
+
+        sql = self.build_union_query(corpora, column, binary=self.binary_vectors)
+        per_table_limit = per_table_limit or limit
+        async with conn.transaction():
+            await self._apply_settings_async(conn, self.scan_settings(list(corpora), per_table_limit, column))
+            rows = await conn.fetch(sql, self._bind_vector(query_embedding), per_table_limit, limit)
+        return [dict(row) for row in rows]
+
+    def explain(self,
+                table: str,
+                columns: Sequence[str],
+                query_embedding: Sequence[float],
+                limit: int = 5,
+                column: str = 'embedding') -> str:
+        """EXPLAIN plan of the search, under the settings the search itself runs with"""
+        sql = self.build_query(table, columns, column)
+        params = {'query_vector': vector_literal(query_embedding), 'limit': limit}
+
+        with pooled_connection(self.conn_string) as conn:
+            with conn.cursor() as cur:
+                self._apply_settings(cur, self.scan_settings([table], limit, column))
+                cur.execute("EXPLAIN " + sql, params)
+                plan = '\n'.join(row[0] for row in cur.fetchall())
+        return plan
+
+    def check_index_usage(self,
+                          tables: Sequence[str],
+                          column: str = 'embedding',
+                          dimensions: int = 1536) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Check each table's vector search plan without raising
+
+        The plan is the one production searches get. Tables still small
+        enough for their ivfflat index to be probed in full may be seq
+        scanned (the results are exact and cheap at that size); any other
+        seq scan means latency will grow with the table.
+
+        Returns ({table: index opclass} for tables served by their ANN index
+        or small enough not to need it, {table: problem} for the rest).
+        """
+        probe = [1.0 / dimensions ** 0.5] * dimensions
+        problems = {}
+        opclasses = {}
+
+        for table in tables:
+            opclass = self.index_opclass(table, column)
+            if opclass is None:
+                problems[table] = f"{table}.{column} has no ivfflat/hnsw index"
+                continue
+
+            plan = self.explain(table, [column], probe, column=column)
+            uses_index = f"Seq Scan on {table}" not in plan and "Index Scan" in plan
+            index = self._indexes.get((table, column))
+            if not uses_index and not (index is not None and index.exhaustive):
+                problems[table] = f"{table}: search plan does not use the {opclass} index\n{plan}"
+                continue
+
+            opclasses[table] = opclass
+
+        return opclasses, problems
+
+    def verify_index_usage(self,
+                           tables: Sequence[str],
+                           column: str = 'embedding',
+                           dimensions: int = 1536) -> Dict[str, str]:
+        """
+        Check that vector search on every table is served by its ANN index
+
+        Returns {table: index opclass}. Raises SeqScanError naming each table
+        that has no vector index or whose search plan is a sequential scan.
+        """
+        opclasses, problems = self.check_index_usage(tables, column, dimensions)
+        if problems:
+            raise SeqScanError("Vector search falls back to sequential scans:\n" + "\n".join(problems.values()))
+        return opclasses
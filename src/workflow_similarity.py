@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Workflow Similarity Graph
+
+find_similar_workflows used to issue one `SELECT a <=> b` round trip per
+pair of workflows (O(n^2) network calls). The graph is now built in one pass:
+- Fetch the embedding matrix once
+- Normalise rows and compute cosine similarities with blocked matrix
+  products (memory stays at block_size x n)
+- Keep pairs above a threshold, optionally only each row's top-k
+- Replace the stored edges with a single execute_values INSERT
+
+When a single workflow is re-ingested, update_workflow_edges() recomputes
+its edges exactly from the embedding matrix (one matrix-vector product for
+threshold edges) and rewrites only the edges that changed, inside the
+transaction that wrote the new embedding.
+"""
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+
+def load_embeddings(cur, table: str, column: str = 'embedding') -> Tuple[List[Any], np.ndarray]:
+    """(ids, float32 matrix) of every row with an embedding"""
+    cur.execute(f"SELECT id, {column}::real[] FROM {table} WHERE {column} IS NOT NULL ORDER BY id")
+    rows = cur.fetchall()
+    if not rows:
+        return [], np.empty((0, 0), dtype=np.float32)
+    ids = [row[0] for row in rows]
+    matrix = np.array([row[1] for row in rows], dtype=np.float32)
+    return ids, matrix
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Unit-length rows; all-zero rows (failed embeddings) stay zero and match nothing"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def similarity_edges(matrix: np.ndarray,
+                     threshold: float = 0.8,
+                     top_k: Optional[int] = None,
+                     block_size: int = 256) -> List[Tuple[int, int, float]]:
+    """
+    Undirected similarity edges as (i, j, score) with i < j
+
+    A pair is kept when its cosine similarity is >= threshold and, with
+    top_k set, when either row has the other among its top_k neighbours.
+    """
+    unit = normalize_rows(np.asarray(matrix, dtype=np.float32))
+    n = len(unit)
+    if n == 0:
+        return []
+    edges = {}
+
+    for start in range(0, n, block_size):
+        block = unit[start:start + block_size] @ unit.T  # (block, n)
+        rows = np.arange(start, start + len(block))
+        block[rows - start, rows] = -np.inf  # No self-edges
+
+        if top_k is not None:
+            if top_k < n - 1:
+                # Everything outside each row's top_k is dropped before thresholding
+                cutoff = np.partition(block, -top_k, axis=1)[:, -top_k][:, None]
+                block = np.where(block >= cutoff, block, -np.inf)
+        else:
+            block[np.arange(n)[None, :] < rows[:, None]] = -np.inf  # Each pair once: j > i
+
+        for r, c in zip(*np.nonzero(block >= threshold)):
+            i, j = sorted((int(rows[r]), int(c)))
+            edges[(i, j)] = float(block[r, c])
+
+    return [(i, j, score) for (i, j), score in sorted(edges.items())]
+
+
+def store_similarity_edges(cur,
+                           relationships_table: str,
+                           edges: Sequence[Tuple[Any, Any, float]],
+                           relationship_type: str = 'similar'):
+    """Replace all edges of this type with the given (source_id, target_id, score) rows"""
+    cur.execute(f"DELETE FROM {relationships_table} WHERE relationship_type = %s", (relationship_type,))
+    if edges:
+        execute_values(cur, f"""
+            INSERT INTO {relationships_table}
+            (source_workflow_id, target_workflow_id, relationship_type, similarity_score)
+            VALUES %s
+        """, [(source, target, relationship_type, score) for source, target, score in edges])
+
+
+def rebuild_similarity_graph(cur,
+                             table: str,
+                             relationships_table: str,
+                             threshold: float = 0.8,
+                             top_k: Optional[int] = None) -> int:
+    """Recompute and store the similarity edges of a workflow table; returns the edge count"""
+    ids, matrix = load_embeddings(cur, table)
+    edges = [(ids[i], ids[j], score) for i, j, score in similarity_edges(matrix, threshold, top_k)]
+    store_similarity_edges(cur, relationships_table, edges)
+    return len(edges)
+
+
+def count_edges(cur, relationships_table: str, relationship_type: str = 'similar') -> int:
+    cur.execute(f"SELECT COUNT(*) FROM {relationships_table} WHERE relationship_type = %s", (relationship_type,))
+    return cur.fetchone()[0]
+
+
+def _stored_edges(cur,
+                  relationships_table: str,
+                  relationship_type: str,
+                  workflow_id: Optional[Any] = None) -> Dict[FrozenSet[str], Tuple[Any, Any, float]]:
+    """Stored edges of this type (only the workflow's, when given), keyed by their unordered pair"""
+    sql = f"""
+        SELECT source_workflow_id, target_workflow_id, similarity_score
+        FROM {relationships_table}
+        WHERE relationship_type = %(type)s
+    """
+    if workflow_id is not None:
+        sql += " AND (source_workflow_id = %(id)s OR target_workflow_id = %(id)s)"
+    cur.execute(sql, {'type': relationship_type, 'id': workflow_id})
+    return {frozenset((str(source), str(target))): (source, target, score) for source, target, score in cur.fetchall()}
+
+
+def update_workflow_edges(cur,
+                          table: str,
+                          relationships_table: str,
+                          workflow_id: Any,
+                          threshold: float = 0.8,
+                          top_k: Optional[int] = None,
+                          relationship_type: str = 'similar') -> int:
+    """
+    Bring the stored edges up to date after one workflow's embedding changed
+
+    The result equals what rebuild_similarity_graph() would store. Without
+    top_k an edge depends only on its own pair, so just the workflow's row
+    of the matrix is recomputed and only its edges are touched. With top_k,
+    the workflow can enter or leave other workflows' top-k lists, so the
+    whole graph is recomputed in memory; either way only the edges that
+    differ from the stored ones are deleted or inserted. Returns the number
+    of edges the workflow has afterwards.
+    """
+    # Serialise concurrent updates of the same graph: a workflow stored right
+    # after this one then sees its committed embedding and edges
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (relationships_table,))
+
+    ids, matrix = load_embeddings(cur, table)
+    keys = [str(i) for i in ids]
+    row = keys.index(str(workflow_id)) if str(workflow_id) in keys else None
+
+    # Edges oriented like the full rebuild: source is the lower matrix row (id order)
+    fresh: Dict[FrozenSet[str], Tuple[Any, Any, float]] = {}
+    if top_k is None:
+        if row is not None:
+            unit = normalize_rows(matrix)
+            scores = unit @ unit[row]
+            for j in np.nonzero(scores >= threshold)[0]:
+                if j != row:
+                    i, k = sorted((row, int(j)))
+                    fresh[frozenset((keys[i], keys[k]))] = (ids[i], ids[k], float(scores[j]))
+        stored = _stored_edges(cur, relationships_table, relationship_type, workflow_id)
+    else:
+        for i, j, score in similarity_edges(matrix, threshold, top_k):
+            fresh[frozenset((keys[i], keys[j]))] = (ids[i], ids[j], score)
+        stored = _stored_edges(cur, relationships_table, relationship_type)
+
+    stale = [
+        edge for pair, edge in stored.items()
+        if pair not in fresh or abs(fresh[pair][2] - (edge[2] or 0.0)) > 1e-6
+    ]
+    new = [
+        edge for pair, edge in fresh.items()
+        if pair not in stored or abs(edge[2] - (stored[pair][2] or 0.0)) > 1e-6
+    ]
+
+    if stale:
+        execute_values(cur, f"""
+            DELETE FROM {relationships_table} r
+            USING (VALUES %s) AS stale (source_id, target_id, relationship_type)
+            WHERE r.relationship_type = stale.relationship_type
+              AND r.source_workflow_id::text = stale.source_id
+              AND r.target_workflow_id::text = stale.target_id
+        """, [(str(source), str(target), relationship_type) for source, target, _ in stale])
+    if new:
+        execute_values(cur, f"""
+            INSERT INTO {relationships_table}
+            (source_workflow_id, target_workflow_id, relationship_type, similarity_score)
+            VALUES %s
+        """, [(source, target, relationship_type, score) for source, target, score in new])
+
+    workflow_key = str(workflow_id)
+    return sum(1 for pair in fresh if workflow_key in pair)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the append-only checkpoint journal
+"""
+from src.checkpoint_journal import CheckpointJournal
+
+
+def test_state_survives_reopening(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = CheckpointJournal(path, fsync=False)
+    journal.mark_completed_many(["a.py", "b.py"], versions={"a.py": "h1"}, model_family="mf6")
+    journal.mark_failed("c.py", error="boom", model_family="mf6")
+    journal.set_meta("mf6", {"batch_id": 3})
+    journal.close()
+
+    reopened = CheckpointJournal(path, fsync=False)
+    assert reopened.is_completed("a.py", version="h1")
+    assert not reopened.is_completed("a.py", version="h2")
+    assert reopened.is_completed("b.py")
+    assert reopened.is_failed("c.py")
+    assert reopened.get_meta("mf6") == {"batch_id": 3}
+    assert sorted(reopened.completed_items(model_family="mf6")) == ["a.py", "b.py"]
+
+
+def test_last_record_wins(tmp_path):
+    journal = CheckpointJournal(tmp_path / "journal.jsonl", fsync=False)
+    journal.mark_failed("a.py")
+    journal.mark_completed("a.py")
+    assert journal.is_completed("a.py") and not journal.is_failed("a.py")
+
+    journal.mark_failed("a.py")
+    assert journal.is_failed("a.py") and not journal.is_completed("a.py")
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = CheckpointJournal(path, fsync=False)
+    journal.mark_completed("a.py")
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('{"status": "completed", "id": "b.p')  # Crash mid-write
+
+    reopened = CheckpointJournal(path, fsync=False)
+    reopened.mark_completed("c.py")
+    reopened.close()
+
+    final = CheckpointJournal(path, fsync=False)
+    assert sorted(final.completed) == ["a.py", "c.py"]
+
+
+def test_compact_keeps_current_state(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = CheckpointJournal(path, fsync=False)
+    for _ in range(5):
+        journal.mark_failed("a.py")
+        journal.mark_completed("a.py", version="h")
+    journal.set_meta("progress", 10)
+    journal.compact()
+    journal.close()
+
+    assert len(path.read_text().splitlines()) == 2
+    reopened = CheckpointJournal(path, fsync=False)
+    assert reopened.is_completed("a.py", version="h")
+    assert reopened.get_meta("progress") == 10
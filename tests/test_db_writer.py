@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled bulk writer
+"""
+import threading
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+import psycopg2
+from psycopg2 import DataError, OperationalError
+from psycopg2.pool import PoolError
+
+from src import db_writer
+from src.db_writer import BulkUpserter, pooled_connection
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, params=None):
+        self.log.append(('execute', sql, params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.log.append(('commit',))
+
+    def rollback(self):
+        self.log.append(('rollback',))
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.returned = []
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        self.returned.append(close)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(db_writer, 'get_pool', lambda conn_string: pool)
+    return pool
+
+
+def test_pooled_connection_commits_and_returns(pool):
+    with pooled_connection('postgres://test') as conn:
+        conn.cursor().execute("SELECT 1")
+
+    assert pool.conn.log[-1] == ('commit',)
+    assert pool.returned == [False]
+
+
+def test_pooled_connection_rolls_back_and_discards_dropped_connections(pool):
+    with pytest.raises(RuntimeError):
+        with pooled_connection('postgres://test'):
+            raise RuntimeError("boom")
+    assert pool.conn.log == [('rollback',)]
+
+    pool.conn.closed = 1
+    with pytest.raises(RuntimeError):
+        with pooled_connection('postgres://test'):
+            raise RuntimeError("server went away")
+    assert pool.conn.log == [('rollback',)]  # No rollback on a closed connection
+    assert pool.returned == [False, True]
+
+
+@pytest.fixture
+def writes(monkeypatch, pool):
+    calls = []
+    monkeypatch.setattr(
+        db_writer, 'execute_values',
+        lambda cur, sql, rows, page_size=100: calls.append((sql, list(rows)))
+    )
+    return calls
+
+
+def test_rows_with_the_same_key_collapse_to_the_latest(writes, pool):
+    upserter = BulkUpserter('postgres://test', 'flopy_modules', ['path', 'purpose'], ['path'],
+                            version_source='flopy')
+    upserter.add({'path': 'a.py', 'purpose': 'old'})
+    upserter.add({'path': 'b.py', 'purpose': 'b'})
+    upserter.add({'path': 'a.py', 'purpose': 'new'})
+    assert len(upserter) == 2
+
+    assert upserter.flush() == (2, {})
+    sql, rows = writes[0]
+    assert rows == [('b.py', 'b'), ('a.py', 'new')]
+    assert "ON CONFLICT (path) DO UPDATE SET" in sql
+    assert "purpose = EXCLUDED.purpose" in sql and "processed_at = NOW()" in sql
+
+    # The data version is bumped in the same transaction, before the commit
+    assert pool.conn.log[0][2] == ('flopy',) and pool.conn.log[-1] == ('commit',)
+    assert len(upserter) == 0 and upserter.flush() == (0, {})
+
+
+def test_dropped_connection_is_retried_once(monkeypatch, pool):
+    attempts = []
+
+    def flaky_execute_values(cur, sql, rows, page_size=100):
+        attempts.append(list(rows))
+        if len(attempts) == 1:
+            raise OperationalError("server closed the connection unexpectedly")
+
+    monkeypatch.setattr(db_writer, 'execute_values', flaky_execute_values)
+    upserter = BulkUpserter('postgres://test', 'flopy_modules', ['path'], ['path'], touch_columns=None)
+    upserter.add({'path': 'a.py'})
+    upserter.add({'path': 'b.py'})
+
+    assert upserter.flush() == (2, {})
+    assert attempts == [[('a.py',), ('b.py',)]] * 2
+
+
+def test_bad_rows_are_bisected_out(monkeypatch, pool):
+    committed = []
+
+    def execute_values(cur, sql, rows, page_size=100):
+        if ('bad',) in rows:
+            raise DataError("invalid input syntax")
+        committed.extend(rows)
+
+    monkeypatch.setattr(db_writer, 'execute_values', execute_values)
+    upserter = BulkUpserter('postgres://test', 'flopy_modules', ['path'], ['path'], touch_columns=None)
+    for path in ['a', 'b', 'bad', 'c', 'd']:
+        upserter.add({'path': path})
+
+    written, rejected = upserter.flush()
+
+    assert written == 4 and sorted(committed) == [('a',), ('b',), ('c',), ('d',)]
+    assert list(rejected) == [('bad',)] and isinstance(rejected[('bad',)], DataError)
+    assert len(upserter) == 0
+
+
+def test_unreachable_database_rejects_the_batch_without_bisecting(monkeypatch, pool):
+    attempts = []
+
+    def down(cur, sql, rows, page_size=100):
+        attempts.append(len(rows))
+        raise OperationalError("could not connect to server")
+
+    monkeypatch.setattr(db_writer, 'execute_values', down)
+    upserter = BulkUpserter('postgres://test', 'flopy_modules', ['path'], ['path'], touch_columns=None)
+    upserter.add({'path': 'a.py'})
+    upserter.add({'path': 'b.py'})
+
+    written, rejected = upserter.flush()
+    assert written == 0 and sorted(rejected) == [('a.py',), ('b.py',)]
+    assert attempts == [2, 2]  # One retry, no bisection
+
+
+class PoolConnection:
+    def __init__(self, alive=True):
+        self.closed = 0
+        self.alive = alive
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                if not conn.alive:
+                    raise OperationalError("SSL connection has been closed unexpectedly")
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        return Cursor()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+    class info:
+        transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+@pytest.fixture
+def blocking_pool(monkeypatch):
+    connections = []
+
+    def connect(*args, **kwargs):
+        connections.append(PoolConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(psycopg2, 'connect', connect)
+    pool = db_writer.BlockingConnectionPool(2, 2, 'postgres://test', wait_timeout=0.2)
+    return pool, connections
+
+
+def test_pool_waits_for_a_free_connection(blocking_pool):
+    pool, connections = blocking_pool
+    first, second = pool.getconn(), pool.getconn()
+
+    with pytest.raises(PoolError):
+        pool.getconn()  # Nothing is returned within wait_timeout
+
+    threading.Timer(0.05, pool.putconn, args=(first,)).start()
+    assert pool.getconn() is first
+    assert len(connections) == 2
+
+
+def test_pool_replaces_connections_dropped_while_idle(blocking_pool, monkeypatch):
+    pool, connections = blocking_pool
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    conn.alive = False
+    monkeypatch.setattr(db_writer, 'IDLE_CHECK_SECONDS', 0.0)
+    fresh = pool.getconn()
+
+    assert fresh is not conn and conn.closed
+    assert len(connections) == 2
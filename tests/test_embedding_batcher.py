@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the embedding batcher's retry and split behaviour
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+
+from src import embedding_batcher
+from src.embedding_batcher import EmbeddingBatcher
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeEmbeddings:
+    def __init__(self, fail_with=None, fail_times=0):
+        self.calls = []
+        self.fail_with = fail_with
+        self.fail_times = fail_times
+
+    async def create(self, input, model):
+        self.calls.append(list(input))
+        if self.fail_with is not None and len(self.calls) <= self.fail_times:
+            raise self.fail_with(list(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)
+        ])
+
+
+def make_batcher(embeddings, **kwargs):
+    client = SimpleNamespace(embeddings=embeddings)
+    return EmbeddingBatcher(client, max_wait=0.001, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    async def sleep(_):
+        pass
+    monkeypatch.setattr(embedding_batcher.asyncio, 'sleep', sleep)
+
+
+def test_texts_are_sent_in_one_request():
+    embeddings = FakeEmbeddings()
+    batcher = make_batcher(embeddings)
+
+    vectors = asyncio.run(batcher.embed_many(['a', 'bb', 'ccc']))
+
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert embeddings.calls == [['a', 'bb', 'ccc']]
+
+
+def test_rate_limited_batch_is_resent_whole_then_fails():
+    embeddings = FakeEmbeddings(fail_with=lambda texts: StatusError(429), fail_times=10)
+    batcher = make_batcher(embeddings, max_retries=2)
+
+    with pytest.raises(StatusError):
+        asyncio.run(batcher.embed_many(['a', 'b', 'c', 'd']))
+
+    # Initial attempt plus two retries, never split
+    assert embeddings.calls == [['a', 'b', 'c', 'd']] * 3
+
+
+def test_input_error_splits_the_batch():
+    class RejectLarge(FakeEmbeddings):
+        async def create(self, input, model):
+            if len(input) > 2:
+                self.calls.append(list(input))
+                raise StatusError(400)
+            return await super().create(input, model)
+
+    embeddings = RejectLarge()
+    batcher = make_batcher(embeddings)
+
+    vectors = asyncio.run(batcher.embed_many(['a', 'bb', 'ccc', 'dddd']))
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+    assert embeddings.calls[0] == ['a', 'bb', 'ccc', 'dddd']
+    assert sorted(embeddings.calls[1:]) == [['a', 'bb'], ['ccc', 'dddd']]
+
+
+def test_server_error_is_retried_without_splitting():
+    embeddings = FakeEmbeddings(fail_with=lambda texts: StatusError(503), fail_times=1)
+    batcher = make_batcher(embeddings)
+
+    vectors = asyncio.run(batcher.embed_many(['a', 'bb']))
+
+    assert vectors == [[1.0], [2.0]]
+    assert embeddings.calls == [['a', 'bb'], ['a', 'bb']]
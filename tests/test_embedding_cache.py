@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the local embedding store
+"""
+import multiprocessing
+
+from src.embedding_cache import EmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+def vector_for(text, dimensions=8):
+    return [float(len(text))] + [float(ord(text[-1]))] * (dimensions - 1)
+
+
+def test_round_trip(tmp_path):
+    cache = EmbeddingCache(tmp_path, initial_capacity=2)
+
+    assert cache.get(MODEL, "a", 8) is None
+    for text in ["a", "bb", "ccc"]:  # Third put grows the vector file
+        cache.put(MODEL, text, vector_for(text))
+
+    for text in ["a", "bb", "ccc"]:
+        assert cache.get(MODEL, text, 8) == vector_for(text)
+    assert cache.get("other-model", "a", 8) is None
+    assert cache.stats()['entries'] == 3
+
+
+def test_bypass_never_stores(tmp_path):
+    cache = EmbeddingCache(tmp_path, bypass=True)
+    cache.put(MODEL, "a", vector_for("a"))
+    assert cache.get(MODEL, "a", 8) is None
+
+
+def _writer(cache_dir, prefix, count):
+    cache = EmbeddingCache(cache_dir, initial_capacity=4)
+    for i in range(count):
+        text = f"{prefix}-{i}"
+        cache.put(MODEL, text, vector_for(text))
+
+
+def test_concurrent_processes_never_share_a_row(tmp_path):
+    processes = [
+        multiprocessing.Process(target=_writer, args=(tmp_path, prefix, 40))
+        for prefix in ("x", "y", "z")
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    cache = EmbeddingCache(tmp_path)
+    for prefix in ("x", "y", "z"):
+        for i in range(40):
+            text = f"{prefix}-{i}"
+            assert cache.get(MODEL, text, 8) == vector_for(text)
+
+    rows = cache._conn.execute("SELECT row FROM vectors").fetchall()
+    assert len(rows) == len(set(rows)) == 120
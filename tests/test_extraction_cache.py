@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the workflow extraction cache
+"""
+import pytest
+
+from src.extraction_cache import ExtractionCache, extract_all_cached
+
+
+def extract_length(path):
+    """Module-level so the process pool can pickle it"""
+    text = path.read_text()
+    return None if 'broken' in text else {'path': path.name, 'length': len(text)}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(tmp_path / "extractions.sqlite")
+
+
+def write_files(tmp_path, contents):
+    paths = []
+    for name, text in contents.items():
+        path = tmp_path / name
+        path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+def test_unchanged_files_come_from_the_cache(tmp_path, cache):
+    paths = write_files(tmp_path, {'a.py': 'aaa', 'b.py': 'bb'})
+
+    first = extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache)
+    second = extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache)
+
+    assert first == second == [{'path': 'a.py', 'length': 3}, {'path': 'b.py', 'length': 2}]
+    assert cache.stats() == {'hits': 2, 'misses': 2}
+
+
+def test_changed_file_and_new_version_are_extracted_again(tmp_path, cache):
+    paths = write_files(tmp_path, {'a.py': 'aaa', 'b.py': 'bb'})
+    extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache)
+
+    paths[0].write_text('aaaa')
+    results = extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache)
+    assert results[0]['length'] == 4
+    assert cache.stats() == {'hits': 1, 'misses': 3}
+
+    extract_all_cached(paths, extract_length, 'flopy', '2', workers=1, cache=cache)
+    assert cache.stats() == {'hits': 1, 'misses': 5}
+
+
+def test_failures_are_not_cached(tmp_path, cache):
+    paths = write_files(tmp_path, {'a.py': 'broken'})
+
+    assert extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache) == [None]
+    paths[0].write_text('fixed')
+    assert extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache) == [
+        {'path': 'a.py', 'length': 5}
+    ]
+
+
+def test_misses_are_extracted_in_a_process_pool(tmp_path, cache):
+    paths = write_files(tmp_path, {f'{i}.py': 'x' * i for i in range(1, 5)})
+
+    results = extract_all_cached(paths, extract_length, 'flopy', '1', workers=2, cache=cache)
+
+    assert [result['length'] for result in results] == [1, 2, 3, 4]
+    assert cache.stats()['misses'] == 4
+
+
+def test_bypass_never_stores(tmp_path):
+    cache = ExtractionCache(tmp_path / "extractions.sqlite", bypass=True)
+    paths = write_files(tmp_path, {'a.py': 'aaa'})
+
+    extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache)
+    extract_all_cached(paths, extract_length, 'flopy', '1', workers=1, cache=cache)
+
+    assert cache.stats() == {'hits': 0, 'misses': 0}
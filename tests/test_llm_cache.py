@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent LLM response cache
+"""
+import time
+
+from src.llm_cache import LLMResponseCache
+
+MODEL = "gemini-2.5-flash"
+
+
+def test_key_is_stable_and_covers_model_prompt_and_config():
+    key = LLMResponseCache.make_key(MODEL, "prompt", {'temperature': 0.1, 'top_p': 1})
+
+    assert key == LLMResponseCache.make_key(MODEL, "prompt", {'top_p': 1, 'temperature': 0.1})
+    assert LLMResponseCache.make_key(MODEL, "prompt") == LLMResponseCache.make_key(MODEL, "prompt", {})
+    assert len({
+        key,
+        LLMResponseCache.make_key("other-model", "prompt", {'temperature': 0.1, 'top_p': 1}),
+        LLMResponseCache.make_key(MODEL, "prompt!", {'temperature': 0.1, 'top_p': 1}),
+        LLMResponseCache.make_key(MODEL, "prompt", {'temperature': 0.2, 'top_p': 1}),
+    }) == 4
+
+
+def test_round_trip_survives_reopening(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite")
+    key = cache.make_key(MODEL, "prompt")
+    assert cache.get(key) is None
+
+    cache.put(key, MODEL, '{"purpose": "ok"}')
+    assert cache.get(key) == '{"purpose": "ok"}'
+    assert LLMResponseCache(tmp_path / "llm.sqlite").get(key) == '{"purpose": "ok"}'
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=350)
+    for name in ("a", "b", "c"):
+        cache.put(name, MODEL, name * 100)
+        time.sleep(0.01)  # Distinct last_used stamps
+
+    cache.get("a")  # "b" is now the oldest
+    time.sleep(0.01)
+    cache.put("d", MODEL, "d" * 100)
+
+    assert cache.get("b") is None
+    assert [cache.get(name) is not None for name in ("a", "c", "d")] == [True, True, True]
+    assert cache.stats()['bytes'] == cache._bytes == 300
+
+
+def test_eviction_trims_below_the_limit(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=1000)
+    for i in range(10):
+        cache.put(str(i), MODEL, "x" * 100)
+        time.sleep(0.01)
+
+    cache.put("new", MODEL, "x" * 100)  # 1100 bytes: trimmed to <= 900, not just 1000
+    assert cache.stats()['entries'] == 9 and cache._bytes == 900
+    assert cache.get("0") is None and cache.get("1") is None
+
+
+def test_replacing_a_response_does_not_count_it_twice(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=250)
+    cache.put("a", MODEL, "x" * 100)
+    cache.put("b", MODEL, "y" * 100)
+    cache.put("a", MODEL, "z" * 120)
+
+    assert cache._bytes == cache.stats()['bytes'] == 220
+    assert cache.stats()['entries'] == 2
+    assert LLMResponseCache(tmp_path / "llm.sqlite")._bytes == 220
+
+
+def test_bypass_never_reads_or_stores(tmp_path, monkeypatch):
+    LLMResponseCache(tmp_path / "llm.sqlite").put("a", MODEL, "cached")
+
+    cache = LLMResponseCache(tmp_path / "llm.sqlite", bypass=True)
+    cache.put("b", MODEL, "fresh")
+    assert cache.get("a") is None and cache.get("b") is None
+
+    monkeypatch.setenv('LLM_CACHE_BYPASS', '1')
+    assert LLMResponseCache(tmp_path / "llm.sqlite").bypass
+    assert LLMResponseCache(tmp_path / "llm.sqlite", bypass=False).stats()['entries'] == 1
+
+
+def test_stats_count_hits_and_misses(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite")
+    cache.put("a", MODEL, "abc")
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['bytes']) == (2, 1, 1, 3)
+    assert stats['hit_rate'] == 2 / 3 and not stats['bypass']
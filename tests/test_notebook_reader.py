@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming notebook reader
+"""
+import json
+
+import pytest
+
+from src import notebook_reader
+from src.notebook_reader import read_notebook_cells
+
+NOTEBOOK = {
+    'metadata': {'kernelspec': {'name': 'python3'}},
+    'nbformat': 4,
+    'cells': [
+        {
+            'cell_type': 'markdown',
+            'metadata': {},
+            'source': ['# PEST++ setup\n', 'Build the control file.']
+        },
+        {
+            'cell_type': 'code',
+            'execution_count': 3,
+            'metadata': {'tags': ['setup'], 'scrolled': True, 'width': 0.5, 'extra': None},
+            'source': 'import pyemu\npst = pyemu.Pst("model.pst")',
+            'outputs': [
+                {'output_type': 'display_data', 'data': {'image/png': 'iVBORw0KGgo' * 1000}},
+                {'output_type': 'stream', 'text': ['line\n'] * 100}
+            ]
+        },
+        {
+            'cell_type': 'code',
+            'execution_count': None,
+            'metadata': {'nested': {'list': [1, [2, {'three': 3}]]}},
+            'source': [],
+            'outputs': []
+        }
+    ]
+}
+
+EXPECTED = [
+    {key: value for key, value in cell.items() if key != 'outputs'}
+    for cell in NOTEBOOK['cells']
+]
+
+
+@pytest.fixture
+def notebook(tmp_path):
+    path = tmp_path / "example.ipynb"
+    path.write_text(json.dumps(NOTEBOOK, indent=1))
+    return path
+
+
+def test_json_fallback_drops_outputs(notebook, monkeypatch):
+    monkeypatch.setattr(notebook_reader, 'ijson', None)
+    assert read_notebook_cells(notebook) == EXPECTED
+
+
+def test_streaming_matches_json(notebook):
+    pytest.importorskip("ijson")
+    assert notebook_reader.ijson is not None
+    cells = read_notebook_cells(notebook)
+    assert cells == EXPECTED
+    assert type(cells[1]['metadata']['width']) is float  # Not Decimal
+
+
+def test_streaming_keeps_only_requested_fields(notebook):
+    pytest.importorskip("ijson")
+    cells = read_notebook_cells(notebook, fields=('cell_type', 'source'))
+    assert cells == [{'cell_type': cell['cell_type'], 'source': cell['source']} for cell in NOTEBOOK['cells']]
+
+
+def test_notebook_without_cells(tmp_path, monkeypatch):
+    path = tmp_path / "empty.ipynb"
+    path.write_text(json.dumps({'metadata': {}, 'nbformat': 4}))
+    assert read_notebook_cells(path) == []
+    monkeypatch.setattr(notebook_reader, 'ijson', None)
+    assert read_notebook_cells(path) == []
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the query embedding cache
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.query_embedding_cache import QueryEmbeddingCache
+
+
+class FakeEmbeddings:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    async def create(self, model, input):
+        self.calls.append(input)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(input))])])
+
+
+def make_cache(embeddings, **kwargs):
+    return QueryEmbeddingCache(SimpleNamespace(embeddings=embeddings), **kwargs)
+
+
+def test_concurrent_queries_share_one_call():
+    embeddings = FakeEmbeddings(delay=0.01)
+    cache = make_cache(embeddings)
+
+    async def main():
+        return await asyncio.gather(*(cache.get("wells") for _ in range(5)))
+
+    assert asyncio.run(main()) == [[5.0]] * 5
+    assert embeddings.calls == ["wells"]
+    assert cache.stats()['misses'] == 1 and cache.stats()['hits'] == 4
+
+
+def test_waiters_take_over_when_the_leader_is_cancelled():
+    embeddings = FakeEmbeddings(delay=0.05)
+    cache = make_cache(embeddings)
+
+    async def main():
+        leader = asyncio.create_task(cache.get("wells"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get("wells"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await asyncio.wait_for(waiter, timeout=1)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result
+
+    assert asyncio.run(main()) == [5.0]
+    assert embeddings.calls == ["wells", "wells"]
+    assert cache._in_flight == {}
+
+
+def test_cancelled_waiter_does_not_disturb_the_leader():
+    embeddings = FakeEmbeddings(delay=0.05)
+    cache = make_cache(embeddings)
+
+    async def main():
+        leader = asyncio.create_task(cache.get("wells"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get("wells"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == [5.0]
+    assert embeddings.calls == ["wells"]
+
+
+def test_failures_reach_all_waiters_and_are_not_cached():
+    embeddings = FakeEmbeddings(delay=0.01, error=RuntimeError("api down"))
+    cache = make_cache(embeddings)
+
+    async def main():
+        return await asyncio.gather(cache.get("q"), cache.get("q"), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    embeddings.error = None
+    assert asyncio.run(cache.get("q")) == [1.0]
+    assert embeddings.calls == ["q", "q"]
+
+
+def test_lru_and_ttl(monkeypatch):
+    embeddings = FakeEmbeddings()
+    cache = make_cache(embeddings, max_entries=2, ttl=10)
+    clock = [100.0]
+    monkeypatch.setattr('src.query_embedding_cache.time.monotonic', lambda: clock[0])
+
+    async def main(*queries):
+        for query in queries:
+            await cache.get(query)
+
+    asyncio.run(main("a", "b", "a", "c"))  # "b" is evicted
+    asyncio.run(main("a", "b"))
+    assert embeddings.calls == ["a", "b", "c", "b"]
+
+    clock[0] += 11  # Everything expired
+    asyncio.run(main("a"))
+    assert embeddings.calls[-1] == "a" and len(embeddings.calls) == 5
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared provider rate limiter
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from src import rate_limiter
+from src.rate_limiter import (
+    ProviderRateLimiter, configure_rate_limits, get_rate_limiter,
+    is_rate_limit_error, retry_after_seconds
+)
+
+
+class APIError(Exception):
+    pass
+
+
+def api_error(message="failed", **attrs):
+    error = APIError(message)
+    for name, value in attrs.items():
+        setattr(error, name, value)
+    return error
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error", [
+    api_error(status_code=429),                        # OpenAI
+    api_error(code=429, status='RESOURCE_EXHAUSTED'),  # Gemini
+    api_error(response=SimpleNamespace(status_code=429)),
+    RateLimitError("slow down"),
+    RuntimeError("Error code: 429 - {'error': 'too many'}"),
+    RuntimeError("HTTP 429 Too Many Requests"),
+    RuntimeError("Rate limit exceeded for this key"),
+])
+def test_rate_limit_errors_are_recognised(error):
+    assert is_rate_limit_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    api_error(status_code=500),
+    api_error(code=503, status='UNAVAILABLE'),
+    RuntimeError("processed 429 modules before failing"),
+    RuntimeError("request id req_4291 timed out"),
+    TimeoutError("read timed out"),
+])
+def test_other_errors_are_not_rate_limits(error):
+    assert not is_rate_limit_error(error)
+
+
+def test_retry_after_header_and_gemini_delay():
+    headers_error = api_error(response=SimpleNamespace(headers={'retry-after': '7'}))
+    assert retry_after_seconds(headers_error) == 7.0
+    assert retry_after_seconds(RuntimeError("'retryDelay': '12s'")) == 12.0
+    assert retry_after_seconds(RuntimeError("no hint")) is None
+
+
+def test_retry_delay_backs_off_only_for_unpaced_errors():
+    limiter = ProviderRateLimiter('test', rpm=600)
+
+    assert limiter.retry_delay(api_error(status_code=429), attempt=1) == 0.0
+    assert limiter.throttle_events == 1
+    assert limiter.requests.rate < limiter.requests.max_rate
+
+    assert limiter.retry_delay(api_error(status_code=503), attempt=0) == 1.0
+    assert limiter.retry_delay(api_error(status_code=503), attempt=2, base_delay=2) == 8.0
+    assert limiter.retry_delay(TimeoutError(), attempt=20) == 60.0
+    assert limiter.throttle_events == 1
+
+
+def test_success_recovers_rate():
+    limiter = ProviderRateLimiter('test', rpm=600)
+    limiter.report_rate_limited(retry_after=0)
+    for _ in range(100):
+        limiter.report_success()
+    assert limiter.requests.rate == limiter.requests.max_rate
+
+
+def test_reserve_waits_once_the_burst_is_spent():
+    limiter = ProviderRateLimiter('test', rpm=60)  # 1/s, burst of 10
+    delays = [limiter._reserve(1) for _ in range(12)]
+    assert delays[:10] == [0.0] * 10
+    assert 0 < delays[10] < delays[11]
+
+
+def test_configure_updates_existing_limiters_in_place(monkeypatch):
+    monkeypatch.setattr(rate_limiter, '_limiters', {})
+    monkeypatch.setattr(rate_limiter, '_limits', {'gemini': {'rpm': 150}})
+
+    limiter = get_rate_limiter('gemini')
+    configure_rate_limits({'gemini': {'rpm': 1200, 'tpm': 5000000}})
+
+    assert get_rate_limiter('gemini') is limiter
+    assert limiter.requests.max_rate == 20.0
+    assert limiter.tokens is not None
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned search result cache
+"""
+import asyncio
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from src import search_result_cache
+from src.search_result_cache import SearchResultCache, fetch_data_version
+
+
+class Search:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [f"result {self.calls}"]
+
+
+def test_identical_searches_share_one_computation():
+    cache = SearchResultCache()
+    search = Search(delay=0.01)
+
+    async def main():
+        return await asyncio.gather(*(
+            cache.get_or_compute("Wells ", ('modules', 3), 1, search) for _ in range(4)
+        ))
+
+    assert asyncio.run(main()) == [["result 1"]] * 4
+    assert search.calls == 1
+    # Normalized query hits the stored entry
+    assert asyncio.run(cache.get_or_compute("wells", ('modules', 3), 1, search)) == ["result 1"]
+    assert cache.stats()['misses'] == 1 and cache.stats()['hits'] == 4
+
+
+def test_waiters_take_over_when_the_leader_is_cancelled():
+    cache = SearchResultCache()
+    search = Search(delay=0.05)
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_compute("wells", (), 1, search))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_compute("wells", (), 1, search))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await asyncio.wait_for(waiter, timeout=1)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result
+
+    assert asyncio.run(main()) == ["result 2"]
+    assert cache._in_flight == {}
+
+
+def test_new_version_drops_entries_and_old_versions_do_not_roll_back():
+    cache = SearchResultCache()
+    asyncio.run(cache.get_or_compute("wells", (), 1, Search()))
+    asyncio.run(cache.get_or_compute("wells", (), 2, Search()))
+    assert cache.data_version == 2 and cache.stats()['entries'] == 1
+
+    # A request that read version 1 before the ingest is answered, not cached
+    stale = Search()
+    assert asyncio.run(cache.get_or_compute("rivers", (), 1, stale)) == ["result 1"]
+    assert cache.data_version == 2 and cache.stats()['entries'] == 1
+    assert asyncio.run(cache.get_or_compute("wells", (), 2, Search())) == ["result 1"]
+
+
+def test_failures_are_not_cached():
+    cache = SearchResultCache()
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("wells", (), 1, Search(error=RuntimeError("db down"))))
+
+    assert cache.stats()['entries'] == 0
+    assert asyncio.run(cache.get_or_compute("wells", (), 1, Search())) == ["result 1"]
+
+
+def test_without_a_version_nothing_is_cached():
+    cache = SearchResultCache()
+    search = Search()
+    asyncio.run(cache.get_or_compute("wells", (), None, search))
+    asyncio.run(cache.get_or_compute("wells", (), None, search))
+    assert search.calls == 2 and cache.stats()['entries'] == 0
+
+
+class FakeConnection:
+    def __init__(self, columns, row):
+        self.columns = columns
+        self.row = row
+        self.queries = []
+
+    async def fetch(self, query, tables):
+        return [
+            {'table_name': table, 'column_name': column}
+            for table, column in self.columns if table in tables
+        ]
+
+    async def fetchrow(self, query):
+        self.queries.append(query)
+        return self.row
+
+
+def test_fingerprint_covers_existing_untracked_tables():
+    search_result_cache._fingerprint_queries.clear()
+    conn = FakeConnection(
+        [('search_data_version', 'version'), ('modules', 'id'), ('modules', 'processed_at'), ('classes', 'id')],
+        (3, 120, '2026-01-01', 40)
+    )
+    tables = {'modules': 'processed_at', 'classes': None, 'functions': None}
+
+    assert asyncio.run(fetch_data_version(conn, tables)) == (3, 120, '2026-01-01', 40)
+    query = conn.queries[0]
+    assert "search_data_version" in query and "max(processed_at) FROM modules" in query
+    assert "count(*) FROM classes" in query and "functions" not in query
+
+
+def test_fingerprint_is_none_without_any_tracked_table():
+    search_result_cache._fingerprint_queries.clear()
+    conn = FakeConnection([], ())
+    assert asyncio.run(fetch_data_version(conn, {'modules': 'processed_at'})) is None
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline search snapshot
+"""
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from src import search_snapshot
+from src.search_snapshot import SearchSnapshot, export_snapshot
+
+
+class FakeCursor:
+    def __init__(self, tables, dimensions=3):
+        self.tables = tables
+        self.dimensions = dimensions
+        self.result = []
+
+    def execute(self, query, params=None):
+        if 'to_regclass' in query:
+            self.result = [(True,)]
+        elif 'search_data_version' in query:
+            self.result = [(7,)]
+        elif 'pg_attribute' in query:
+            self.result = [(self.dimensions,)]
+        else:
+            table = next(name for name in self.tables if f"FROM {name}" in query)
+            self.result = self.tables[table]
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def export(tmp_path, monkeypatch, tables):
+    @contextmanager
+    def pooled_connection(conn_string):
+        yield FakeConnection(FakeCursor(tables))
+
+    monkeypatch.setattr(search_snapshot, 'pooled_connection', pooled_connection)
+    columns = {table: ['id', 'path'] for table in tables}
+    corpora = {table: {'title': 'path'} for table in tables}
+    return export_snapshot('postgres://test', tmp_path, columns, corpora=corpora)
+
+
+def test_export_and_search(tmp_path, monkeypatch):
+    manifest = export(tmp_path, monkeypatch, {
+        'modules': [
+            (1, 'wel.py', 'wel.py', [1.0, 0.0, 0.0]),
+            (2, 'riv.py', 'riv.py', [0.0, 2.0, 0.0]),
+            (3, 'drn.py', 'drn.py', [1.0, 1.0, 0.0]),
+        ],
+        'workflows': [
+            (10, 'tutorial01.py', 'tutorial01.py', [0.0, 0.0, 5.0]),
+        ],
+    })
+    assert manifest['data_version'] == 7 and manifest['dimensions'] == 3
+
+    snapshot = SearchSnapshot(tmp_path)
+    assert snapshot.data_version == 7
+    assert snapshot.counts() == {'modules': 3, 'workflows': 1}
+
+    results = snapshot.search('modules', ['id', 'path'], [2.0, 0.0, 0.0], limit=2)
+    assert [row['id'] for row in results] == [1, 3]
+    assert results[0]['similarity'] == pytest.approx(1.0)
+    assert results[0]['distance'] == pytest.approx(0.0)
+
+    hits = snapshot.search_all([0.0, 0.1, 1.0], limit=2)
+    assert [(hit['corpus'], hit['title']) for hit in hits] == [('workflows', 'tutorial01.py'), ('modules', 'riv.py')]
+
+
+def test_empty_table_exports_and_searches_empty(tmp_path, monkeypatch):
+    manifest = export(tmp_path, monkeypatch, {
+        'modules': [(1, 'wel.py', 'wel.py', [1.0, 0.0, 0.0])],
+        'workflows': [],
+    })
+    assert manifest['tables']['workflows']['rows'] == 0
+
+    vectors = np.load(tmp_path / 'workflows.npy')
+    assert vectors.shape == (0, 3) and vectors.dtype == np.float32
+
+    snapshot = SearchSnapshot(tmp_path)
+    assert snapshot.search('workflows', ['id'], [1.0, 0.0, 0.0]) == []
+    assert [hit['corpus'] for hit in snapshot.search_all([1.0, 0.0, 0.0])] == ['modules']
+
+
+def test_missing_snapshot_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        SearchSnapshot(tmp_path / 'missing')
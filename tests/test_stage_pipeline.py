@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming stage pipeline
+"""
+import asyncio
+
+from src.stage_pipeline import Stage, StagePipeline
+
+
+def run(pipeline, items):
+    return asyncio.run(pipeline.run(items))
+
+
+def test_items_flow_through_all_stages():
+    async def double(x):
+        return x * 2
+
+    async def add_one(x):
+        return x + 1
+
+    pipeline = StagePipeline([Stage('double', double, workers=3), Stage('add', add_one)])
+    assert sorted(run(pipeline, range(10))) == [x * 2 + 1 for x in range(10)]
+
+
+def test_failures_are_reported_and_dropped():
+    errors = []
+
+    async def check(x):
+        if x % 3 == 0:
+            raise ValueError(f"bad {x}")
+        return x
+
+    pipeline = StagePipeline([Stage('check', check)], on_error=lambda item, stage, e: errors.append((item, stage)))
+    assert sorted(run(pipeline, range(7))) == [1, 2, 4, 5]
+    assert sorted(errors) == [(0, 'check'), (3, 'check'), (6, 'check')]
+
+
+def test_untimed_batches_fill_up_despite_slow_upstream():
+    batches = []
+
+    async def slow(x):
+        await asyncio.sleep(0.01)
+        return x
+
+    async def write(batch):
+        batches.append(list(batch))
+        return batch
+
+    pipeline = StagePipeline([
+        Stage('slow', slow),
+        Stage('write', write, batch_size=4, batch_wait=None),
+    ])
+    assert sorted(run(pipeline, range(10))) == list(range(10))
+    # Full batches only, plus the remainder at the end of the stream
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_timed_batches_flush_after_batch_wait():
+    batches = []
+
+    async def slow(x):
+        await asyncio.sleep(0.05)
+        return x
+
+    async def write(batch):
+        batches.append(list(batch))
+        return batch
+
+    pipeline = StagePipeline([
+        Stage('slow', slow),
+        Stage('write', write, batch_size=4, batch_wait=0.001),
+    ])
+    run(pipeline, range(3))
+    assert [len(batch) for batch in batches] == [1, 1, 1]
+
+
+def test_failed_batch_reports_every_item():
+    errors = []
+
+    async def write(batch):
+        raise RuntimeError("db down")
+
+    pipeline = StagePipeline(
+        [Stage('write', write, batch_size=2, batch_wait=None)],
+        on_error=lambda item, stage, e: errors.append(item)
+    )
+    assert run(pipeline, range(3)) == []
+    assert sorted(errors) == [0, 1, 2]
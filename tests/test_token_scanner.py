@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the FloPy workflow token scanner
+"""
+import pytest
+
+from src.flopy_workflow_extractor import JupytextWorkflowExtractor, TokenScanner
+
+
+@pytest.fixture
+def scanner():
+    extractor = JupytextWorkflowExtractor('.')
+    return TokenScanner(extractor.flopy_packages, list(extractor.TAG_KEYWORDS))
+
+
+def test_package_codes_match_whole_tokens_only(scanner):
+    scan = scanner.scan("LOCATION = 'site'\nriver_stage = 1.0")
+    assert 'OC' not in scan.package_codes
+    assert 'RIV' not in scan.package_codes
+
+    scan = scanner.scan("# Set up OC and WEL output")
+    assert scan.package_codes == {'OC', 'WEL'}
+
+
+def test_package_calls(scanner):
+    scan = scanner.scan(
+        "wel = flopy.mf6.ModflowGwfWel(gwf)\n"
+        "btn = flopy.mt3d.Mt3dBtn(mt)\n"
+        "dis = m.dis (nlay=1)\n"
+        "x = compute(riv)\n"
+    )
+    assert scan.package_calls == {'WEL', 'BTN', 'DIS'}
+    assert {'ModflowGwfWel', 'Mt3dBtn', 'dis', 'compute'} <= scan.functions
+
+
+def test_unconfined_is_not_also_confined(scanner):
+    assert scanner.scan("An unconfined aquifer").keywords == {'unconfined'}
+    assert scanner.scan("A confined aquifer").keywords == {'confined'}
+    # Keywords match at word starts: "wells" -> well, "upwelling" -> nothing
+    assert scanner.scan("wells and upwelling").keywords == {'well'}
+
+
+def test_model_markers(scanner):
+    assert scanner.scan("sim = flopy.mf6.MFSimulation()").model_markers == {'MFSimulation'}
+    assert scanner.scan("m = flopy.modflow.Modflow()").model_markers == {'Modflow('}
+    assert scanner.scan("m = Modflow (version='mf2005')").model_markers == {'mf2005', 'Modflow('}
+    # A bare identifier is not a call
+    assert scanner.scan("Modflow = None").model_markers == set()
+
+
+def test_extract_workflow_model_type_packages_and_tags(tmp_path):
+    tutorials = tmp_path / "tutorials"
+    tutorials.mkdir()
+    tutorial = tutorials / "tutorial01_mf6.py"
+    tutorial.write_text(
+        "# # Unconfined Steady Model\n"
+        "#\n"
+        "# Output LOCATION and a well field.\n"
+        "\n"
+        "import flopy\n"
+        "sim = flopy.mf6.MFSimulation(sim_name='t01')\n"
+        "gwf = flopy.mf6.ModflowGwf(sim)\n"
+        "wel = flopy.mf6.ModflowGwfWel(gwf, stress_period_data=[])\n"
+        "oc = flopy.mf6.ModflowGwfOc(gwf)\n"
+    )
+
+    workflow = JupytextWorkflowExtractor(str(tutorials)).extract_workflow(tutorial)
+
+    assert workflow.model_type == 'mf6'
+    assert workflow.packages_used == ['OC', 'WEL']
+    assert set(workflow.tags) == {'mf6', 'unconfined', 'steady-state', 'wells'}
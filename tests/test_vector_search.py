@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for the index-aware vector search query builders
+"""
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from src.vector_search import SEARCH_CORPORA, SeqScanError, VectorIndex, VectorSearch, vector_literal
+
+
+def search_with_opclasses(**opclasses):
+    search = VectorSearch("postgresql://unused")
+    search._opclasses = {(table, 'embedding'): opclass for table, opclass in opclasses.items()}
+    return search
+
+
+def test_order_by_uses_the_index_operator():
+    search = search_with_opclasses(cosine_table='vector_cosine_ops', l2_table='vector_l2_ops')
+
+    cosine_sql = search.build_query('cosine_table', ['id'])
+    assert "ORDER BY embedding <=> CAST(%(query_vector)s::text AS vector)" in cosine_sql
+    assert "1 - (embedding <=>" in cosine_sql
+
+    l2_sql = search.build_query('l2_table', ['id'], placeholders=('$1', '$2'), binary=True)
+    assert "ORDER BY embedding <-> $1::vector" in l2_sql
+    assert "LIMIT $2" in l2_sql
+
+
+def test_unindexed_table_falls_back_to_cosine():
+    search = search_with_opclasses(plain=None)
+    assert "embedding <=>" in search.build_query('plain', ['id'])
+
+
+def test_union_query_has_one_index_ordered_branch_per_table():
+    search = search_with_opclasses(flopy_modules='vector_cosine_ops', pyemu_modules='vector_l2_ops')
+    corpora = {table: SEARCH_CORPORA[table] for table in ('flopy_modules', 'pyemu_modules')}
+
+    sql = search.build_union_query(corpora, binary=True)
+
+    assert sql.count("UNION ALL") == 1
+    assert "ORDER BY embedding <=> $1::vector" in sql
+    assert "ORDER BY embedding <-> $1::vector" in sql
+    # L2 distance converted to cosine so both branches rank on the same scale
+    assert "1 - (embedding <-> $1::vector) * (embedding <-> $1::vector) / 2" in sql
+    assert sql.count("LIMIT $2") == 2 and "LIMIT $3" in sql
+
+
+def test_index_check_reports_every_problem_table(monkeypatch):
+    search = search_with_opclasses(good='vector_cosine_ops', seq='vector_cosine_ops', missing=None)
+    plans = {
+        'good': "Limit\n  ->  Index Scan using good_embedding_idx on good",
+        'seq': "Limit\n  ->  Sort\n        ->  Seq Scan on seq",
+    }
+    monkeypatch.setattr(search, 'explain', lambda table, *args, **kwargs: plans[table])
+
+    opclasses, problems = search.check_index_usage(['good', 'seq', 'missing'])
+    assert opclasses == {'good': 'vector_cosine_ops'}
+    assert sorted(problems) == ['missing', 'seq']
+
+    with pytest.raises(SeqScanError) as error:
+        search.verify_index_usage(['good', 'seq', 'missing'])
+    assert 'missing.embedding has no ivfflat/hnsw index' in str(error.value)
+
+
+def test_index_options_size_the_scan():
+    small = VectorIndex.from_row(('vector_cosine_ops', 'ivfflat', ['lists=100'], 300.0))
+    assert small.lists == 100 and small.exhaustive
+    assert small.scan_settings(limit=5) == {'ivfflat.probes': 100}
+
+    large = VectorIndex.from_row(('vector_cosine_ops', 'ivfflat', ['lists=400'], 2_000_000.0))
+    assert not large.exhaustive
+    assert large.scan_settings(limit=5) == {'ivfflat.probes': 20}
+
+    # Never analysed (reltuples = -1): probe everything
+    assert VectorIndex.from_row(('vector_cosine_ops', 'ivfflat', None, -1.0)).scan_settings(5) == {'ivfflat.probes': 100}
+
+    hnsw = VectorIndex.from_row(('vector_cosine_ops', 'hnsw', ['m=16'], 1e6))
+    assert hnsw.scan_settings(limit=10) == {'hnsw.ef_search': 40}
+    assert hnsw.scan_settings(limit=100) == {'hnsw.ef_search': 200}
+
+
+def test_union_search_uses_the_largest_setting_of_its_tables():
+    search = VectorSearch("postgresql://unused")
+    search._indexes = {
+        ('a', 'embedding'): VectorIndex('vector_cosine_ops', 'ivfflat', 100, 300.0),
+        ('b', 'embedding'): VectorIndex('vector_cosine_ops', 'ivfflat', 400, 2_000_000.0),
+        ('c', 'embedding'): None,
+    }
+    assert search.scan_settings(['a', 'b', 'c'], limit=5) == {'ivfflat.probes': 100}
+    assert search.scan_settings(['c'], limit=5) == {}
+
+
+def test_small_tables_may_be_seq_scanned(monkeypatch):
+    search = search_with_opclasses(small='vector_cosine_ops', large='vector_cosine_ops')
+    search._indexes = {
+        ('small', 'embedding'): VectorIndex('vector_cosine_ops', 'ivfflat', 100, 300.0),
+        ('large', 'embedding'): VectorIndex('vector_cosine_ops', 'ivfflat', 100, 500_000.0),
+    }
+    monkeypatch.setattr(search, 'explain', lambda table, *args, **kwargs: f"Limit\n  ->  Seq Scan on {table}")
+
+    opclasses, problems = search.check_index_usage(['small', 'large'])
+    assert opclasses == {'small': 'vector_cosine_ops'}
+    assert list(problems) == ['large']
+
+
+class FakeAsyncConnection:
+    def __init__(self, index_row):
+        self.index_row = index_row
+        self.log = []
+        self.in_transaction = False
+
+    async def fetchrow(self, sql, *args):
+        return self.index_row
+
+    async def execute(self, sql, *args):
+        self.log.append(('execute', self.in_transaction, args))
+
+    async def fetch(self, sql, *args):
+        self.log.append(('fetch', self.in_transaction, args[1:]))
+        return []
+
+    def transaction(self):
+        conn = self
+
+        class Transaction:
+            async def __aenter__(self):
+                conn.in_transaction = True
+
+            async def __aexit__(self, *exc):
+                conn.in_transaction = False
+
+        return Transaction()
+
+
+def test_async_search_sets_probes_in_its_transaction():
+    search = VectorSearch("postgresql://unused", binary_vectors=True)
+    conn = FakeAsyncConnection(('vector_cosine_ops', 'ivfflat', ['lists=100'], 250.0))
+
+    asyncio.run(search.search_async(conn, 'flopy_modules', ['id'], [0.1, 0.2], limit=5))
+
+    assert conn.log == [
+        ('execute', True, ('ivfflat.probes', '100')),
+        ('fetch', True, (5,)),
+    ]
+
+
+@pytest.fixture
+def pgvector_dsn():
+    url = os.environ.get('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set (needs Postgres with pgvector)")
+    from psycopg2.extensions import make_dsn
+    # Forbid seq scans so the search below has to go through the ivfflat index
+    return make_dsn(url, options='-c enable_seqscan=off')
+
+
+def test_indexed_search_returns_limit_exact_neighbours(pgvector_dsn):
+    import numpy as np
+    from src.db_writer import pooled_connection
+
+    table = 'vector_search_probe_test'
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 8)).astype(np.float32)
+
+    with pooled_connection(pgvector_dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+            cur.execute(f"CREATE TABLE {table} (id INT PRIMARY KEY, embedding vector(8))")
+            # Index built before the data arrives, as the pipelines do
+            cur.execute(f"CREATE INDEX ON {table} USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100)")
+            for i, vector in enumerate(vectors):
+                cur.execute(f"INSERT INTO {table} VALUES (%s, %s)", (i, vector_literal(vector)))
+            cur.execute(f"ANALYZE {table}")
+
+    try:
+        search = VectorSearch(pgvector_dsn)
+        query = rng.normal(size=8).astype(np.float32)
+        assert "Index Scan" in search.explain(table, ['id'], query.tolist(), limit=10)
+
+        results = search.search(table, ['id'], query.tolist(), limit=10)
+
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        exact = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:10]
+        assert [row['id'] for row in results] == exact.tolist()
+    finally:
+        with pooled_connection(pgvector_dsn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {table}")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the blocked workflow similarity graph
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from src import workflow_similarity
+from src.workflow_similarity import load_embeddings, rebuild_similarity_graph, similarity_edges, update_workflow_edges
+
+
+def brute_force_edges(matrix, threshold):
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = unit @ unit.T
+    return {
+        (i, j): scores[i, j]
+        for i in range(len(matrix)) for j in range(i + 1, len(matrix))
+        if scores[i, j] >= threshold
+    }
+
+
+def test_blocked_edges_match_brute_force():
+    matrix = np.random.default_rng(0).normal(size=(40, 8)).astype(np.float32)
+    expected = brute_force_edges(matrix, 0.3)
+
+    edges = similarity_edges(matrix, threshold=0.3, block_size=7)
+
+    assert [(i, j) for i, j, _ in edges] == sorted(expected)
+    for i, j, score in edges:
+        assert score == pytest.approx(expected[(i, j)], abs=1e-5)
+
+
+def test_top_k_keeps_each_rows_nearest_neighbours():
+    matrix = np.array([
+        [1.0, 0.0],
+        [0.99, 0.1],
+        [0.9, 0.4],
+        [0.0, 1.0],
+    ], dtype=np.float32)
+
+    edges = similarity_edges(matrix, threshold=0.0, top_k=1)
+
+    # 0<->1 are mutual nearest, 2's nearest is 1, 3's nearest is 2
+    assert [(i, j) for i, j, _ in edges] == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_zero_rows_match_nothing():
+    matrix = np.array([[1.0, 0.0], [0.0, 0.0], [1.0, 0.0]], dtype=np.float32)
+    assert [(i, j) for i, j, _ in similarity_edges(matrix, threshold=0.5)] == [(0, 2)]
+
+
+def test_empty_matrix_has_no_edges():
+    assert similarity_edges(np.empty((0, 0), dtype=np.float32)) == []
+    assert similarity_edges(np.ones((1, 4), dtype=np.float32), threshold=0.0) == []
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_load_embeddings():
+    cur = FakeCursor([('a', [1.0, 2.0]), ('b', [3.0, 4.0])])
+    ids, matrix = load_embeddings(cur, 'flopy_workflows')
+
+    assert ids == ['a', 'b']
+    assert matrix.dtype == np.float32 and matrix.shape == (2, 2)
+    assert "FROM flopy_workflows" in cur.queries[0]
+
+
+def test_load_embeddings_of_an_empty_table():
+    ids, matrix = load_embeddings(FakeCursor([]), 'flopy_workflows')
+
+    assert ids == [] and matrix.shape == (0, 0)
+    assert similarity_edges(matrix) == []
+
+
+class FakeGraphCursor:
+    """Just enough of a cursor over one workflow table and its relationships table"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings  # id -> vector
+        self.edges = []               # (source, target, type, score)
+        self.deleted = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        if 'pg_advisory_xact_lock' in sql:
+            self.result = []
+        elif '::real[]' in sql:
+            self.result = [(id_, list(vector)) for id_, vector in sorted(self.embeddings.items())]
+        elif sql.lstrip().startswith('SELECT source_workflow_id'):
+            self.result = [
+                (source, target, score) for source, target, kind, score in self.edges
+                if kind == params['type'] and (
+                    params.get('id') is None or 'target_workflow_id = %(id)s' not in sql
+                    or params['id'] in (source, target)
+                )
+            ]
+        elif sql.lstrip().startswith('DELETE'):
+            self.edges = [edge for edge in self.edges if edge[2] != params[0]]
+        else:
+            raise AssertionError(f"Unexpected SQL: {sql}")
+
+    def fetchall(self):
+        return self.result
+
+    def execute_values(self, sql, rows):
+        if sql.lstrip().startswith('DELETE'):
+            stale = {(source, target, kind) for source, target, kind in rows}
+            self.deleted += sorted(stale)
+            self.edges = [edge for edge in self.edges if edge[:3] not in stale]
+        else:
+            self.edges += [tuple(row) for row in rows]
+
+    def graph(self):
+        return {(frozenset((source, target)), kind): round(score, 5) for source, target, kind, score in self.edges}
+
+
+@pytest.fixture
+def fake_execute_values(monkeypatch):
+    monkeypatch.setattr(workflow_similarity, 'execute_values', lambda cur, sql, rows, **kwargs: cur.execute_values(sql, rows))
+
+
+@pytest.mark.parametrize('top_k', [None, 2])
+def test_incremental_update_matches_a_full_rebuild(fake_execute_values, top_k):
+    rng = np.random.default_rng(1)
+    embeddings = {f"wf{i:02d}": rng.normal(size=6) for i in range(12)}
+    cur = FakeGraphCursor(dict(embeddings))
+    rebuild_similarity_graph(cur, 'workflows', 'relationships', threshold=0.2, top_k=top_k)
+
+    # wf03 is re-ingested with an embedding close to wf07's
+    cur.embeddings['wf03'] = embeddings['wf07'] + rng.normal(scale=0.05, size=6)
+    count = update_workflow_edges(cur, 'workflows', 'relationships', 'wf03', threshold=0.2, top_k=top_k)
+
+    expected = FakeGraphCursor(dict(cur.embeddings))
+    rebuild_similarity_graph(expected, 'workflows', 'relationships', threshold=0.2, top_k=top_k)
+    assert cur.graph() == expected.graph()
+    assert count == sum(1 for pair, _ in expected.graph() if 'wf03' in pair)
+
+    if top_k is None:
+        # Only the re-ingested workflow's own edges were rewritten
+        assert all('wf03' in (source, target) for source, target, _ in cur.deleted)
+
+
+def test_update_of_a_workflow_without_embedding_drops_its_edges(fake_execute_values):
+    cur = FakeGraphCursor({'a': np.array([1.0, 0.0]), 'b': np.array([1.0, 0.1]), 'c': np.array([0.9, 0.2])})
+    rebuild_similarity_graph(cur, 'workflows', 'relationships', threshold=0.5)
+    assert len(cur.edges) == 3
+
+    del cur.embeddings['c']
+    assert update_workflow_edges(cur, 'workflows', 'relationships', 'c', threshold=0.5) == 0
+    assert [edge[:2] for edge in cur.edges] == [('a', 'b')]
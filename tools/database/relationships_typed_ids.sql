@@ -0,0 +1,22 @@
+-- Typed ids for the GraphQL relationships table
+-- relationships stores source/target ids as TEXT so it can point at modules,
+-- classes or functions. Joining those back to UUID primary keys needed
+-- `id::text = target_id`, which defeats every index. The generated column
+-- keeps a real UUID next to the text id for indexed reverse lookups by
+-- target. The API derives the same UUID inline when loading relationships,
+-- so it works whether or not this migration has been applied; targets are
+-- then batch-loaded with `id = ANY($1::uuid[])` against the primary keys.
+
+ALTER TABLE relationships
+    ADD COLUMN IF NOT EXISTS target_uuid UUID
+    GENERATED ALWAYS AS (
+        CASE WHEN target_id ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+             THEN target_id::uuid
+        END
+    ) STORED;
+
+-- Relationship lookups by source (DataLoader: source_id = ANY($1::text[]))
+CREATE INDEX IF NOT EXISTS idx_relationships_source_id ON relationships (source_id);
+
+-- Reverse lookups by typed target
+CREATE INDEX IF NOT EXISTS idx_relationships_target ON relationships (target_type, target_uuid);
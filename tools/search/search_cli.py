@@ -4,7 +4,9 @@ Interactive CLI for testing FloPy and PyEMU semantic searches.
 Demonstrates the separate search domains and hierarchical data retrieval.
 """
 
+import argparse
 import asyncio
+import os
 import sys
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -12,24 +14,96 @@ import json
 
 # Add project root to path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent.parent))
 
 import config
-import psycopg2
+import asyncpg
 from openai import AsyncOpenAI
 
+from src.vector_search import SeqScanError, VectorSearch, SEARCH_CORPORA
+from src.query_embedding_cache import get_query_embedding_cache
+from src.search_result_cache import SearchResultCache, fetch_data_version
+from src.search_snapshot import SearchSnapshot, export_snapshot, DEFAULT_SNAPSHOT_DIR
+
+SEARCH_TABLES = list(SEARCH_CORPORA)
+
+# Columns each search returns (and that a snapshot export keeps)
+SEARCH_COLUMNS = {
+    'flopy_modules': ['relative_path', 'package_code', 'model_family', 'semantic_purpose'],
+    'flopy_workflows': ['id', 'tutorial_file', 'title', 'packages_used', 'complexity', 'workflow_purpose'],
+    'pyemu_modules': ['relative_path', 'module_name', 'semantic_purpose', 'use_cases', 'statistical_concepts'],
+    'pyemu_workflows': ['id', 'notebook_file', 'title', 'workflow_purpose', 'best_practices', 'common_applications'],
+}
+
 
 class SemanticSearchCLI:
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None, snapshot_dir: Optional[str] = None):
+        """
+        Args:
+            backend: 'postgres' (default) or 'snapshot' for exact in-process
+                search over an exported snapshot, with no database connection
+            snapshot_dir: Snapshot location (default SEARCH_SNAPSHOT_DIR)
+        """
+        self.backend = backend or getattr(config, 'SEARCH_BACKEND', 'postgres')
+        self.snapshot_dir = Path(
+            snapshot_dir or getattr(config, 'SEARCH_SNAPSHOT_DIR', None)
+            or os.environ.get('SEARCH_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR)
+        )
+        self.snapshot = SearchSnapshot(self.snapshot_dir) if self.backend == 'snapshot' else None
         self.openai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
         self.connection_string = config.NEON_CONNECTION_STRING
+        # Picks the distance operator matching each table's ANN index (cosine)
+        self.vector_search = VectorSearch(self.connection_string)
+        # One embedding per distinct query, shared by every search below
+        self.query_embeddings = get_query_embedding_cache(self.openai_client)
+        # Repeated searches are answered from memory until a pipeline re-ingests
+        self.result_cache = SearchResultCache()
+        self.db_pool = None
+    
+    async def init_db(self):
+        """Open the asyncpg pool shared by all searches"""
+        if self.db_pool is None and self.snapshot is None:
+            self.db_pool = await asyncpg.create_pool(
+                self.connection_string,
+                min_size=1,
+                max_size=10
+            )
+    
+    async def close_db(self):
+        if self.db_pool:
+            await self.db_pool.close()
+            self.db_pool = None
         
     async def create_query_embedding(self, query: str) -> List[float]:
-        """Create embedding for user query"""
-        response = await self.openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=query
+        """Create embedding for user query (cached across searches)"""
+        return await self.query_embeddings.get(query)
+
+    async def current_data_version(self) -> Any:
+        """Data version the searches of one command are cached under"""
+        if self.snapshot:
+            return self.snapshot.data_version
+        async with self.db_pool.acquire() as conn:
+            return await fetch_data_version(conn)
+
+    async def cached_search(self, search, query: str, limit: int, data_version: Any) -> List[Dict[str, Any]]:
+        """Run one of the search_* methods through the versioned result cache"""
+        return await self.result_cache.get_or_compute(
+            query,
+            (search.__name__, limit),
+            data_version,
+            lambda: search(query, limit)
         )
-        return response.data[0].embedding
+
+    async def search_table(self, table: str, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Nearest rows of one table from Postgres or the local snapshot
+
+        Errors propagate so a failed search is reported, not cached.
+        """
+        query_embedding = await self.create_query_embedding(query)
+        if self.snapshot:
+            return self.snapshot.search(table, SEARCH_COLUMNS[table], query_embedding, limit)
+        async with self.db_pool.acquire() as conn:
+            return await self.vector_search.search_async(conn, table, SEARCH_COLUMNS[table], query_embedding, limit)
 
     def format_results(self, results: List[Dict[str, Any]], search_type: str) -> str:
         """Format search results for display"""
@@ -72,216 +146,98 @@ class SemanticSearchCLI:
 
     async def search_flopy_modules(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search FloPy modules using semantic similarity"""
-        try:
-            query_embedding = await self.create_query_embedding(query)
-            
-            with psycopg2.connect(self.connection_string) as conn:
-                with conn.cursor() as cur:
-                    # Try proper vector search first
-                    try:
-                        # Format embedding as pgvector string literal
-                        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-                        
-                        # Use L2 distance (<->) which works perfectly in Neon
-                        cur.execute("""
-                            SELECT 
-                                relative_path,
-                                package_code,
-                                model_family,
-                                semantic_purpose,
-                                embedding <-> CAST(%s AS vector) as l2_distance
-                            FROM flopy_modules
-                            WHERE embedding IS NOT NULL
-                            ORDER BY embedding <-> CAST(%s AS vector)
-                            LIMIT %s
-                        """, (embedding_str, embedding_str, limit))
-                        
-                        columns = [desc[0] for desc in cur.description]
-                        results = [dict(zip(columns, row)) for row in cur.fetchall()]
-                        
-                        if results:
-                            # Convert L2 distance to similarity-like score (lower distance = higher similarity)
-                            for result in results:
-                                result['similarity'] = 1.0 / (1.0 + result['l2_distance'])
-                            return results
-                            
-                    except Exception as vec_error:
-                        print(f"Vector search failed: {vec_error}")
-                    
-                    # Fallback to text search
-                    query_pattern = f'%{query}%'
-                    cur.execute("""
-                        SELECT 
-                            relative_path,
-                            package_code,
-                            model_family,
-                            semantic_purpose,
-                            0.5 as similarity
-                        FROM flopy_modules
-                        WHERE semantic_purpose ILIKE %s
-                           OR package_code ILIKE %s
-                           OR relative_path ILIKE %s
-                        ORDER BY 
-                            CASE 
-                                WHEN package_code ILIKE %s THEN 1
-                                WHEN semantic_purpose ILIKE %s THEN 2
-                                ELSE 3
-                            END,
-                            package_code
-                        LIMIT %s
-                    """, (query_pattern, query_pattern, query_pattern, 
-                          query_pattern, query_pattern, limit))
-                    
-                    columns = [desc[0] for desc in cur.description]
-                    results = [dict(zip(columns, row)) for row in cur.fetchall()]
-                    
-                    return results
-        except Exception as e:
-            print(f"Error in module search: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+        return await self.search_table('flopy_modules', query, limit)
 
     async def search_flopy_workflows(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search FloPy workflows using semantic similarity"""
-        query_embedding = await self.create_query_embedding(query)
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-        
-        with psycopg2.connect(self.connection_string) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        tutorial_file,
-                        title,
-                        packages_used,
-                        complexity,
-                        workflow_purpose,
-                        embedding <-> CAST(%s AS vector) as l2_distance
-                    FROM flopy_workflows
-                    WHERE embedding IS NOT NULL
-                    ORDER BY embedding <-> CAST(%s AS vector)
-                    LIMIT %s
-                """, (embedding_str, embedding_str, limit))
-                
-                columns = [desc[0] for desc in cur.description]
-                results = [dict(zip(columns, row)) for row in cur.fetchall()]
-                
-                # Convert L2 distance to similarity
-                for result in results:
-                    result['similarity'] = 1.0 / (1.0 + result['l2_distance'])
-                
-                return results
+        return await self.search_table('flopy_workflows', query, limit)
 
     async def get_flopy_workflow_steps(self, workflow_id: str) -> List[Dict[str, Any]]:
         """Get detailed steps for a FloPy workflow"""
-        with psycopg2.connect(self.connection_string) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        step_number,
-                        description,
-                        flopy_classes,
-                        key_functions,
-                        LEFT(code_snippet, 200) as code_preview
-                    FROM flopy_workflow_steps
-                    WHERE workflow_id = %s
-                    ORDER BY step_number
-                """, (workflow_id,))
-                
-                columns = [desc[0] for desc in cur.description]
-                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        if self.db_pool is None:
+            return []  # Step details are not part of the snapshot
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT 
+                    step_number,
+                    description,
+                    flopy_classes,
+                    key_functions,
+                    LEFT(code_snippet, 200) as code_preview
+                FROM flopy_workflow_steps
+                WHERE workflow_id = $1
+                ORDER BY step_number
+            """, workflow_id)
+            
+            return [dict(row) for row in rows]
 
     async def search_pyemu_modules(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search PyEMU modules using semantic similarity"""
-        query_embedding = await self.create_query_embedding(query)
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-        
-        with psycopg2.connect(self.connection_string) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        relative_path,
-                        module_name,
-                        semantic_purpose,
-                        use_cases,
-                        statistical_concepts,
-                        embedding <-> CAST(%s AS vector) as l2_distance
-                    FROM pyemu_modules
-                    WHERE embedding IS NOT NULL
-                    ORDER BY embedding <-> CAST(%s AS vector)
-                    LIMIT %s
-                """, (embedding_str, embedding_str, limit))
-                
-                columns = [desc[0] for desc in cur.description]
-                results = [dict(zip(columns, row)) for row in cur.fetchall()]
-                
-                # Convert L2 distance to similarity
-                for result in results:
-                    result['similarity'] = 1.0 / (1.0 + result['l2_distance'])
-                
-                return results
+        return await self.search_table('pyemu_modules', query, limit)
 
     async def search_pyemu_workflows(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search PyEMU workflows using semantic similarity"""
-        query_embedding = await self.create_query_embedding(query)
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-        
-        with psycopg2.connect(self.connection_string) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        notebook_file,
-                        title,
-                        workflow_purpose,
-                        best_practices,
-                        common_applications,
-                        embedding <-> CAST(%s AS vector) as l2_distance
-                    FROM pyemu_workflows
-                    WHERE embedding IS NOT NULL
-                    ORDER BY embedding <-> CAST(%s AS vector)
-                    LIMIT %s
-                """, (embedding_str, embedding_str, limit))
-                
-                columns = [desc[0] for desc in cur.description]
-                results = [dict(zip(columns, row)) for row in cur.fetchall()]
-                
-                # Convert L2 distance to similarity
-                for result in results:
-                    result['similarity'] = 1.0 / (1.0 + result['l2_distance'])
-                
-                return results
+        return await self.search_table('pyemu_workflows', query, limit)
 
     async def get_pyemu_workflow_sections(self, workflow_id: str) -> List[Dict[str, Any]]:
         """Get detailed sections for a PyEMU workflow"""
-        with psycopg2.connect(self.connection_string) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        section_number,
-                        title,
-                        description,
-                        pest_concepts,
-                        uncertainty_methods,
-                        pyemu_classes
-                    FROM pyemu_workflow_sections
-                    WHERE workflow_id = %s
-                    ORDER BY section_number
-                """, (workflow_id,))
-                
-                columns = [desc[0] for desc in cur.description]
-                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        if self.db_pool is None:
+            return []  # Section details are not part of the snapshot
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT 
+                    section_number,
+                    title,
+                    description,
+                    pest_concepts,
+                    uncertainty_methods,
+                    pyemu_classes
+                FROM pyemu_workflow_sections
+                WHERE workflow_id = $1
+                ORDER BY section_number
+            """, workflow_id)
+            
+            return [dict(row) for row in rows]
+
+    async def search_everything(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """One ranked list over all four tables (one embedding, one round trip)"""
+        query_embedding = await self.create_query_embedding(query)
+        if self.snapshot:
+            return self.snapshot.search_all(query_embedding, limit)
+        async with self.db_pool.acquire() as conn:
+            return await self.vector_search.search_all_async(conn, query_embedding, limit)
+
+    async def unified_search(self, query: str) -> str:
+        """Merged FloPy + PyEMU search across modules and workflows"""
+        hits = await self.cached_search(self.search_everything, query, 10, await self.current_data_version())
+        
+        output = f"\n🔎 UNIFIED SEARCH: '{query}'\n"
+        output += "=" * 80 + "\n"
+        if not hits:
+            return output + "No results found.\n"
+        
+        for i, hit in enumerate(hits, 1):
+            output += f"\n{i}. [{hit['corpus']}] {hit['title'] or hit['path']}\n"
+            output += f"   Path: {hit['path']}\n"
+            output += f"   Similarity: {hit['similarity']:.3f}\n"
+            if hit['purpose']:
+                purpose = hit['purpose'][:200] + "..." if len(hit['purpose']) > 200 else hit['purpose']
+                output += f"   Purpose: {purpose}\n"
+        
+        return output
 
     async def comprehensive_flopy_search(self, query: str) -> str:
         """Comprehensive FloPy search across modules and workflows"""
         output = f"\n🌊 FLOPY COMPREHENSIVE SEARCH: '{query}'\n"
         output += "=" * 80 + "\n"
         
-        # Search modules
-        modules = await self.search_flopy_modules(query, 3)
+        # Search modules and workflows concurrently, both at one data version
+        data_version = await self.current_data_version()
+        modules, workflows = await asyncio.gather(
+            self.cached_search(self.search_flopy_modules, query, 3, data_version),
+            self.cached_search(self.search_flopy_workflows, query, 3, data_version)
+        )
         output += self.format_results(modules, "FloPy Modules")
-        
-        # Search workflows
-        workflows = await self.search_flopy_workflows(query, 3)
         output += self.format_results(workflows, "FloPy Workflows")
         
         # If we found workflows, show one workflow's steps
@@ -290,21 +246,14 @@ class SemanticSearchCLI:
             output += f"\n📋 Detailed Steps for: {workflow_title}\n"
             output += "-" * 60 + "\n"
             
-            # Get workflow ID
-            with psycopg2.connect(self.connection_string) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT id FROM flopy_workflows WHERE tutorial_file = %s", 
-                              (workflow_title,))
-                    result = cur.fetchone()
-                    if result:
-                        workflow_id = result[0]
-                        steps = await self.get_flopy_workflow_steps(workflow_id)
-                        for step in steps[:5]:  # Show first 5 steps
-                            output += f"\nStep {step['step_number']}: {step['description']}\n"
-                            if step['flopy_classes']:
-                                output += f"  Classes: {', '.join(step['flopy_classes'][:3])}\n"
-                            if step['code_preview']:
-                                output += f"  Code: {step['code_preview']}...\n"
+            # The search already returned the workflow ID
+            steps = await self.get_flopy_workflow_steps(workflows[0]['id'])
+            for step in steps[:5]:  # Show first 5 steps
+                output += f"\nStep {step['step_number']}: {step['description']}\n"
+                if step['flopy_classes']:
+                    output += f"  Classes: {', '.join(step['flopy_classes'][:3])}\n"
+                if step['code_preview']:
+                    output += f"  Code: {step['code_preview']}...\n"
         
         return output
 
@@ -313,12 +262,13 @@ class SemanticSearchCLI:
         output = f"\n🎯 PYEMU COMPREHENSIVE SEARCH: '{query}'\n"
         output += "=" * 80 + "\n"
         
-        # Search modules
-        modules = await self.search_pyemu_modules(query, 3)
+        # Search modules and workflows concurrently, both at one data version
+        data_version = await self.current_data_version()
+        modules, workflows = await asyncio.gather(
+            self.cached_search(self.search_pyemu_modules, query, 3, data_version),
+            self.cached_search(self.search_pyemu_workflows, query, 3, data_version)
+        )
         output += self.format_results(modules, "PyEMU Modules")
-        
-        # Search workflows
-        workflows = await self.search_pyemu_workflows(query, 3)
         output += self.format_results(workflows, "PyEMU Workflows")
         
         # If we found workflows, show one workflow's sections
@@ -327,24 +277,17 @@ class SemanticSearchCLI:
             output += f"\n📋 Detailed Sections for: {workflow_title}\n"
             output += "-" * 60 + "\n"
             
-            # Get workflow ID
-            with psycopg2.connect(self.connection_string) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT id FROM pyemu_workflows WHERE notebook_file = %s", 
-                              (workflow_title,))
-                    result = cur.fetchone()
-                    if result:
-                        workflow_id = result[0]
-                        sections = await self.get_pyemu_workflow_sections(workflow_id)
-                        for section in sections[:5]:  # Show first 5 sections
-                            output += f"\nSection {section['section_number']}: {section['title']}\n"
-                            if section['description']:
-                                desc = section['description'][:150] + "..." if len(section['description']) > 150 else section['description']
-                                output += f"  Description: {desc}\n"
-                            if section['pest_concepts']:
-                                output += f"  PEST Concepts: {', '.join(section['pest_concepts'][:3])}\n"
-                            if section['uncertainty_methods']:
-                                output += f"  Methods: {', '.join(section['uncertainty_methods'][:3])}\n"
+            # The search already returned the workflow ID
+            sections = await self.get_pyemu_workflow_sections(workflows[0]['id'])
+            for section in sections[:5]:  # Show first 5 sections
+                output += f"\nSection {section['section_number']}: {section['title']}\n"
+                if section['description']:
+                    desc = section['description'][:150] + "..." if len(section['description']) > 150 else section['description']
+                    output += f"  Description: {desc}\n"
+                if section['pest_concepts']:
+                    output += f"  PEST Concepts: {', '.join(section['pest_concepts'][:3])}\n"
+                if section['uncertainty_methods']:
+                    output += f"  Methods: {', '.join(section['uncertainty_methods'][:3])}\n"
         
         return output
 
@@ -356,8 +299,11 @@ class SemanticSearchCLI:
 COMMANDS:
   help                    - Show this help
   stats                   - Show database statistics
+  check                   - Verify vector searches use the ANN indexes
+  export [dir]            - Save a local search snapshot (for --backend snapshot)
   flopy <query>          - Search FloPy domain (groundwater modeling)
   pyemu <query>          - Search PyEMU domain (uncertainty analysis)
+  all <query>            - One ranked list across FloPy and PyEMU
   quit / exit            - Exit the CLI
 
 EXAMPLE QUERIES:
@@ -384,34 +330,36 @@ Each search will show:
         """
         print(help_text)
 
-    def show_stats(self):
+    async def show_stats(self):
         """Show database statistics"""
-        with psycopg2.connect(self.connection_string) as conn:
-            with conn.cursor() as cur:
-                # Get counts from all tables
-                cur.execute("SELECT COUNT(*) FROM flopy_modules")
-                flopy_modules = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM flopy_workflows")
-                flopy_workflows = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM flopy_workflow_steps")
-                flopy_steps = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM flopy_workflow_relationships")
-                flopy_relationships = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM pyemu_modules")
-                pyemu_modules = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM pyemu_workflows")
-                pyemu_workflows = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM pyemu_workflow_sections")
-                pyemu_sections = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM pyemu_workflow_relationships")
-                pyemu_relationships = cur.fetchone()[0]
+        if self.snapshot:
+            print(f"\n📦 SNAPSHOT {self.snapshot_dir} (exported {self.snapshot.manifest['exported_at']})")
+            for table, rows in self.snapshot.counts().items():
+                print(f"  • {table:<16} {rows:>4} vectors")
+            return
+        
+        async with self.db_pool.acquire() as conn:
+            # Get counts from all tables in one round trip
+            counts = await conn.fetchrow("""
+                SELECT
+                    (SELECT COUNT(*) FROM flopy_modules) AS flopy_modules,
+                    (SELECT COUNT(*) FROM flopy_workflows) AS flopy_workflows,
+                    (SELECT COUNT(*) FROM flopy_workflow_steps) AS flopy_steps,
+                    (SELECT COUNT(*) FROM flopy_workflow_relationships) AS flopy_relationships,
+                    (SELECT COUNT(*) FROM pyemu_modules) AS pyemu_modules,
+                    (SELECT COUNT(*) FROM pyemu_workflows) AS pyemu_workflows,
+                    (SELECT COUNT(*) FROM pyemu_workflow_sections) AS pyemu_sections,
+                    (SELECT COUNT(*) FROM pyemu_workflow_relationships) AS pyemu_relationships
+            """)
+        
+        flopy_modules = counts['flopy_modules']
+        flopy_workflows = counts['flopy_workflows']
+        flopy_steps = counts['flopy_steps']
+        flopy_relationships = counts['flopy_relationships']
+        pyemu_modules = counts['pyemu_modules']
+        pyemu_workflows = counts['pyemu_workflows']
+        pyemu_sections = counts['pyemu_sections']
+        pyemu_relationships = counts['pyemu_relationships']
         
         stats = f"""
 📊 DATABASE STATISTICS
@@ -439,12 +387,34 @@ Vector Embeddings:   {flopy_modules + flopy_workflows + pyemu_modules + pyemu_wo
         """
         print(stats)
 
+    def check_indexes(self):
+        """Report every table's vector search plan; raise SeqScanError if any is a seq scan"""
+        if self.snapshot:
+            print("✅ Snapshot backend: exact in-process search, no indexes involved")
+            return
+        opclasses, problems = self.vector_search.check_index_usage(SEARCH_TABLES)
+        for table, opclass in opclasses.items():
+            print(f"✅ {table}: index scan ({opclass})")
+        for table, problem in problems.items():
+            print(f"❌ {problem}")
+        if problems:
+            raise SeqScanError(f"Vector search falls back to sequential scans on: {', '.join(problems)}")
+
     async def run(self):
         """Main CLI loop"""
         print("🔍 FloPy Expert - Semantic Search CLI")
         print("=====================================")
         print("Type 'help' for commands, 'quit' to exit")
         
+        try:
+            await asyncio.to_thread(self.check_indexes)
+        except SeqScanError:
+            raise  # Searches would not scale: refuse to start
+        except Exception as e:
+            print(f"⚠️  Could not check vector indexes: {e}")
+        
+        await self.init_db()
+        
         while True:
             try:
                 user_input = input("\n> ").strip()
@@ -457,7 +427,21 @@ Vector Embeddings:   {flopy_modules + flopy_workflows + pyemu_modules + pyemu_wo
                 elif user_input.lower() == 'help':
                     self.show_help()
                 elif user_input.lower() == 'stats':
-                    self.show_stats()
+                    await self.show_stats()
+                elif user_input.lower() == 'check':
+                    try:
+                        await asyncio.to_thread(self.check_indexes)
+                    except SeqScanError as e:
+                        print(f"❌ {e}")
+                    except Exception as e:
+                        print(f"⚠️  Could not check vector indexes: {e}")
+                elif user_input.lower().split()[0] == 'export':
+                    target = user_input[6:].strip() or self.snapshot_dir
+                    manifest = await asyncio.to_thread(
+                        export_snapshot, self.connection_string, Path(target), SEARCH_COLUMNS
+                    )
+                    rows = sum(info['rows'] for info in manifest['tables'].values())
+                    print(f"✅ Exported {rows} vectors from {len(manifest['tables'])} tables to {target}")
                 elif user_input.lower().startswith('flopy '):
                     query = user_input[6:].strip()
                     if query:
@@ -465,6 +449,13 @@ Vector Embeddings:   {flopy_modules + flopy_workflows + pyemu_modules + pyemu_wo
                         print(result)
                     else:
                         print("Please provide a search query after 'flopy'")
+                elif user_input.lower().startswith('all '):
+                    query = user_input[4:].strip()
+                    if query:
+                        result = await self.unified_search(query)
+                        print(result)
+                    else:
+                        print("Please provide a search query after 'all'")
                 elif user_input.lower().startswith('pyemu '):
                     query = user_input[6:].strip()
                     if query:
@@ -486,8 +477,20 @@ Vector Embeddings:   {flopy_modules + flopy_workflows + pyemu_modules + pyemu_wo
 
 
 async def main():
-    cli = SemanticSearchCLI()
-    await cli.run()
+    parser = argparse.ArgumentParser(description="FloPy/PyEMU semantic search CLI")
+    parser.add_argument('--backend', choices=['postgres', 'snapshot'],
+                        help="Search Postgres (default) or a local snapshot")
+    parser.add_argument('--snapshot-dir', help="Snapshot directory")
+    args = parser.parse_args()
+    
+    cli = SemanticSearchCLI(backend=args.backend, snapshot_dir=args.snapshot_dir)
+    try:
+        await cli.run()
+    except SeqScanError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        await cli.close_db()
 
 
 if __name__ == "__main__":
@@ -13,6 +13,7 @@ from openai import AsyncOpenAI
 # Add parent directory to path for imports
 sys.path.append('/home/danilopezmella/flopy_expert')
 import config
+from src.query_embedding_cache import get_query_embedding_cache
 
 
 class WorkflowSearchDemo:
@@ -21,16 +22,13 @@ class WorkflowSearchDemo:
     def __init__(self):
         self.conn_string = config.NEON_CONNECTION_STRING
         self.openai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+        self.query_embeddings = get_query_embedding_cache(self.openai_client)
     
     async def semantic_search(self, query: str, limit: int = 5) -> list:
         """Search workflows using semantic similarity"""
         
-        # Create embedding for search query
-        response = await self.openai_client.embeddings.create(
-            input=query,
-            model="text-embedding-3-small"
-        )
-        query_embedding = response.data[0].embedding
+        # Create embedding for search query (cached, so repeated queries are free)
+        query_embedding = await self.query_embeddings.get(query)
         
         # Search using cosine similarity
         with psycopg2.connect(self.conn_string) as conn: